@@ -0,0 +1,78 @@
+"""Calibrates RELEVANCE_GATE['min_similarity'] on a labelled query set.
+
+Each line of the query file is {"query": ..., "answerable": true|false}. The script scores
+every query with DatabaseHandler.relevance_score against the published knowledge base, the
+same call the relevance gate in rag_pipeline makes, and recommends the highest threshold that
+still lets at least --min-recall of the answerable queries through::
+
+    python -m benchmarks.calibrate_relevance_gate
+    python -m benchmarks.calibrate_relevance_gate --queries my_queries.jsonl --min-recall 0.98
+"""
+import argparse
+import json
+import os
+
+from src.rag_server import config
+from src.rag_server.databaseHandler import DatabaseHandler
+
+DEFAULT_QUERIES = os.path.join(os.path.dirname(__file__), "data", "relevance_queries.jsonl")
+
+
+def load_queries(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def sweep(scored, min_recall):
+    """Pass/reject rates for every candidate threshold; returns (rows, recommended threshold)."""
+    answerable = [s for s, label in scored if label]
+    unanswerable = [s for s, label in scored if not label]
+    rows, recommended = [], None
+    for threshold in sorted({round(s, 3) for s, _ in scored}):
+        recall = sum(s >= threshold for s in answerable) / len(answerable) if answerable else 1.0
+        rejection = sum(s < threshold for s in unanswerable) / len(unanswerable) if unanswerable else 0.0
+        rows.append({"threshold": threshold, "answerable_pass": recall, "unanswerable_reject": rejection})
+        if recall >= min_recall:
+            recommended = threshold
+    return rows, recommended
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the RAG relevance gate threshold.")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="labelled JSONL query set")
+    parser.add_argument("--min-recall", type=float, default=0.95,
+                        help="minimum share of answerable queries that must pass the gate")
+    parser.add_argument("--output", help="write scores and the sweep as JSON")
+    args = parser.parse_args()
+
+    from src.logger import set_logger
+    logger = set_logger("RAG_Server")
+    handler = DatabaseHandler.from_config(config, logger)
+    queries = load_queries(args.queries)
+    scored = []
+    for item in queries:
+        score = handler.relevance_score(item["query"])
+        score = score if score is not None else 0.0  # empty knowledge base
+        scored.append((score, bool(item["answerable"])))
+        print(f"{score:.3f}  {'answerable  ' if item['answerable'] else 'unanswerable'}  {item['query']}")
+
+    rows, recommended = sweep(scored, args.min_recall)
+    print(f"\n{'threshold':>9} {'answerable pass':>16} {'unanswerable reject':>20}")
+    for row in rows:
+        print(f"{row['threshold']:>9.3f} {row['answerable_pass']:>16.2f} {row['unanswerable_reject']:>20.2f}")
+    print(f"\nCurrent min_similarity: {config.RELEVANCE_GATE['min_similarity']} "
+          f"(gate {'enabled' if config.RELEVANCE_GATE['enabled'] else 'disabled'})")
+    print(f"Recommended min_similarity (answerable pass >= {args.min_recall}): {recommended}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"embedding_model": config.EMBEDDING_MODEL_NAME,
+                       "index_version": handler.get_index_version(),
+                       "scores": [{"query": q["query"], "answerable": q["answerable"], "score": s}
+                                  for q, (s, _) in zip(queries, scored)],
+                       "sweep": rows,
+                       "recommended": recommended}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
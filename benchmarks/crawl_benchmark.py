@@ -0,0 +1,207 @@
+"""Crawl time of the sequential and the concurrent TextScraper against a recorded site.
+
+Serves a fixture recorded with ``python -m src.rag_server.crawl_fixture record`` on localhost
+(with an optional per-response latency standing in for the network), crawls it once per
+concurrency setting and reports pages, wall time and pages/s. The robots.txt of the
+recording sets the politeness delay unless --crawl-delay overrides it.
+
+Every crawl must scrape the same pages and room records as the first (sequential) one when
+max_pages covers the whole recording; the script exits with status 1 otherwise::
+
+    python -m benchmarks.crawl_benchmark ./crawl_fixture
+    python -m benchmarks.crawl_benchmark ./crawl_fixture --concurrency 1 4 8 --latency 0.1 --crawl-delay 0.05
+
+--recrawl checks the incremental re-crawl instead, on a copy of the fixture with a fresh page
+cache: a cold crawl, a warm one (every page must come back 304 Not Modified and nothing may be
+reported as changed), then one with a page edited and one deleted (exactly those two must be
+reported)::
+
+    python -m benchmarks.crawl_benchmark ./crawl_fixture --recrawl
+
+--resume checks crash recovery: a crawl running in a subprocess is killed (SIGKILL) after
+--kill-after pages, resumed with scrape(resume=True), and must end with the same pages and
+room records as an uninterrupted crawl::
+
+    python -m benchmarks.crawl_benchmark ./crawl_fixture --resume --kill-after 30
+"""
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from src.rag_server.crawl_fixture import page_file, serve_fixture
+from src.rag_server.text_scraper import CHECKPOINT_FILE, PAGE_LOG_FILE, TextScraper
+
+
+def crawl(url, output_dir, concurrency, per_host_concurrency, max_pages, crawl_delay=None, page_cache_path=None,
+          resume=False, checkpoint_every=25):
+    scraper = TextScraper(url, output_dir, max_pages, concurrency=concurrency,
+                          per_host_concurrency=per_host_concurrency, page_cache_path=page_cache_path,
+                          use_sitemap=page_cache_path is not None, checkpoint_every=checkpoint_every)
+    if crawl_delay is not None:
+        scraper.delay = crawl_delay
+    start = time.perf_counter()
+    scraper.scrape(resume=resume)
+    return scraper, time.perf_counter() - start
+
+
+def _signature(scraper, origin):
+    pages = {(page["url"].replace(origin, ""), page["hash"]) for page in scraper.scraped_data}
+    rooms = {(rec["full_name"], rec["room_number"], rec["urls"].replace(origin, "")) for rec in scraper.room_records}
+    return pages, rooms
+
+
+def recrawl(args):
+    """Cold, warm and edited re-crawl of a fixture copy; returns the failed checks."""
+    failures = []
+    with tempfile.TemporaryDirectory(prefix="crawl_benchmark_") as work_dir:
+        fixture_dir = os.path.join(work_dir, "fixture")
+        shutil.copytree(args.fixture_dir, fixture_dir)
+        server, url = serve_fixture(fixture_dir, latency=args.latency)
+        page_cache_path = os.path.join(work_dir, "page_cache.sqlite")
+        print(f"{'crawl':<8} {'pages':>6} {'fetched':>8} {'304':>6} {'KB':>8} {'seconds':>8} "
+              f"{'added':>6} {'changed':>8} {'removed':>8}")
+        try:
+            runs = {}
+            for run in ("cold", "warm", "edited"):
+                if run == "edited":
+                    urls = sorted(page["url"] for page in runs["warm"].scraped_data if page["url"] != url)
+                    edited, deleted = urls[0], urls[-1]
+                    for target in (edited, deleted):
+                        path = page_file(fixture_dir, target[len(server.base_url):])
+                        if target == deleted:
+                            os.remove(path)
+                        else:
+                            with open(path, "a", encoding="utf-8") as f:
+                                f.write("<p>Edited paragraph for the re-crawl check.</p>")
+                            os.utime(path, (time.time() + 5, time.time() + 5))  # Last-Modified has 1s resolution
+                output_dir = os.path.join(work_dir, run)
+                scraper, seconds = crawl(url, output_dir, args.concurrency[-1], args.per_host_concurrency,
+                                         args.max_pages, args.crawl_delay, page_cache_path)
+                runs[run] = scraper
+                changes, stats = scraper.page_changes, scraper.crawl_stats
+                print(f"{run:<8} {len(scraper.scraped_data):>6} {stats['fetched']:>8} {stats['not_modified']:>6} "
+                      f"{stats['bytes'] / 1024:>8.1f} {seconds:>8.2f} {len(changes['added']):>6} "
+                      f"{len(changes['changed']):>8} {len(changes['removed']):>8}")
+        finally:
+            server.shutdown()
+    cold, warm, edited_run = runs["cold"], runs["warm"], runs["edited"]
+    if _signature(warm, "") != _signature(cold, ""):
+        failures.append("warm crawl scraped different pages than the cold one")
+    if warm.crawl_stats["fetched"] or warm.page_changes["added"] or warm.page_changes["changed"] \
+            or warm.page_changes["removed"]:
+        failures.append("warm crawl downloaded or reported changed pages")
+    if edited_run.page_changes["changed"] != [edited] or edited_run.page_changes["removed"] != [deleted]:
+        failures.append(f"edited crawl reported {edited_run.page_changes['changed']} changed / "
+                        f"{edited_run.page_changes['removed']} removed, expected [{edited}] / [{deleted}]")
+    return failures
+
+
+def _log_lines(output_dir):
+    path = os.path.join(output_dir, PAGE_LOG_FILE)
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        return f.read().count(b"\n")
+
+
+def resume_check(args):
+    """Kills a crawl mid-way, resumes it and compares it with an uninterrupted crawl; returns the failed checks."""
+    server, url = serve_fixture(args.fixture_dir, latency=args.latency)
+    origin = server.base_url
+    concurrency = args.concurrency[-1]
+    try:
+        with tempfile.TemporaryDirectory(prefix="crawl_benchmark_") as work_dir:
+            reference, _ = crawl(url, os.path.join(work_dir, "reference"), concurrency, args.per_host_concurrency,
+                                 args.max_pages, args.crawl_delay)
+            output_dir = os.path.join(work_dir, "resumed")
+            command = [sys.executable, "-m", "benchmarks.crawl_benchmark", args.fixture_dir, "--worker-crawl", url,
+                       output_dir, "--concurrency", str(concurrency), "--max-pages", str(args.max_pages),
+                       "--per-host-concurrency", str(args.per_host_concurrency)]
+            if args.crawl_delay is not None:
+                command += ["--crawl-delay", str(args.crawl_delay)]
+            worker = subprocess.Popen(command)
+            while worker.poll() is None and _log_lines(output_dir) < args.kill_after:
+                time.sleep(0.01)
+            worker.send_signal(signal.SIGKILL)
+            worker.wait()
+            killed_at = _log_lines(output_dir)
+            resumed, seconds = crawl(url, output_dir, concurrency, args.per_host_concurrency, args.max_pages,
+                                     args.crawl_delay, resume=True, checkpoint_every=5)
+            left_checkpoint = os.path.exists(os.path.join(output_dir, CHECKPOINT_FILE))
+    finally:
+        server.shutdown()
+    print(f"killed after {killed_at} logged pages; resumed crawl: {len(resumed.scraped_data)} pages, "
+          f"{len(resumed.room_records)} rooms, {resumed.crawl_stats['fetched']} fetched in total")
+    failures = []
+    if _signature(resumed, origin) != _signature(reference, origin):
+        failures.append("the resumed crawl scraped different pages or rooms than the uninterrupted one")
+    if len(resumed.scraped_data) != len({page["url"] for page in resumed.scraped_data}):
+        failures.append("the resumed crawl logged a page twice")
+    if left_checkpoint:
+        failures.append("the finished crawl left its checkpoint behind")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential vs. concurrent crawl of a recorded site.")
+    parser.add_argument("fixture_dir")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--per-host-concurrency", type=int, default=4)
+    parser.add_argument("--max-pages", type=int, default=100000)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every fixture response")
+    parser.add_argument("--crawl-delay", type=float, default=None,
+                        help="override the politeness delay (default: robots.txt of the recording, else 1s)")
+    parser.add_argument("--recrawl", action="store_true",
+                        help="check the incremental re-crawl (page cache, conditional GET) instead")
+    parser.add_argument("--resume", action="store_true", help="check killing and resuming a crawl instead")
+    parser.add_argument("--kill-after", type=int, default=30, help="logged pages before the crawl is killed (--resume)")
+    parser.add_argument("--worker-crawl", nargs=2, metavar=("URL", "OUTPUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker_crawl:
+        crawl(*args.worker_crawl, args.concurrency[-1], args.per_host_concurrency, args.max_pages, args.crawl_delay,
+              checkpoint_every=5)
+        return
+    if args.resume:
+        failures = resume_check(args)
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if not failures:
+            print("OK: the resumed crawl matches the uninterrupted one")
+        sys.exit(1 if failures else 0)
+
+    if args.recrawl:
+        failures = recrawl(args)
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if not failures:
+            print("OK: unchanged pages were revalidated, only the edited and deleted page were reported")
+        sys.exit(1 if failures else 0)
+
+    server, url = serve_fixture(args.fixture_dir, latency=args.latency)
+    origin = server.base_url
+    print(f"{'concurrency':>11} {'pages':>6} {'rooms':>6} {'seconds':>8} {'pages/s':>8} {'same':>5}")
+    reference, failed = None, False
+    try:
+        for concurrency in args.concurrency:
+            with tempfile.TemporaryDirectory(prefix="crawl_benchmark_") as output_dir:
+                scraper, seconds = crawl(url, output_dir, concurrency, args.per_host_concurrency,
+                                         args.max_pages, args.crawl_delay)
+            signature = _signature(scraper, origin)
+            reference = reference or signature
+            same = signature == reference
+            failed |= not same and len(scraper.scraped_data) < args.max_pages
+            print(f"{concurrency:>11} {len(scraper.scraped_data):>6} {len(scraper.room_records):>6} "
+                  f"{seconds:>8.2f} {len(scraper.scraped_data) / seconds:>8.1f} {'yes' if same else 'NO':>5}")
+    finally:
+        server.shutdown()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
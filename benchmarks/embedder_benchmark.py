@@ -0,0 +1,189 @@
+"""Compares the embedding backends: equivalence, latency and peak RSS.
+
+check (default): encodes the knowledge-base chunks and the retrieval benchmark queries with
+the PyTorch and the (int8) ONNX backend, with the E5 prefixes DatabaseHandler uses, and reports
+the per-text cosine between the two backends' vectors, how far the query/chunk similarities of
+each query's top hits move (the relevance gate thresholds them) and recall@5 of exact search
+over each backend's vectors. Exits with status 1 if the ONNX backend is outside the
+tolerances, so it can gate an export::
+
+    python -m benchmarks.embedder_benchmark check
+    python -m benchmarks.embedder_benchmark check --min-cosine 0.98 --min-cosine-each 0.95 --max-recall-drop 0.03
+
+perf: loads each backend in a fresh subprocess and reports load time, single query encode
+latency p50/p95, passage throughput and peak RSS::
+
+    python -m benchmarks.embedder_benchmark perf --threads 4
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from src.rag_server import config
+from src.rag_server.documentProcessor import apply_metadata_patches
+from src.rag_server.embedders import OnnxEmbedder, create_embedder
+from src.rag_server.text_scraper import make_deduplicator, make_document_processor
+from benchmarks.retrieval_benchmark import DEFAULT_QUERIES, curated_queries, is_relevant, room_queries
+
+BACKENDS = ("sentence_transformers", "onnx")
+
+
+def _peak_rss_mb():
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _prefixes(model_name):
+    # same rule as DatabaseHandler
+    return ("query: ", "passage: ") if "e5" in (model_name or "").lower() else ("", "")
+
+
+def _load_corpus(max_chunks):
+    pairs = apply_metadata_patches(make_document_processor(config).iter_combined_chunks_with_rooms(
+        config.ROOMS_CSV_PATH, workers=0, deduplicator=make_deduplicator(config)))
+    return pairs[:max_chunks] if max_chunks else pairs
+
+
+def _encode(backend, model_name, onnx_model_dir, texts, threads=None):
+    embedder = create_embedder(backend, model_name, onnx_model_dir, threads)
+    return np.asarray(embedder.encode(texts, batch_size=config.INGEST["encode_batch_size"],
+                                      normalize_embeddings=True, show_progress_bar=False), dtype=np.float32)
+
+
+def _recall_at(query_vectors, chunk_vectors, pairs, queries, k):
+    top = np.argsort(-(query_vectors @ chunk_vectors.T), axis=1)[:, :k]
+    hits = [any(is_relevant({"content": pairs[j][0], "metadata": pairs[j][1]}, item) for j in row)
+            for row, item in zip(top, queries)]
+    return float(np.mean(hits)), top
+
+
+def check(args):
+    query_prefix, passage_prefix = _prefixes(args.model)
+    pairs = _load_corpus(args.max_chunks)
+    queries = curated_queries(DEFAULT_QUERIES) + room_queries(config.ROOMS_CSV_PATH)
+    passages = [f"{passage_prefix}{chunk}" for chunk, _ in pairs]
+    query_texts = [f"{query_prefix}{item['query']}" for item in queries]
+
+    vectors = {}
+    for backend in BACKENDS:
+        start = time.perf_counter()
+        encoded = _encode(backend, args.model, args.onnx_model_dir, passages + query_texts, args.threads)
+        vectors[backend] = (encoded[:len(passages)], encoded[len(passages):])
+        print(f"{backend}: encoded {len(passages) + len(query_texts)} texts in {time.perf_counter() - start:.1f}s")
+
+    (torch_chunks, torch_queries), (onnx_chunks, onnx_queries) = vectors["sentence_transformers"], vectors["onnx"]
+    cosines = np.concatenate([(torch_chunks * onnx_chunks).sum(axis=1), (torch_queries * onnx_queries).sum(axis=1)])
+    torch_recall, torch_top = _recall_at(torch_queries, torch_chunks, pairs, queries, args.k)
+    onnx_recall, onnx_top = _recall_at(onnx_queries, onnx_chunks, pairs, queries, args.k)
+    # ONNX queries against the stored PyTorch vectors: an index built before switching backends
+    mixed_recall, _ = _recall_at(onnx_queries, torch_chunks, pairs, queries, args.k)
+    overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(torch_top, onnx_top)])
+    # query/chunk similarity of each query's PyTorch top-k hits, as scored by either backend
+    rows = np.arange(len(queries))[:, None]
+    shift = np.abs((onnx_queries @ onnx_chunks.T)[rows, torch_top] - (torch_queries @ torch_chunks.T)[rows, torch_top])
+
+    report = {"model": args.model,
+              "onnx_quantization": OnnxEmbedder.read_export_config(args.onnx_model_dir).get("quantization") or "fp32",
+              "chunks": len(passages),
+              "queries": len(query_texts),
+              "cosine_mean": float(cosines.mean()),
+              "cosine_min": float(cosines.min()),
+              "similarity_shift_max": float(shift.max()),
+              f"recall@{args.k}": {"sentence_transformers": torch_recall, "onnx": onnx_recall,
+                                   "onnx_queries_on_torch_index": mixed_recall},
+              f"top{args.k}_overlap": float(overlap)}
+    print(json.dumps(report, indent=2))
+
+    failures = []
+    if report["cosine_mean"] < args.min_cosine:
+        failures.append(f"mean cosine {report['cosine_mean']:.5f} < {args.min_cosine}")
+    if report["cosine_min"] < args.min_cosine_each:
+        failures.append(f"min cosine {report['cosine_min']:.5f} < {args.min_cosine_each}")
+    if report["similarity_shift_max"] > args.max_similarity_shift:
+        failures.append(f"query/chunk similarity shift {report['similarity_shift_max']:.4f} > {args.max_similarity_shift}")
+    if torch_recall - onnx_recall > args.max_recall_drop:
+        failures.append(f"recall@{args.k} drop {torch_recall - onnx_recall:.3f} > {args.max_recall_drop}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK: ONNX backend is equivalent within tolerance")
+    return 1 if failures else 0
+
+
+def _perf_worker(backend, args):
+    query_prefix, passage_prefix = _prefixes(args.model)
+    passages = [f"{passage_prefix}{chunk}" for chunk, _ in _load_corpus(args.passages)]
+    queries = [f"{query_prefix}{item['query']}" for item in curated_queries(DEFAULT_QUERIES)]
+
+    start = time.perf_counter()
+    embedder = create_embedder(backend, args.model, args.onnx_model_dir, args.threads)
+    load_seconds = time.perf_counter() - start
+    embedder.encode(queries[:1], normalize_embeddings=True)  # warm-up
+
+    latencies = []
+    for _ in range(args.repeats):
+        for query in queries:
+            start = time.perf_counter()
+            embedder.encode([query], normalize_embeddings=True)
+            latencies.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    embedder.encode(passages, batch_size=config.INGEST["encode_batch_size"], normalize_embeddings=True)
+    passage_seconds = time.perf_counter() - start
+    print(json.dumps({"backend": backend,
+                      "load_seconds": round(load_seconds, 2),
+                      "query_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+                      "query_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+                      "passages_per_sec": round(len(passages) / passage_seconds, 1),
+                      "peak_rss_mb": round(_peak_rss_mb(), 1)}))
+
+
+def perf(args):
+    print(f"{'backend':<22} {'load s':>7} {'query p50 ms':>13} {'query p95 ms':>13} {'passages/s':>11} {'peak RSS MB':>12}")
+    for backend in BACKENDS:
+        command = [sys.executable, "-m", "benchmarks.embedder_benchmark", "perf", "--worker", backend,
+                   "--model", args.model, "--onnx-model-dir", args.onnx_model_dir,
+                   "--passages", str(args.passages), "--repeats", str(args.repeats)]
+        if args.threads:
+            command += ["--threads", str(args.threads)]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        print(f"{r['backend']:<22} {r['load_seconds']:>7.2f} {r['query_p50_ms']:>13.2f} {r['query_p95_ms']:>13.2f} "
+              f"{r['passages_per_sec']:>11.1f} {r['peak_rss_mb']:>12.1f}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the PyTorch and ONNX embedding backends.")
+    parser.add_argument("command", nargs="?", choices=("check", "perf"), default="check")
+    parser.add_argument("--model", default=config.EMBEDDING_MODEL_NAME)
+    parser.add_argument("--onnx-model-dir", default=config.EMBEDDING_BACKEND["onnx_model_dir"])
+    parser.add_argument("--threads", type=int, default=None,
+                        help="intra-op threads of both backends (default: the THREADS['embedding'] policy)")
+    parser.add_argument("--k", type=int, default=5, help="k of recall@k (check)")
+    parser.add_argument("--max-chunks", type=int, default=0, help="limit the chunks encoded by check (0: all)")
+    parser.add_argument("--min-cosine", type=float, default=0.98, help="minimum mean cosine agreement (check)")
+    parser.add_argument("--min-cosine-each", type=float, default=0.95,
+                        help="minimum cosine agreement of every single text (check)")
+    parser.add_argument("--max-similarity-shift", type=float, default=0.02,
+                        help="maximum change of a top-k query/chunk similarity (check)")
+    parser.add_argument("--max-recall-drop", type=float, default=0.03, help="maximum recall@k drop (check)")
+    parser.add_argument("--passages", type=int, default=256, help="passages encoded for throughput (perf)")
+    parser.add_argument("--repeats", type=int, default=3, help="passes over the query set (perf)")
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _perf_worker(args.worker, args)
+        return
+    sys.exit(check(args) if args.command == "check" else perf(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Extraction throughput of the TextScraper HTML parser backends over a recorded crawl.
+
+Reads every page of a fixture recorded with ``python -m src.rag_server.crawl_fixture record``
+and extracts it with each backend of src/rag_server/html_extractors.py, plus "legacy": the
+multi-pass html.parser extraction TextScraper did before (a find_all per field, soup.text,
+get_text again for room numbers). Each row reports pages/s and MB/s of HTML (the best of
+--repeats runs) and how many pages came out identical to the legacy extraction.
+
+The "bs4" backend must reproduce the legacy extraction exactly; the script exits with status 1
+otherwise. lxml and selectolax repair broken markup differently, so they may disagree on a
+few pages of a real site::
+
+    python -m benchmarks.html_extraction_benchmark ./crawl_fixture
+    python -m benchmarks.html_extraction_benchmark ./crawl_fixture --backends bs4 selectolax --repeats 5
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from urllib.parse import urljoin
+
+from src.rag_server.crawl_fixture import FIXTURE_FILE
+from src.rag_server.html_extractors import available_backends, extract_page
+from src.rag_server.scraped_data import is_team_page_url
+
+
+def load_pages(fixture_dir):
+    """(url, html) of every recorded page; pages recorded with a query keep only their path."""
+    with open(os.path.join(fixture_dir, FIXTURE_FILE), "r", encoding="utf-8") as f:
+        origin = json.load(f)["origin"]
+    pages_dir = os.path.join(fixture_dir, "pages")
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, "**", "*.html"), recursive=True)):
+        url_path = os.path.relpath(os.path.dirname(path), pages_dir).replace(os.sep, "/")
+        url = f"{origin}/" if url_path == "." else f"{origin}/{url_path}/"
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append((url, f.read()))
+    return pages
+
+
+def _legacy_extract(html, url, team_page):
+    """The extraction of TextScraper before html_extractors, kept as the baseline."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    paragraphs = [p.get_text(" ", strip=True) for p in soup.find_all("p")]
+    headers = [h.get_text(" ", strip=True) for h in soup.find_all(re.compile('^h[1-6]$'))]
+    phone_numbers = re.findall(r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', soup.text)
+    room_numbers, full_name, research_info = [], "", ""
+    if team_page:
+        text = soup.get_text(" ", strip=True)
+        pattern = re.compile(r'\b(?:Raum|Room)\s*:?\s*([0-9]{1,3}\.[0-9]{1,3})\b', re.IGNORECASE)
+        room_numbers = list(dict.fromkeys(m.group(1) for m in pattern.finditer(text)))
+        h1 = soup.find("h1")
+        full_name = h1.get_text(strip=True) if h1 else ""
+        heading = None
+        for tag in soup.find_all(re.compile('^h[1-6]$', re.I)):
+            if re.search(r"research|forschung|interests", tag.get_text(" ", strip=True), flags=re.I):
+                heading = tag
+                break
+        if heading is None:
+            p = soup.find("p", string=re.compile(r"research|forschung", re.I))
+            research_info = p.get_text(" ", strip=True) if p else ""
+        else:
+            parts = []
+            for sib in heading.next_siblings:
+                if getattr(sib, "name", None) and re.match(r"^h[1-6]$", sib.name, flags=re.I):
+                    break
+                if getattr(sib, "name", None) in {"p", "ul", "ol", "li", "div"}:
+                    parts.append(sib.get_text(" ", strip=True))
+            research_info = " ".join([p for p in parts if p])
+    links = list(dict.fromkeys(urljoin(url, link['href']) for link in soup.find_all("a", href=True)))
+    return {"paragraphs": paragraphs, "headers": headers, "phone_numbers": phone_numbers,
+            "room_numbers": room_numbers, "full_name": full_name, "research_info": research_info, "links": links}
+
+
+def run(pages, extract, repeats):
+    """Best wall time of extracting every page, and the extractions."""
+    best, results = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        results = [extract(html, url, is_team_page_url(url)) for url, html in pages]
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pages/s of the TextScraper HTML parser backends.")
+    parser.add_argument("fixture_dir", help="crawl fixture recorded with crawl_fixture record")
+    parser.add_argument("--backends", nargs="+", default=None, help="default: every installed backend")
+    parser.add_argument("--repeats", type=int, default=3, help="timings are the best of this many runs")
+    args = parser.parse_args()
+
+    pages = load_pages(args.fixture_dir)
+    megabytes = sum(len(html.encode("utf-8")) for _, html in pages) / 2**20
+    team_pages = sum(is_team_page_url(url) for url, _ in pages)
+    print(f"{len(pages)} pages ({team_pages} team pages), {megabytes:.1f} MB of HTML")
+    print(f"{'backend':<11} {'seconds':>8} {'pages/s':>9} {'MB/s':>7} {'speedup':>8} {'same':>9}")
+
+    legacy_seconds, reference = run(pages, _legacy_extract, args.repeats)
+    print(f"{'legacy':<11} {legacy_seconds:>8.3f} {len(pages) / legacy_seconds:>9.1f} "
+          f"{megabytes / legacy_seconds:>7.2f} {1:>7.2f}x {len(pages):>4}/{len(pages):<4}")
+    failed = False
+    for backend in args.backends or available_backends():
+        seconds, results = run(pages, lambda html, url, team: extract_page(html, url, backend, team), args.repeats)
+        same = sum(result == expected for result, expected in zip(results, reference))
+        print(f"{backend:<11} {seconds:>8.3f} {len(pages) / seconds:>9.1f} {megabytes / seconds:>7.2f} "
+              f"{legacy_seconds / seconds:>7.2f}x {same:>4}/{len(pages):<4}")
+        failed |= backend == "bs4" and same != len(pages)
+    if failed:
+        print("FAIL: the bs4 backend does not reproduce the legacy extraction")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Peak memory of parsing + chunking: in-memory lists vs. the streaming pipeline.
+
+Builds synthetic scraped_data.csv files by repeating the pages of a real one, then runs
+each mode in a fresh subprocess and reports its peak RSS. The streaming mode should stay
+flat as the page count grows; the list mode grows linearly::
+
+    python -m benchmarks.ingest_memory_benchmark
+    python -m benchmarks.ingest_memory_benchmark --pages 500 5000 20000 --workers 4
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from src.rag_server import config
+from src.rag_server.documentProcessor import DocumentProcessor
+
+
+def _peak_rss_mb():
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def make_corpus(source_csv, pages, path):
+    """Writes a CSV with the given number of pages, cycling through the source pages with unique urls."""
+    csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+    with open(source_csv, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        fieldnames, rows = reader.fieldnames, list(reader)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for i in range(pages):
+            row = dict(rows[i % len(rows)])
+            row["url"] = f"{row['url']}#copy{i}"
+            writer.writerow(row)
+
+
+def _worker(mode, csv_path, workers):
+    processor = DocumentProcessor(csv_path)
+    start = time.perf_counter()
+    if mode == "list":
+        chunks, _ = processor.get_combined_text_chunks_interleaved()
+        n_chunks = len(chunks)
+    else:
+        n_chunks = sum(1 for _ in processor.iter_text_chunks(workers=workers))
+    print(json.dumps({"mode": mode, "chunks": n_chunks, "seconds": round(time.perf_counter() - start, 2),
+                      "peak_rss_mb": round(_peak_rss_mb(), 1)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS of list vs. streaming chunking.")
+    parser.add_argument("--source", default=config.CSV_FILE_PATH, help="scraped_data.csv to replicate")
+    parser.add_argument("--pages", type=int, nargs="+", default=[500, 5000, 20000])
+    parser.add_argument("--workers", type=int, default=config.INGEST["chunk_workers"])
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "CSV"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args.worker[0], args.worker[1], args.workers)
+        return
+
+    print(f"{'pages':>7} {'mode':<7} {'chunks':>8} {'seconds':>8} {'peak RSS MB':>12}")
+    with tempfile.TemporaryDirectory(prefix="ingest_memory_benchmark_") as work_dir:
+        for pages in args.pages:
+            csv_path = os.path.join(work_dir, f"pages_{pages}.csv")
+            make_corpus(args.source, pages, csv_path)
+            for mode in ("list", "stream"):
+                output = subprocess.run([sys.executable, "-m", "benchmarks.ingest_memory_benchmark",
+                                         "--workers", str(args.workers), "--worker", mode, csv_path],
+                                        check=True, capture_output=True, text=True).stdout
+                r = json.loads(output.strip().splitlines()[-1])
+                print(f"{pages:>7} {mode:<7} {r['chunks']:>8} {r['seconds']:>8.2f} {r['peak_rss_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
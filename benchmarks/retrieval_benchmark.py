@@ -0,0 +1,218 @@
+"""Retrieval quality and latency of the RAG stack over a sweep of ingestion parameters.
+
+For every combination of embedding model, chunk size and chunk overlap a fresh knowledge
+base is built from the scraped data in a temporary directory (same pipeline as
+save_to_chromadb: boilerplate stripping, dedup, streaming ingestion), then a labelled
+query set is run through the same retrieval as rag_pipeline.
+
+The query set is generated from rooms.csv ("In which room is <name>?", relevant: a chunk
+of one of the person's pages that contains the room number) plus the curated institutional
+queries in data/retrieval_queries.jsonl ({"query", "urls", "expect"}: relevant is a chunk of
+one of the urls that contains every expect string). Labels refer to pages, not chunk ids, so
+they stay valid for every chunking.
+
+Reports recall@k, MRR, ingestion time, index size and query latency p50/p95/p99 as JSON and
+a markdown table; both are written in a stable order so two runs can be diffed::
+
+    python -m benchmarks.retrieval_benchmark
+    python -m benchmarks.retrieval_benchmark --chunk-sizes 500 800 1200 --chunk-overlaps 50 150
+    python -m benchmarks.retrieval_benchmark --embedding-backends sentence_transformers onnx
+    python -m benchmarks.retrieval_benchmark --models intfloat/multilingual-e5-base intfloat/multilingual-e5-small \\
+        --output results.json --markdown results.md
+"""
+import argparse
+import csv
+import gc
+import itertools
+import json
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from src.rag_server import config
+from src.rag_server.databaseHandler import DatabaseHandler
+from src.rag_server.documentProcessor import DocumentProcessor
+from src.rag_server.text_scraper import make_deduplicator, scraped_data_path
+
+DEFAULT_QUERIES = os.path.join(os.path.dirname(__file__), "data", "retrieval_queries.jsonl")
+
+
+def _normalize_text(text):
+    return " ".join((text or "").lower().split())
+
+
+def room_queries(rooms_csv_path):
+    """One labelled query per person in rooms.csv: the room number on one of their pages."""
+    people = {}
+    with open(rooms_csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            name, room = " ".join((row.get("full_name") or "").split()), (row.get("room_number") or "").strip()
+            if not name or not room:
+                continue
+            person = people.setdefault(name, {"query": f"In which room is the office of {name}?",
+                                              "urls": [], "expect": [room], "set": "rooms"})
+            url = (row.get("urls") or "").strip()
+            if url and url not in person["urls"]:
+                person["urls"].append(url)
+    return list(people.values())
+
+
+def curated_queries(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [{**json.loads(line), "set": "curated"} for line in f if line.strip()]
+
+
+def is_relevant(hit, item):
+    """A hit is relevant if it comes from one of the item's pages and contains all expected strings."""
+    metadata = hit["metadata"] or {}
+    hit_urls = " ".join(str(metadata.get(key) or "") for key in ("urls", "url", "source"))
+    if item["urls"] and not any(url in hit_urls for url in item["urls"]):
+        return False
+    content = _normalize_text(hit["content"])
+    return all(_normalize_text(expected) in content for expected in item["expect"])
+
+
+def retrieve(handler, query, top_k):
+    """Hits for a bare query, retrieved like get_rag_output does."""
+    if config.RETRIEVAL["multi_query"]:
+        return handler.query_many([query], top_k=top_k,
+                                  candidates_per_query=max(config.RETRIEVAL["multi_query_candidates"], top_k),
+                                  mmr_lambda=config.RETRIEVAL["mmr_lambda"],
+                                  hybrid=config.RETRIEVAL["hybrid"], return_scores=True)[0]
+    return handler.query(query, top_k=top_k, hybrid=config.RETRIEVAL["hybrid"], return_scores=True)[0]
+
+
+def _directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def _metrics(ranks, top_ks):
+    """recall@k and MRR from the 1-based rank of the first relevant hit (None if not retrieved)."""
+    n = len(ranks)
+    metrics = {f"recall@{k}": sum(r is not None and r <= k for r in ranks) / n if n else 0.0 for k in top_ks}
+    metrics["mrr"] = sum(1.0 / r for r in ranks if r is not None) / n if n else 0.0
+    return metrics
+
+
+def run_config(model_name, chunk_size, chunk_overlap, queries, top_ks, work_dir, logger, use_embedding_cache=False,
+               embedding_backend="sentence_transformers", onnx_model_dir=None):
+    """Builds one knowledge base and evaluates the query set on it."""
+    handler = DatabaseHandler.from_config(
+        config, logger, path=work_dir, model_name=model_name,
+        query_cache_size=0,  # every query is timed end to end, including its embedding
+        embedding_cache_path=config.EMBEDDING_CACHE["path"] if use_embedding_cache else None,
+        embedding_backend=embedding_backend, onnx_model_dir=onnx_model_dir)
+    boilerplate = config.BOILERPLATE
+    processor = DocumentProcessor(scraped_data_path(config),
+                                  boilerplate_max_page_fraction=boilerplate["max_page_fraction"] if boilerplate["enabled"] else None,
+                                  boilerplate_min_pages=boilerplate["min_pages"],
+                                  chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    start = time.perf_counter()
+    chunk_stream = processor.iter_combined_chunks_with_rooms(config.ROOMS_CSV_PATH,
+                                                             workers=config.INGEST["chunk_workers"],
+                                                             deduplicator=make_deduplicator(config))
+    handler.sync_documents_stream(chunk_stream, queue_batches=config.INGEST["queue_batches"])
+    ingest_seconds = time.perf_counter() - start
+    handler.warm_up()
+
+    max_k = max(top_ks)
+    ranks, latencies = [], []
+    for item in queries:
+        start = time.perf_counter()
+        hits = retrieve(handler, item["query"], max_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ranks.append(next((rank for rank, hit in enumerate(hits, 1) if is_relevant(hit, item)), None))
+
+    result = {"model": handler.embedding_id,
+              "chunk_size": chunk_size,
+              "chunk_overlap": chunk_overlap,
+              "chunks": handler.store.count(),
+              "ingest_seconds": round(ingest_seconds, 2),
+              "embedding_cache": use_embedding_cache,
+              "index_mb": round(_directory_size(work_dir) / 2**20, 2),
+              "latency_ms": {f"p{p}": round(float(np.percentile(latencies, p)), 2) for p in (50, 95, 99)},
+              "quality": {}}
+    for query_set in sorted({item["set"] for item in queries}) + ["all"]:
+        set_ranks = [r for r, item in zip(ranks, queries) if query_set in ("all", item["set"])]
+        result["quality"][query_set] = {"queries": len(set_ranks),
+                                        **{name: round(value, 4) for name, value in _metrics(set_ranks, top_ks).items()}}
+    result["misses"] = [item["query"] for r, item in zip(ranks, queries) if r is None]
+    return result
+
+
+def to_markdown(results, top_ks):
+    header = (["model", "chunk", "overlap", "set", "queries"] + [f"R@{k}" for k in top_ks]
+              + ["MRR", "chunks", "ingest s", "index MB", "p50 ms", "p95 ms", "p99 ms"])
+    lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    for r in results:
+        for query_set, quality in r["quality"].items():
+            row = ([r["model"], r["chunk_size"], r["chunk_overlap"], query_set, quality["queries"]]
+                   + [f"{quality[f'recall@{k}']:.3f}" for k in top_ks] + [f"{quality['mrr']:.3f}"]
+                   + [r["chunks"], f"{r['ingest_seconds']:.1f}", f"{r['index_mb']:.1f}"]
+                   + [f"{r['latency_ms'][p]:.1f}" for p in ("p50", "p95", "p99")])
+            lines.append("| " + " | ".join(str(v) for v in row) + " |")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep ingestion parameters and measure retrieval quality/latency.")
+    parser.add_argument("--models", nargs="+", default=[config.EMBEDDING_MODEL_NAME])
+    parser.add_argument("--embedding-backends", nargs="+", default=[config.EMBEDDING_BACKEND["backend"]],
+                        choices=("sentence_transformers", "onnx"))
+    parser.add_argument("--onnx-model-dir", default=config.EMBEDDING_BACKEND["onnx_model_dir"],
+                        help="ONNX export used by the onnx backend (must be of the swept model)")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[config.INGEST["chunk_size"]])
+    parser.add_argument("--chunk-overlaps", type=int, nargs="+", default=[config.INGEST["chunk_overlap"]])
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 3, 5, 10], help="k values of recall@k")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="curated JSONL query set")
+    parser.add_argument("--no-room-queries", action="store_true", help="skip the queries generated from rooms.csv")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--markdown", help="write the results as a markdown table")
+    parser.add_argument("--embedding-cache", action="store_true",
+                        help="reuse cached chunk embeddings (faster sweeps, but ingest_seconds no longer measures encoding)")
+    parser.add_argument("--verbose", action="store_true", help="show the DatabaseHandler log")
+    args = parser.parse_args()
+
+    if args.verbose:
+        from src.logger import set_logger
+        logger = set_logger("RAG_Server")
+    else:
+        logger = logging.getLogger("retrieval_benchmark")
+    queries = curated_queries(args.queries) if args.queries else []
+    if not args.no_room_queries:
+        queries += room_queries(config.ROOMS_CSV_PATH)
+    top_ks = sorted(set(args.top_k))
+
+    results = []
+    for model_name, backend, chunk_size, chunk_overlap in itertools.product(args.models, args.embedding_backends,
+                                                                            args.chunk_sizes, args.chunk_overlaps):
+        if chunk_overlap >= chunk_size:
+            print(f"skipped chunk_size={chunk_size} chunk_overlap={chunk_overlap}: overlap must be smaller")
+            continue
+        print(f"{model_name} ({backend}) chunk_size={chunk_size} chunk_overlap={chunk_overlap} ...", flush=True)
+        with tempfile.TemporaryDirectory(prefix="retrieval_benchmark_") as work_dir:
+            results.append(run_config(model_name, chunk_size, chunk_overlap, queries, top_ks, work_dir, logger,
+                                      use_embedding_cache=args.embedding_cache, embedding_backend=backend,
+                                      onnx_model_dir=args.onnx_model_dir))
+        gc.collect()  # the next model must not share memory with this one
+
+    table = to_markdown(results, top_ks)
+    print("\n" + table)
+    report = {"queries": len(queries),
+              "top_k": top_ks,
+              "retrieval": {key: config.RETRIEVAL[key] for key in ("multi_query", "hybrid", "mmr_lambda")},
+              "vector_backend": config.VECTOR_STORE["backend"],
+              "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, sort_keys=True)
+    if args.markdown:
+        with open(args.markdown, "w", encoding="utf-8") as f:
+            f.write(table + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Load time of the scraped data: stringified-list CSV vs. Parquet with native list columns.
+
+Converts a scraped_data.csv to Parquet (optionally replicated to a larger page count, see
+ingest_memory_benchmark.make_corpus) and times reading every page through DocumentProcessor,
+a full-table load, and a team-pages-only read, which Parquet pushes down to the row groups::
+
+    python -m benchmarks.scraped_data_load_benchmark
+    python -m benchmarks.scraped_data_load_benchmark --pages 285 5000 20000 --repeats 5
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+from src.rag_server import config
+from src.rag_server.documentProcessor import DocumentProcessor
+from src.rag_server.scraped_data import LIST_COLUMNS, csv_to_parquet, parse_list_cell, read_pages
+from benchmarks.ingest_memory_benchmark import make_corpus
+
+
+def _best_of(repeats, fn):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _csv_table(path):
+    """Full load of the CSV export into columns, with the list cells parsed back."""
+    csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows = [{**row, **{c: parse_list_cell(row.get(c) or None) for c in LIST_COLUMNS}} for row in csv.DictReader(f)]
+    return len(rows)
+
+
+def _count_rows(processor):
+    return sum(1 for _ in processor._iter_rows())
+
+
+def measure(csv_path, parquet_path, repeats):
+    cases = {
+        "rows (DocumentProcessor)": (lambda: _count_rows(DocumentProcessor(csv_path)),
+                                     lambda: _count_rows(DocumentProcessor(parquet_path))),
+        "full table": (lambda: _csv_table(csv_path),
+                       lambda: read_pages(parquet_path).num_rows),
+        "team pages only": (lambda: _count_rows(DocumentProcessor(csv_path, team_pages_only=True)),
+                            lambda: _count_rows(DocumentProcessor(parquet_path, team_pages_only=True))),
+    }
+    results = []
+    for name, (csv_fn, parquet_fn) in cases.items():
+        csv_seconds, csv_rows = _best_of(repeats, csv_fn)
+        parquet_seconds, parquet_rows = _best_of(repeats, parquet_fn)
+        if csv_rows != parquet_rows:
+            raise RuntimeError(f"{name}: CSV read {csv_rows} rows, Parquet {parquet_rows}")
+        results.append((name, csv_rows, csv_seconds, parquet_seconds))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load time of scraped data as CSV vs. Parquet.")
+    parser.add_argument("--source", default=config.CSV_FILE_PATH, help="scraped_data.csv to convert")
+    parser.add_argument("--pages", type=int, nargs="*", default=[],
+                        help="also measure corpora replicated to these page counts")
+    parser.add_argument("--repeats", type=int, default=3, help="timings are the best of this many runs")
+    args = parser.parse_args()
+
+    print(f"{'pages':>7} {'read':<26} {'rows':>7} {'CSV ms':>9} {'Parquet ms':>11} {'speedup':>8} "
+          f"{'CSV MB':>7} {'Parquet MB':>11}")
+    with tempfile.TemporaryDirectory(prefix="scraped_data_load_benchmark_") as work_dir:
+        corpora = [("source", args.source)]
+        for pages in args.pages:
+            path = os.path.join(work_dir, f"pages_{pages}.csv")
+            make_corpus(args.source, pages, path)
+            corpora.append((pages, path))
+        for label, csv_path in corpora:
+            parquet_path = os.path.splitext(csv_path)[0] + ".parquet" if label != "source" \
+                else os.path.join(work_dir, "source.parquet")
+            pages = csv_to_parquet(csv_path, parquet_path)
+            csv_mb, parquet_mb = os.path.getsize(csv_path) / 2**20, os.path.getsize(parquet_path) / 2**20
+            for name, rows, csv_seconds, parquet_seconds in measure(csv_path, parquet_path, args.repeats):
+                print(f"{pages:>7} {name:<26} {rows:>7} {csv_seconds * 1000:>9.1f} {parquet_seconds * 1000:>11.1f} "
+                      f"{csv_seconds / parquet_seconds:>7.1f}x {csv_mb:>7.1f} {parquet_mb:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
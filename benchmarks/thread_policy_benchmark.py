@@ -0,0 +1,111 @@
+"""Query latency and ingest throughput at different compute thread settings.
+
+Every setting runs in a fresh subprocess, since torch and OpenMP thread pools are process-wide:
+
+- "omp1": the old global workaround (OMP_NUM_THREADS=1, every encode single-threaded).
+- "auto": THREADS with intra_op None, i.e. every usable core.
+- one row per --intra-op value: that many embedding threads.
+
+Each row reports the single-query encode latency p50/p95 over the curated query set, and
+the ingest throughput of streaming the first --passages chunks into a temporary index
+(chunking workers, embedding and writing, without the embedding cache)::
+
+    python -m benchmarks.thread_policy_benchmark
+    python -m benchmarks.thread_policy_benchmark --intra-op 1 2 4 8 --chunk-workers 2 --passages 512
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import islice
+
+import numpy as np
+
+from src.rag_server import config, thread_policy
+from benchmarks.retrieval_benchmark import DEFAULT_QUERIES, curated_queries
+
+
+def _settings(intra_ops):
+    settings = [("omp1", {"sklearn_openmp_workaround": True}), ("auto", {})]
+    settings += [(f"intra={n}", {"embedding": {"intra_op": n, "inter_op": 1}}) for n in intra_ops]
+    return settings
+
+
+def _worker(overrides, args):
+    from src.rag_server.databaseHandler import DatabaseHandler
+    from src.rag_server.text_scraper import make_deduplicator, make_document_processor
+
+    config.THREADS = {**config.THREADS, **overrides}
+    config.INGEST["chunk_workers"] = args.chunk_workers
+    resolved = thread_policy.describe()
+    logger = logging.getLogger("thread_policy_benchmark")
+    with tempfile.TemporaryDirectory(prefix="thread_policy_benchmark_") as work_dir:
+        handler = DatabaseHandler.from_config(config, logger, path=work_dir, model_name=args.model,
+                                              query_cache_size=0, embedding_cache_path=None,
+                                              embedding_backend=args.embedding_backend)
+        queries = [item["query"] for item in curated_queries(DEFAULT_QUERIES)]
+        handler.query(queries[0], top_k=1)  # warm-up
+        latencies = []
+        for _ in range(args.repeats):
+            for query in queries:
+                start = time.perf_counter()
+                handler.model.encode([f"{handler._query_prefix}{query}"], normalize_embeddings=True)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        chunk_stream = make_document_processor(config).iter_combined_chunks_with_rooms(
+            config.ROOMS_CSV_PATH, workers=args.chunk_workers, deduplicator=make_deduplicator(config))
+        start = time.perf_counter()
+        stats = handler.sync_documents_stream(islice(chunk_stream, args.passages),
+                                              queue_batches=config.INGEST["queue_batches"])
+        ingest_seconds = time.perf_counter() - start
+    print(json.dumps({"embedding_threads": resolved["embedding"]["intra_op"],
+                      "worker_threads": resolved["ingest_workers"]["intra_op"],
+                      "query_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+                      "query_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+                      "ingest_chunks_per_sec": round(stats["added"] / ingest_seconds, 1)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query latency and ingest throughput per thread setting.")
+    parser.add_argument("--intra-op", type=int, nargs="*", default=None,
+                        help="embedding intra-op thread counts (default: 1, half and all usable cores)")
+    parser.add_argument("--chunk-workers", type=int, default=config.INGEST["chunk_workers"])
+    parser.add_argument("--passages", type=int, default=256, help="chunks ingested per setting")
+    parser.add_argument("--repeats", type=int, default=3, help="passes over the query set")
+    parser.add_argument("--model", default=config.EMBEDDING_MODEL_NAME)
+    parser.add_argument("--embedding-backend", default=config.EMBEDDING_BACKEND["backend"],
+                        choices=("sentence_transformers", "onnx"))
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(json.loads(args.worker), args)
+        return
+
+    cores = thread_policy.available_cores()
+    intra_ops = args.intra_op if args.intra_op is not None else sorted({1, max(1, cores // 2), cores})
+    print(f"usable cores: {cores}, chunk workers: {args.chunk_workers}, backend: {args.embedding_backend}")
+    print(f"{'setting':<10} {'embed thr':>9} {'worker thr':>10} {'query p50 ms':>13} {'query p95 ms':>13} "
+          f"{'ingest chunks/s':>16}")
+    for label, overrides in _settings(intra_ops):
+        env = dict(os.environ)
+        if overrides.get("sklearn_openmp_workaround"):
+            env["OMP_NUM_THREADS"] = "1"
+        else:
+            env.pop("OMP_NUM_THREADS", None)
+        command = [sys.executable, "-m", "benchmarks.thread_policy_benchmark", "--worker", json.dumps(overrides),
+                   "--chunk-workers", str(args.chunk_workers), "--passages", str(args.passages),
+                   "--repeats", str(args.repeats), "--model", args.model,
+                   "--embedding-backend", args.embedding_backend]
+        output = subprocess.run(command, check=True, capture_output=True, text=True, env=env).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        print(f"{label:<10} {r['embedding_threads']:>9} {r['worker_threads']:>10} {r['query_p50_ms']:>13.2f} "
+              f"{r['query_p95_ms']:>13.2f} {r['ingest_chunks_per_sec']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
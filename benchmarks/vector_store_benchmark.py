@@ -0,0 +1,159 @@
+"""Compares the vector store backends: cold open time, query latency and peak RSS.
+
+Every backend is measured in a fresh subprocess so open time and RSS are not skewed by
+the other backend or by the data preparation. The vectors are either synthetic
+(normalized random vectors) or copied from an existing ChromaDB collection::
+
+    python -m benchmarks.vector_store_benchmark --n 5000 --dim 768
+    python -m benchmarks.vector_store_benchmark --source-path ./src/rag_server/chroma_db
+    python -m benchmarks.vector_store_benchmark --hnsw-space cosine --hnsw-search-ef 50
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from src.rag_server.vector_store import create_backend
+
+BACKENDS = ("chroma", "flat")
+COLLECTION = "benchmark"
+
+
+def _normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _load_source(source_path, collection_name):
+    from src.rag_server.databaseHandler import ACTIVE_COLLECTION_FILE
+
+    pointer = os.path.join(source_path, ACTIVE_COLLECTION_FILE)
+    if collection_name is None and os.path.exists(pointer):
+        with open(pointer, "r", encoding="utf-8") as f:
+            collection_name = json.load(f)["collection"]
+    source = create_backend("chroma", source_path).open(collection_name or "ias_documents_store")
+    data = source.get(include=("documents", "metadatas", "embeddings"))
+    return data["ids"], data["documents"], data["metadatas"], np.asarray(data["embeddings"], dtype=np.float32)
+
+
+def _prepare(args, work_dir):
+    """Writes the same records into every backend and the query vectors to a .npy file."""
+    rng = np.random.default_rng(args.seed)
+    if args.source_path:
+        ids, documents, metadatas, embeddings = _load_source(args.source_path, args.collection)
+    else:
+        embeddings = _normalize(rng.standard_normal((args.n, args.dim)).astype(np.float32))
+        ids = [f"chunk_{i}" for i in range(args.n)]
+        documents = [f"synthetic chunk {i}" for i in range(args.n)]
+        metadatas = [{"url": f"https://example.org/{i % 100}"} for i in range(args.n)]
+
+    # queries close to stored vectors, like real questions about indexed content
+    picks = rng.integers(0, len(ids), size=args.queries)
+    queries = _normalize(embeddings[picks] + 0.5 * rng.standard_normal((args.queries, embeddings.shape[1]))
+                         .astype(np.float32) / np.sqrt(embeddings.shape[1]))
+    np.save(os.path.join(work_dir, "queries.npy"), queries)
+
+    for backend in BACKENDS:
+        store = _open_backend(backend, work_dir, args).open(COLLECTION)
+        for start in range(0, len(ids), args.write_batch_size):
+            end = start + args.write_batch_size
+            store.add(ids[start:end], documents[start:end], metadatas[start:end], embeddings[start:end].tolist())
+    return len(ids), embeddings.shape[1]
+
+
+def _open_backend(backend, work_dir, args):
+    return create_backend(backend, os.path.join(work_dir, backend), args.hnsw_space,
+                          args.hnsw_construction_ef, args.hnsw_search_ef)
+
+
+def _rss_mb():
+    """Peak RSS of this process in MB."""
+    # ru_maxrss survives exec on Linux (it would report the parent's peak), VmHWM does not
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def _worker(args):
+    """Runs inside the subprocess: open, warm up, time the queries, report JSON on stdout."""
+    queries = np.load(os.path.join(args.work_dir, "queries.npy"))
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    store = _open_backend(args.worker, args.work_dir, args).open(COLLECTION)
+    store.query(queries[:1].tolist(), args.top_k)  # first query pays for lazy loading
+    open_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        store.query([query.tolist()], args.top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(json.dumps({"backend": args.worker,
+                      "open_ms": round(open_ms, 2),
+                      "query_p50_ms": round(float(np.percentile(latencies, 50)), 3),
+                      "query_p95_ms": round(float(np.percentile(latencies, 95)), 3),
+                      "rss_mb": round(_rss_mb(), 1),
+                      "rss_delta_mb": round(_rss_mb() - rss_before, 1)}))
+
+
+def _recall(work_dir, args):
+    """Top-k overlap of the chroma results with the exact flat results."""
+    queries = np.load(os.path.join(work_dir, "queries.npy")).tolist()
+    exact = _open_backend("flat", work_dir, args).open(COLLECTION).query(queries, args.top_k)["ids"]
+    approx = _open_backend("chroma", work_dir, args).open(COLLECTION).query(queries, args.top_k)["ids"]
+    return float(np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approx, exact) if e]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ChromaDB and flat vector store backends.")
+    parser.add_argument("--n", type=int, default=5000, help="number of synthetic vectors")
+    parser.add_argument("--dim", type=int, default=768, help="dimension of the synthetic vectors")
+    parser.add_argument("--source-path", help="copy the vectors from this ChromaDB directory instead")
+    parser.add_argument("--collection", help="collection in --source-path (default: the published one)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--write-batch-size", type=int, default=1000)
+    parser.add_argument("--hnsw-space", default="l2", choices=("l2", "cosine", "ip"))
+    parser.add_argument("--hnsw-construction-ef", type=int, default=100)
+    parser.add_argument("--hnsw-search-ef", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="vector_store_benchmark_") as work_dir:
+        n, dim = _prepare(args, work_dir)
+        print(f"{n} vectors, dim {dim}, {args.queries} queries, top_k {args.top_k}, "
+              f"hnsw space={args.hnsw_space} construction_ef={args.hnsw_construction_ef} "
+              f"search_ef={args.hnsw_search_ef}")
+        results = []
+        for backend in BACKENDS:
+            output = subprocess.run([sys.executable, "-m", "benchmarks.vector_store_benchmark", *sys.argv[1:],
+                                     "--worker", backend, "--work-dir", work_dir],
+                                    check=True, capture_output=True, text=True).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+        recall = _recall(work_dir, args)
+
+    print(f"{'backend':<8} {'open ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8} {'dRSS MB':>8}")
+    for r in results:
+        print(f"{r['backend']:<8} {r['open_ms']:>9.1f} {r['query_p50_ms']:>8.3f} {r['query_p95_ms']:>8.3f} "
+              f"{r['rss_mb']:>8.1f} {r['rss_delta_mb']:>8.1f}")
+    print(f"chroma recall@{args.top_k} vs exact flat search: {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,7 @@ from langchain_core.messages import SystemMessage
 from src.logger import logger
 from langgraph.types import Command
 from src.nodes.speech_process_nodes import text_to_speech, speech_to_text
+from src.nodes.rag_nodes import start_index_refresher, start_rag_warmup
 
 
 def get_user_permission():
@@ -26,6 +27,8 @@ def main(generate_graph=False):
     logger.info("Initializing RobotDog system with ROS client and voice assistant")
     logger.info("voice assiatnt imported. Building RobotDog workflow graph...")
     robot_graph = build_robotdog_workflow_graph()
+    start_rag_warmup()  # loads embedding model + ChromaDB in the background while the greeting is spoken
+    start_index_refresher()  # background scrape/re-index, only if enabled in rag_server config
     
     # Save the graph as PNG
     if generate_graph:
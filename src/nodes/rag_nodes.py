@@ -7,30 +7,105 @@ from src.config import ollama_base_url, rag_LLM_model
 from src.logger import logger
 
 # rag related imports
-from src.rag_server.text_scraper import TextScraper
 from src.rag_server.databaseHandler import DatabaseHandler
 from src.rag_server.documentProcessor import DocumentProcessor
+from src.rag_server.person_index import PersonIndex
+from src.rag_server.answer_cache import SemanticAnswerCache, answer_scope
+from src.rag_server.context_assembler import ContextAssembler, estimate_tokens
+from src.rag_server.index_refresher import IndexRefresher
 import src.rag_server.config as rag_config
 import os
+import threading
 
 # Lazy initialization - only create when first needed to avoid blocking on import
 _vector_db_handler = None
+_person_index = None
+_index_refresher = None
+_answer_cache = SemanticAnswerCache(similarity_threshold=rag_config.ANSWER_CACHE["similarity_threshold"],
+                                    max_size=rag_config.ANSWER_CACHE["max_size"],
+                                    ttl_seconds=rag_config.ANSWER_CACHE["ttl_seconds"])
+_init_lock = threading.Lock()  # handler may be requested by a query and the refresher thread at once
+_warmup_thread = None
+_warmup_done = threading.Event()
 
 def get_vector_db_handler():
     """Lazy initialization of DatabaseHandler to avoid blocking import."""
     global _vector_db_handler
-    if _vector_db_handler is None:
+    if _vector_db_handler is not None:
+        return _vector_db_handler
+    with _init_lock:
+        if _vector_db_handler is not None:
+            return _vector_db_handler
         try:
             logger.info("[RAG] Initializing DatabaseHandler...")
-            _vector_db_handler = DatabaseHandler(path=rag_config.CHROMA_PATH, 
-                                                model_name=rag_config.EMBEDDING_MODEL_NAME, 
-                                                logger=logger)
+            os.makedirs(rag_config.CHROMA_PATH, exist_ok=True)
+            _vector_db_handler = DatabaseHandler.from_config(rag_config, logger)
             logger.info("[RAG] DatabaseHandler initialized successfully")
         except Exception as e:
             logger.error(f"[RAG] Failed to initialize DatabaseHandler: {e}")
             raise
     return _vector_db_handler
 
+def get_person_index():
+    """Lazy initialization of the in-memory person/room index built from rooms.csv."""
+    global _person_index
+    if _person_index is None:
+        _, room_metadatas = DocumentProcessor(rag_config.CSV_FILE_PATH).get_rooms_text_chunks(rag_config.ROOMS_CSV_PATH)
+        _person_index = PersonIndex.from_room_metadatas(room_metadatas,
+                                                        min_score=rag_config.PERSON_FAST_PATH["min_score"],
+                                                        min_margin=rag_config.PERSON_FAST_PATH["min_margin"])
+        logger.info(f"[RAG] Person index built with {len(_person_index)} people")
+    return _person_index
+
+def start_rag_warmup():
+    """Loads the embedding model, opens the collection and runs a dummy query on a background thread.
+
+    Opt-in via WARMUP['enabled']; called from main() so the load overlaps with the greeting.
+    """
+    global _warmup_thread
+    if not rag_config.WARMUP["enabled"] or _warmup_thread is not None:
+        return
+
+    def _warm_up():
+        try:
+            logger.info("[RAG] Warm-up started")
+            get_person_index()  # cheap, ready for the fast path right away
+            get_vector_db_handler().warm_up()
+        except Exception as e:
+            logger.error(f"[RAG] Warm-up failed, loading on first query instead: {e}")
+        finally:
+            _warmup_done.set()
+
+    _warmup_thread = threading.Thread(target=_warm_up, name="rag-warmup", daemon=True)
+    _warmup_thread.start()
+
+def wait_for_rag_warmup():
+    """Blocks only if a warm-up was started and has not finished yet."""
+    if _warmup_thread is None or _warmup_done.is_set():
+        return
+    logger.info("[RAG] Waiting for warm-up to finish...")
+    if not _warmup_done.wait(timeout=rag_config.WARMUP["wait_timeout_seconds"]):
+        logger.warning("[RAG] Warm-up still running, continuing without it")
+
+def start_index_refresher():
+    """Starts the background scrape + re-index thread if enabled in config (called once from main)."""
+    global _index_refresher
+    if _index_refresher is not None or not (rag_config.REFRESH["enabled"] or rag_config.SCRAPE["need_scraping"]):
+        return _index_refresher
+
+    def _on_published(stats):
+        global _person_index
+        _person_index = None  # rooms.csv may have changed, rebuild lazily on the next query
+        logger.info(f"[RAG] New knowledge base version is live: {stats}")
+
+    _index_refresher = IndexRefresher(get_vector_db_handler, rag_config, logger,
+                                      interval_hours=rag_config.REFRESH["interval_hours"] if rag_config.REFRESH["enabled"] else 0,
+                                      follow_seconds=rag_config.REFRESH["follow_seconds"],
+                                      keep_versions=rag_config.REFRESH["keep_versions"],
+                                      on_published=_on_published)
+    _index_refresher.start(run_now=rag_config.SCRAPE["need_scraping"])
+    return _index_refresher
+
 # Use LLM-3 (RAG model) to generate response
 rag_llm = ChatOllama(
         model=rag_LLM_model,  # LLM-3
@@ -46,21 +121,67 @@ def rag_pipeline(state: RobotDogState) -> RobotDogState:
     Uses LLM-3 for RAG-based answer generation.
     """
     logger.info("[Node] -> rag_node")
-    from src.nodes.speech_process_nodes import narrate
-    narrate("looking_up")
     query = state.get("original_query", "")
+
+    # fast path: "where is X" / "take me to X" answered from the person index, no retrieval or LLM-3
+    if rag_config.PERSON_FAST_PATH["enabled"]:
+        try:
+            person = get_person_index().match(query)
+        except Exception as e:
+            logger.error(f"[rag_node] Person index lookup failed: {e}")
+            person = None
+        if person is not None:
+            logger.info(f"[rag_node] Person fast path: {person.full_name} | Room {person.room_number} | score {person.score:.2f}")
+            return _rag_node_result(_person_rag_output(person))
+
     context_output = state.get("context_proc_node_output", {})
     context_tags = context_output.get("context_tags", {})
     intent_reasoning = state.get("decision_node_output", {}).get("intent_reasoning", "")
     
     messages = []
     summary = state.get("summary", "")
+
+    # semantic answer cache: a repeated question (same summary and context tags) skips retrieval and LLM-3
+    cache_key = _answer_cache_key(query, summary, context_tags)
+    if cache_key is not None:
+        cached = _answer_cache.get(*cache_key)
+        if cached is not None:
+            answer, similarity = cached
+            logger.info(f"[rag_node] Answer cache hit (similarity {similarity:.3f}) | "
+                        f"hit rate {_answer_cache.stats()['hit_rate']:.0%}")
+            return _rag_node_result(RAGNodeOutput(**answer))
+
+    from src.nodes.speech_process_nodes import narrate
+    narrate("looking_up")
+    wait_for_rag_warmup()
     
     # retrieve relevant documents from vector database with error handling
     try:
+        # relevance gate: nothing close enough to the question, skip retrieval and LLM-3
+        # (the score calibrate_relevance_gate measures; a failure goes to the error path below)
+        if rag_config.RELEVANCE_GATE["enabled"]:
+            best_score = get_vector_db_handler().relevance_score(query)
+            if best_score is None or best_score < rag_config.RELEVANCE_GATE["min_similarity"]:
+                logger.info(f"[rag_node] Relevance gate: best score {best_score} below "
+                            f"{rag_config.RELEVANCE_GATE['min_similarity']}, skipping RAG LLM")
+                return _rag_node_result(_no_information_rag_output(query))
         logger.info("[rag_node] Starting document retrieval...")
-        retrieved_docs = get_rag_output(summary + "\n" + query + "\n" + str(context_tags))
-        retrieved_context = "\n\n".join([doc["content"] if isinstance(doc, dict) else str(doc) for doc in retrieved_docs]) if retrieved_docs else "No relevant documents found."
+        assembly = rag_config.CONTEXT_ASSEMBLY
+        retrieved_hits = get_rag_output(query, summary=summary, context_tags=context_tags,
+                                        top_k=assembly["retrieve_top_k"] if assembly["enabled"] else None,
+                                        return_scores=True)
+        retrieved_docs = _flatten_docs(retrieved_hits)
+        if retrieved_docs and assembly["enabled"]:
+            assembled = ContextAssembler(get_vector_db_handler(),
+                                         token_budget=assembly["token_budget"],
+                                         max_score_gap=assembly["max_score_gap"],
+                                         min_sentence_chars=assembly["min_sentence_chars"]).assemble(query, retrieved_docs)
+            retrieved_context = assembled.text or "No relevant documents found."
+            logger.info(f"[rag_node] Context: {assembled.tokens_after}/{assembled.tokens_before} tokens "
+                        f"({assembled.tokens_saved} saved) | {assembled.sentences_kept}/{assembled.sentences_total} "
+                        f"sentences from {assembled.chunks_used}/{assembled.chunks_retrieved} chunks")
+        else:
+            retrieved_context = "\n\n".join(retrieved_docs) if retrieved_docs else "No relevant documents found."
         logger.info(f"[rag_node] Retrieved {len(retrieved_docs) if retrieved_docs else 0} docs | Query: {query[:50]}")
     except Exception as e:
         logger.error(f"[rag_node] Error retrieving documents: {e}")
@@ -71,7 +192,13 @@ def rag_pipeline(state: RobotDogState) -> RobotDogState:
         summary_system_msg = f"Previous conversation summary: {summary}"
         messages.append(SystemMessage(content=summary_system_msg))
     
-    messages.extend(state.get("chat_history", [])) # include prior chat history after previous session's summary
+    chat_history = state.get("chat_history", [])
+    max_history = rag_config.CONTEXT_ASSEMBLY["max_history_messages"]
+    if max_history and len(chat_history) > max_history:
+        dropped = sum(estimate_tokens(str(msg.content)) for msg in chat_history[:-max_history])
+        logger.info(f"[rag_node] Chat history trimmed to {max_history} messages ({dropped} tokens saved)")
+        chat_history = chat_history[-max_history:]
+    messages.extend(chat_history) # include recent chat history after previous session's summary
 
     # use LLM-3 to generate RAG-based response with structured output
     system_prompt = system_prompt = """
@@ -144,6 +271,8 @@ def rag_pipeline(state: RobotDogState) -> RobotDogState:
         structured_llm = rag_llm.with_structured_output(RAGNodeOutput)
         rag_output = structured_llm.invoke(messages)
         logger.info("[rag_node] RAG LLM invocation completed successfully")
+        if cache_key is not None and retrieved_docs:
+            _answer_cache.put(*cache_key, dict(rag_output))
     except Exception as e:
         logger.error(f"[rag_node] Error invoking RAG LLM: {e}")
         # Fallback output if LLM fails
@@ -158,6 +287,63 @@ def rag_pipeline(state: RobotDogState) -> RobotDogState:
             informational_response=f"I encountered an error processing your request. Please try rephrasing your question."
         )
 
+    return _rag_node_result(rag_output)
+
+def _answer_cache_key(query, summary, context_tags):
+    """(query embedding, scope, index version) for the answer cache, or None if it is not usable now.
+
+    The lookup only runs once the embedding model is loaded; a cold start goes through the
+    normal path, which narrates while the model loads.
+    """
+    if not rag_config.ANSWER_CACHE["enabled"] or _vector_db_handler is None:
+        return None
+    if _warmup_thread is not None and not _warmup_done.is_set():
+        return None
+    try:
+        handler = get_vector_db_handler()
+        return handler.embed_query(query), answer_scope(summary, context_tags), handler.get_index_version()
+    except Exception as e:
+        logger.error(f"[rag_node] Answer cache lookup failed: {e}")
+        return None
+
+def get_answer_cache_stats():
+    """Hit/miss counters of the semantic answer cache, for monitoring."""
+    return _answer_cache.stats()
+
+def _person_rag_output(person):
+    """Builds the RAG node output for a confident person-index match."""
+    if person.requires_action:
+        modified_query = f"take me to {person.full_name}, Room {person.room_number}"
+        response = f"I will guide you to {person.full_name}'s office in room {person.room_number}."
+    else:
+        modified_query = f"where is the office of {person.full_name}, Room {person.room_number}"
+        response = f"{person.full_name}'s office is in room {person.room_number}."
+    return RAGNodeOutput(
+        retrieved_context=f"Name: {person.full_name}\nOffice: {person.room_number}",
+        rag_modified_query=modified_query,
+        requires_robot_action=person.requires_action,
+        action_confidence=0.9 if person.requires_action else 0.1,
+        target_location=person.room_number,
+        target_person=person.full_name,
+        probable_actions=["navigation"] if person.requires_action else [],
+        informational_response=response
+    )
+
+def _no_information_rag_output(query):
+    """RAG node output when retrieval found nothing relevant; routed on like any non-action answer."""
+    return RAGNodeOutput(
+        retrieved_context="No relevant documents found.",
+        rag_modified_query=query,
+        requires_robot_action=False,
+        action_confidence=0.0,
+        target_location=None,
+        target_person=None,
+        probable_actions=[],
+        informational_response="I'm sorry, I don't have that information in my knowledge base."
+    )
+
+def _rag_node_result(rag_output):
+    """State update of the rag_node for a RAGNodeOutput."""
     response_content = f"""RAG Retrieved Context: {rag_output.retrieved_context}\n\
         Modified Query: {rag_output.rag_modified_query}\n\
         Requires Robot Action: {rag_output.requires_robot_action}\n\
@@ -175,39 +361,59 @@ def rag_pipeline(state: RobotDogState) -> RobotDogState:
                              HumanMessage(content="Extract context and analyze the user query accordingly."), 
                              AIMessage(content=response_content)]}
 
-def get_rag_output(query):
+def get_rag_output(query, summary="", context_tags=None, top_k=None, return_scores=False):
     """
     Helper to extract RAG context from vector database.
+    With RETRIEVAL['multi_query'] the raw query, each context tag and the end of the summary are
+    separate sub-queries, so a long summary does not drown out the question.
+    Never scrapes or re-indexes, that runs in the background (see start_index_refresher).
+    Retrieval errors are logged and raised, so the caller does not mistake them for "nothing found".
     """
     try:
-        OUTPUT_DIR = rag_config.OUTPUT_DIR
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
-        os.makedirs(rag_config.CHROMA_PATH, exist_ok=True)
-
         # get the handler (lazy initialization)
         vector_db_handler = get_vector_db_handler()
         
         # query with logging
         logger.info(f"[RAG] Querying vector database...")
-        retrieved_docs = vector_db_handler.query(query) # get context from documents
+        if rag_config.RETRIEVAL["multi_query"]:
+            sub_queries = _retrieval_sub_queries(query, summary, context_tags)
+            retrieved_docs = vector_db_handler.query_many(
+                sub_queries,
+                top_k=top_k or rag_config.RETRIEVAL["top_k"],
+                candidates_per_query=rag_config.RETRIEVAL["multi_query_candidates"],
+                weights=[1.0] + [rag_config.RETRIEVAL["secondary_weight"]] * (len(sub_queries) - 1),
+                mmr_lambda=rag_config.RETRIEVAL["mmr_lambda"],
+                hybrid=rag_config.RETRIEVAL["hybrid"],
+                return_scores=return_scores)
+        else:
+            retrieved_docs = vector_db_handler.query(summary + "\n" + query + "\n" + str(context_tags or {}),
+                                                     top_k=top_k or rag_config.RETRIEVAL["top_k"],
+                                                     hybrid=rag_config.RETRIEVAL["hybrid"],
+                                                     return_scores=return_scores) # get context from documents
         logger.info(f"[RAG] Query completed, retrieved {len(retrieved_docs) if retrieved_docs else 0} documents")
 
-        if rag_config.SCRAPE['need_scraping']: # if scrapping needed, as specified in config
-            data_processor = DocumentProcessor(rag_config.CSV_FILE_PATH)  # needed for processing scraped data
-            scraper = TextScraper(rag_config.SCRAPE["base_url"], rag_config.SCRAPE["data_dir"], rag_config.SCRAPE["max_pages"])
-            logger.info("Starting web scraping...")
-            scraper.scrape()
-            scraper.save_to_csv()
-            logger.info("Web scraping completed.")
-            
-            # normal docs chunks and room info chunks are combined
-            text_chunks, metadatas = data_processor.get_combined_chunks_with_rooms(rag_config.ROOMS_CSV_PATH)
-            vector_db_handler.store_documents(text_chunks, metadatas)
-            logger.info(f"Stored {len(text_chunks)} chunks in ChromaDB")
-            retrieved_docs = vector_db_handler.query(query) # get context from updated documents
-
         return retrieved_docs
     
     except Exception as e:
         logger.error(f"[RAG Pipeline] Error in retrieving RAG output: {e}")
-        return []
\ No newline at end of file
+        raise
+
+def _flatten_docs(retrieved_docs):
+    """Document texts from a retrieval result (ChromaDB style list of lists, or dicts with "content")."""
+    docs = []
+    for item in retrieved_docs or []:
+        for doc in (item if isinstance(item, list) else [item]):
+            docs.append(doc["content"] if isinstance(doc, dict) else str(doc))
+    return docs
+
+def _retrieval_sub_queries(query, summary="", context_tags=None):
+    """Raw query first, then the context tag values, then the most recent part of the summary."""
+    sub_queries = [query]
+    sub_queries.extend(str(value) for value in (context_tags or {}).values() if value)
+    max_chars = rag_config.RETRIEVAL["summary_max_chars"]
+    if summary and max_chars:
+        trimmed = summary[-max_chars:]
+        if len(summary) > max_chars and " " in trimmed:
+            trimmed = trimmed.split(" ", 1)[1]  # do not start in the middle of a word
+        sub_queries.append(trimmed)
+    return sub_queries
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def answer_scope(summary="", context_tags=None):
+    """Scope key of a cached answer: hash over the conversation summary and the classifier's context tags.
+
+    Answers are only reused within the same scope, so a follow-up that means something else
+    in another conversation, or a near-identical query about another person ("where is
+    Prof. Weber" vs "Prof. Weyrich", whose embeddings can be very close), never gets a cached answer.
+    """
+    tags = json.dumps(context_tags or {}, sort_keys=True, ensure_ascii=False, default=str)
+    key = " ".join((summary or "").split()) + "\n" + tags
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+class SemanticAnswerCache:
+
+    """LRU + TTL cache of RAG answers, looked up by query embedding similarity.
+
+    A query hits when a cached query of the same scope has a cosine similarity of at least
+    similarity_threshold. All entries belong to one knowledge-base index version; the cache
+    clears itself when it sees another version, so answers never outlive a re-index.
+    """
+
+    def __init__(self, similarity_threshold=0.95, max_size=256, ttl_seconds=3600):
+        """Initializes an empty cache.
+
+        Args:
+            similarity_threshold (float): Minimum cosine similarity between the new and a cached query.
+            max_size (int): Maximum number of cached answers (least recently used are evicted).
+            ttl_seconds (float): Lifetime of an entry in seconds; None or 0 disables expiry.
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # entry id -> (created_at, scope, normalized embedding, answer)
+        self._next_id = 0
+        self._index_version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_index_version(self, index_version):
+        """Drops every entry if the knowledge base was re-indexed."""
+        if self._index_version != index_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._index_version = index_version
+
+    def _expire(self):
+        if not self.ttl_seconds:
+            return
+        now = time.monotonic()
+        expired = [entry_id for entry_id, entry in self._entries.items() if now - entry[0] > self.ttl_seconds]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        self.evictions += len(expired)
+
+    def _best_match(self, embedding, scope):
+        """(entry id, similarity) of the most similar cached query in the scope, or (None, 0.0)."""
+        ids = [entry_id for entry_id, entry in self._entries.items() if entry[1] == scope]
+        if not ids:
+            return None, 0.0
+        similarities = np.stack([self._entries[entry_id][2] for entry_id in ids]) @ embedding
+        best = int(np.argmax(similarities))
+        return ids[best], float(similarities[best])
+
+    @staticmethod
+    def _normalize(embedding):
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def get(self, embedding, scope, index_version):
+        """Returns (answer, similarity) for the closest cached query, or None on a miss.
+
+        Args:
+            embedding (array-like): Query embedding.
+            scope (str): Scope key, see answer_scope.
+            index_version (str): Current knowledge-base index version.
+        """
+        embedding = self._normalize(embedding)
+        with self._lock:
+            self._check_index_version(index_version)
+            self._expire()
+            entry_id, similarity = self._best_match(embedding, scope)
+            if entry_id is None or similarity < self.similarity_threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return dict(self._entries[entry_id][3]), similarity
+
+    def put(self, embedding, scope, index_version, answer):
+        """Caches an answer (dict) for the query; replaces a cached query it would hit itself."""
+        embedding = self._normalize(embedding)
+        with self._lock:
+            self._check_index_version(index_version)
+            entry_id, similarity = self._best_match(embedding, scope)
+            if entry_id is not None and similarity >= self.similarity_threshold:
+                del self._entries[entry_id]
+            self._entries[self._next_id] = (time.monotonic(), scope, embedding, dict(answer))
+            self._next_id += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Removes all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Returns hit/miss counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._entries),
+                    "max_size": self.max_size,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "evictions": self.evictions,
+                    "invalidations": self.invalidations,
+                    "index_version": self._index_version}
@@ -0,0 +1,129 @@
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+# room numbers ("2.116") and phone-like tokens are kept whole, everything else splits on non-word chars
+_TOKEN_PATTERN = re.compile(r"\d+(?:[.\-/]\d+)+|\w+")
+
+
+def tokenize(text):
+    """Lowercased word tokens of a text, keeping dotted numbers like room "2.116" as one token."""
+    text = unicodedata.normalize("NFKC", text or "").lower().replace("\xad", "")  # soft hyphens from the scraper
+    return _TOKEN_PATTERN.findall(text)
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuses several ranked id lists: score(id) = sum(1 / (k + rank)) over the lists it appears in.
+
+    Args:
+        rankings (List[List[str]]): Ranked id lists, best first.
+        k (int): RRF damping constant.
+
+    Returns:
+        List[Tuple[str, float]]: (id, fused score), best first.
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+
+    """Local BM25 inverted index over the stored chunks.
+
+    Complements the dense retrieval on exact tokens (room numbers, surnames). German compounds
+    are handled by expanding query terms that are not in the vocabulary to vocabulary terms
+    containing them (or contained in them), at a reduced weight.
+    """
+
+    def __init__(self, k1=1.5, b=0.75, min_expansion_len=5, expansion_weight=0.5, max_expansions=10):
+        """Initializes an empty index.
+
+        Args:
+            k1 (float): BM25 term-frequency saturation.
+            b (float): BM25 length normalization.
+            min_expansion_len (int): Minimum length of a query/vocabulary term used for compound expansion.
+            expansion_weight (float): Weight of an expanded (compound part) term relative to an exact term.
+            max_expansions (int): Maximum number of vocabulary terms a query term expands to.
+        """
+        self.k1 = k1
+        self.b = b
+        self.min_expansion_len = min_expansion_len
+        self.expansion_weight = expansion_weight
+        self.max_expansions = max_expansions
+        self.ids = []
+        self.doc_lens = []
+        self.postings = {}  # term -> {doc position: term frequency}
+        self.avg_doc_len = 0.0
+
+    def build(self, ids, texts):
+        """(Re)builds the index from chunk ids and texts."""
+        self.ids = list(ids)
+        self.doc_lens = []
+        postings = defaultdict(dict)
+        for pos, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            self.doc_lens.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings[term][pos] = tf
+        self.postings = dict(postings)
+        self.avg_doc_len = sum(self.doc_lens) / len(self.doc_lens) if self.doc_lens else 0.0
+        return self
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _expand(self, term):
+        """Query term -> [(index term, weight)], with compound expansion for out-of-vocabulary terms."""
+        if term in self.postings:
+            return [(term, 1.0)]
+        if len(term) < self.min_expansion_len:
+            return []
+        related = [t for t in self.postings
+                   if len(t) >= self.min_expansion_len and (term in t or t in term)]
+        related.sort(key=lambda t: abs(len(t) - len(term)))
+        return [(t, self.expansion_weight) for t in related[:self.max_expansions]]
+
+    def search(self, query, top_k=10):
+        """Returns the top_k (id, score) pairs for the query, best first."""
+        if not self.ids:
+            return []
+        n_docs = len(self.ids)
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            for index_term, weight in self._expand(term):
+                docs = self.postings[index_term]
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for pos, tf in docs.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lens[pos] / self.avg_doc_len)
+                    scores[pos] += weight * idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(self.ids[pos], score) for pos, score in best]
+
+    def save(self, path):
+        """Writes the index to a JSON file (atomically, via a temp file)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "ids": self.ids, "doc_lens": self.doc_lens,
+                       "postings": self.postings}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """Loads an index written by save(); returns None if the file does not exist."""
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"], **kwargs)
+        index.ids = data["ids"]
+        index.doc_lens = data["doc_lens"]
+        # JSON object keys are strings, doc positions are ints
+        index.postings = {term: {int(pos): tf for pos, tf in docs.items()} for term, docs in data["postings"].items()}
+        index.avg_doc_len = sum(index.doc_lens) / len(index.doc_lens) if index.doc_lens else 0.0
+        return index
@@ -3,20 +3,164 @@ import os
 #paths
 CHROMA_PATH = "./src/rag_server/chroma_db"
 CSV_FILE_PATH = "./src/rag_server/ias_scraped_data/scraped_data.csv"
+PARQUET_FILE_PATH = "./src/rag_server/ias_scraped_data/scraped_data.parquet"  # preferred over the CSV if present
 ROOMS_CSV_PATH = "./src/rag_server/ias_scraped_data/rooms.csv"
 
 # Embedding & API Config
 # EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2" # (currently used) this is for ChromaDB embeddings while saving data to ChromaDB
 EMBEDDING_MODEL_NAME = "intfloat/multilingual-e5-base" # updated embedding model for better performance
 
+# Ingestion (store_documents) batching
+INGEST = {
+    "encode_batch_size": 32,    # chunks per SentenceTransformer forward pass
+    "write_batch_size": 256,    # chunks per ChromaDB add/upsert call
+    "log_every_batches": 5,     # progress/throughput log frequency
+    "chunk_size": 800,          # characters per page chunk (benchmarks/retrieval_benchmark.py sweeps these)
+    "chunk_overlap": 150,       # characters shared by consecutive chunks of a page
+    "chunk_workers": 2,         # chunking processes for CLI ingestion (the guide process always chunks in-process)
+    "queue_batches": 4          # write batches buffered between parsing, embedding and writing
+}
+
+# Load the embedding model + ChromaDB on a background thread at startup (while the greeting is spoken)
+WARMUP = {
+    "enabled": False,
+    "wait_timeout_seconds": 60  # max. time rag_node waits for an unfinished warm-up before loading itself
+}
+
+# Query-embedding LRU cache in DatabaseHandler.query (max_size 0 disables it)
+QUERY_EMBEDDING_CACHE = {
+    "max_size": 512,
+    "ttl_seconds": 3600
+}
+
+# Embedding model runtime: "sentence_transformers" (PyTorch) or "onnx" (int8 ONNX Runtime export of
+# EMBEDDING_MODEL_NAME, much lower RSS on CPU-only nodes). Export with: python -m src.rag_server.embedders export
+# Switching backends re-embeds the knowledge base on the next sync/refresh (vectors differ slightly).
+# Thread counts come from THREADS["embedding"].
+EMBEDDING_BACKEND = {
+    "backend": "sentence_transformers",
+    "onnx_model_dir": "./src/rag_server/onnx/multilingual-e5-base"
+}
+
+# Compute threads per subsystem (src/rag_server/thread_policy.py); None = derived from the usable cores.
+# Compare settings with: python -m benchmarks.thread_policy_benchmark
+THREADS = {
+    "embedding": {"intra_op": None, "inter_op": 1},        # torch / ONNX Runtime; None = usable cores - ASR reservation
+    "ingest_workers": {"intra_op": None},                  # OpenMP/BLAS threads per chunking process; None = cores / chunk_workers
+    "asr": {"reserved_cores": 0},                          # cores left to a speech recognizer on this host (ASR runs on the robot)
+    # Old global fix for scikit-learn's OpenMP TLS error: OMP_NUM_THREADS=1 for the whole process (every
+    # encode single-threaded) and libgomp_preload as LD_PRELOAD of child processes. Only enable if the error returns.
+    "sklearn_openmp_workaround": False,
+    "libgomp_preload": None      # e.g. ".venv/lib/python3.10/site-packages/scikit_learn.libs/libgomp-d22c30c5.so.1.0.0"
+}
+
+# On-disk cache of chunk embeddings (float16, keyed by model + text) so re-ingests only encode new text.
+# Inspect/clear with: python -m src.rag_server.embedding_cache stats|clear
+EMBEDDING_CACHE = {
+    "enabled": True,
+    "path": "./src/rag_server/embedding_cache.sqlite",
+    "max_mb": 256                # ~1.5 KB per 768-dim vector, i.e. ~170k chunks
+}
+
+# Retrieval settings used by the rag_node
+RETRIEVAL = {
+    "top_k": 5,
+    "hybrid": False,            # fuse dense (ChromaDB) with BM25 results via reciprocal rank fusion
+    "rrf_k": 60,                # RRF damping constant
+    "hybrid_candidates": 20,    # candidates from each retriever before fusion
+    "multi_query": True,        # embed query, context tags and trimmed summary separately (query_many)
+    "multi_query_candidates": 10,   # candidates per sub-query before MMR
+    "secondary_weight": 0.9,    # similarity weight of tag/summary sub-queries relative to the raw query
+    "mmr_lambda": 0.7,          # 1.0 = relevance only, lower values favour diverse chunks
+    "summary_max_chars": 300    # only the most recent part of the summary is used as a sub-query
+}
+
+DEDUP = {
+    "enabled": True,         # collapse near-duplicate chunks (mirror pages, team members listed twice) before embedding
+    "threshold": 0.85,       # estimated Jaccard similarity of word 5-shingles
+    "num_perm": 64,          # MinHash signature length
+    "bands": 16              # LSH bands; num_perm must be divisible by it
+}
+
+BOILERPLATE = {
+    "enabled": True,             # drop headers/paragraphs repeated across pages (navigation, "Suche", "So erreichen Sie uns")
+    "max_page_fraction": 0.5,    # per language section (German pages, /en/ mirror); team member names sit on ~16-20%
+    "min_pages": 10              # smaller corpora are left as they are
+}
+
+VECTOR_STORE = {
+    "backend": "chroma",           # "chroma" (HNSW + SQLite) or "flat" (memory-mapped float16 .npy, exact search)
+    "hnsw_space": "l2",            # distance space of new ChromaDB collections: "l2", "cosine" or "ip"
+    "hnsw_construction_ef": 100,
+    "hnsw_search_ef": 100
+}
+
+RELEVANCE_GATE = {
+    # off until calibrated: an uncalibrated threshold rejects valid questions before retrieval runs.
+    # After indexing, run python -m benchmarks.calibrate_relevance_gate --output relevance_gate.json,
+    # set min_similarity to the recommended value (keep the JSON next to it) and enable the gate.
+    "enabled": False,
+    # best query/chunk cosine similarity (DatabaseHandler.relevance_score) below which retrieval and
+    # LLM-3 are skipped with an "I don't have that information" answer; 0.75 is a placeholder
+    "min_similarity": 0.75
+}
+
+CONTEXT_ASSEMBLY = {
+    "enabled": True,
+    "retrieve_top_k": 8,         # chunks retrieved for the assembler (instead of RETRIEVAL["top_k"])
+    "token_budget": 350,         # estimated tokens (chars / 4) of retrieved context in the LLM-3 prompt
+    "max_score_gap": 0.15,       # drop chunks whose best sentence scores this far below the best chunk
+    "min_sentence_chars": 20,
+    "max_history_messages": 6    # most recent chat_history messages passed to LLM-3; 0 or None keeps all
+}
+
+ANSWER_CACHE = {
+    "enabled": True,
+    "similarity_threshold": 0.95,  # cosine similarity between the new and a cached query
+    "max_size": 256,
+    "ttl_seconds": 3600            # answers are also dropped when the knowledge base is re-indexed
+}
+
+# In-memory person/room index answering "where is X" / "take me to X" without vector search + LLM-3
+PERSON_FAST_PATH = {
+    "enabled": True,
+    "min_score": 0.8,    # name similarity (trigrams, Cologne phonetics) of the best matching person
+    "min_margin": 0.1    # required gap to the second best person
+}
+
 # Memory choose between Simple or Summarized
 MEMORY_TYPE = "Simple Memory" 
 # Scraping Control
 SCRAPE = {
-    "need_scraping": False,
+    "need_scraping": False,  # run one background scrape + re-index at startup (never inside a query)
     "base_url": "https://www.ias.uni-stuttgart.de/",
     "data_dir": "./src/rag_server/ias_scraped_data",
-    "max_pages": 500
+    "max_pages": 500,
+    "formats": ("parquet", "csv"),  # scraped_data outputs; Parquet is read without parsing, CSV is an export
+    "concurrency": 4,               # pages fetched at once (1: the old sequential crawl with 1-2x delay sleeps)
+    "per_host_concurrency": 2,      # requests in flight per host
+    "crawl_delay_seconds": 1,       # min. seconds between requests to a host, unless robots.txt sets a Crawl-delay/Request-rate
+    "prioritize_team_pages": True,  # fetch queued /team/<name>/ pages first (rooms.csv), so max_pages cuts other pages first
+    "use_sitemap": True,            # seed the crawl with the URLs of the site's sitemap.xml
+    # Re-crawls send conditional GETs (ETag / Last-Modified) and restore unchanged pages from the page cache;
+    # page_changes.json lists added/changed/removed pages, and a refresh without changes skips the re-index
+    # (unless an earlier crawl's changes were never published, e.g. because that re-index failed).
+    "incremental": True,
+    "page_cache_path": "./src/rag_server/page_cache.sqlite",  # outside data_dir: the refresher replaces that
+    "checkpoint_every": 25,  # pages between crawl checkpoints; an interrupted refresh crawl resumes from the last one
+    # HTML parser of the scraped pages (src/rag_server/html_extractors.py): "bs4" (pure-Python html.parser,
+    # the reference), "lxml" or "selectolax" (4-10x faster). They repair broken markup differently (a <p>
+    # left open before the next <p>, a <div> inside a <p>, an unclosed heading), which changes those pages'
+    # text and content hashes. Compare on a recorded crawl first: python -m benchmarks.html_extraction_benchmark
+    "html_parser": "bs4"
+}
+
+# Background re-index (src/rag_server/index_refresher.py); queries never block on ingestion
+REFRESH = {
+    "enabled": False,         # start the refresh thread from main()
+    "interval_hours": 24,     # scheduled scrape + re-index; 0 only follows versions published by the CLI
+    "follow_seconds": 60,     # how often to pick up a collection published by another process
+    "keep_versions": 1        # previous collection versions kept for rollback
 }
 
 # Voice Output Dir
@@ -0,0 +1,124 @@
+import re
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+# sentence ends followed by whitespace, and line breaks; short fragments ("Prof.", "Dr.") are merged back
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\s*\n+\s*")
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token for English/German text)."""
+    return (len(text or "") + 3) // 4
+
+
+def split_sentences(text, min_chars=20):
+    """Splits a chunk into sentences; fragments shorter than min_chars are merged into the next one."""
+    sentences, pending = [], ""
+    for part in _SENTENCE_SPLIT.split(text or ""):
+        part = part.strip()
+        if not part:
+            continue
+        pending = f"{pending} {part}" if pending else part
+        if len(pending) >= min_chars:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        if sentences:
+            sentences[-1] = f"{sentences[-1]} {pending}"
+        else:
+            sentences.append(pending)
+    return sentences
+
+
+@dataclass
+class AssembledContext:
+    text: str
+    chunks_used: int
+    chunks_retrieved: int
+    sentences_kept: int
+    sentences_total: int
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_before - self.tokens_after
+
+
+class ContextAssembler:
+
+    """Builds the retrieved-context part of the LLM-3 prompt within a token budget.
+
+    Every sentence of the retrieved chunks is scored against the query with the embedding
+    model that is already loaded for retrieval (sentence vectors go through the handler's
+    embedding cache, so a chunk's sentences are encoded once). Chunks whose best sentence is far below the
+    best chunk are dropped (an adaptive top_k), then the highest scoring sentences are kept
+    until the budget is used up and emitted in their original order.
+    """
+
+    def __init__(self, handler, token_budget=350, max_score_gap=0.15, min_sentence_chars=20):
+        """Initializes the assembler.
+
+        Args:
+            handler (DatabaseHandler): Provides embed_query and embed_passages.
+            token_budget (int): Maximum estimated tokens of the assembled context.
+            max_score_gap (float): Chunks scoring more than this below the best chunk are dropped.
+            min_sentence_chars (int): Shorter sentence fragments are merged with the next sentence.
+        """
+        self.handler = handler
+        self.token_budget = token_budget
+        self.max_score_gap = max_score_gap
+        self.min_sentence_chars = min_sentence_chars
+
+    def assemble(self, query, documents: List[str]) -> AssembledContext:
+        """Selects the most relevant sentences of the retrieved documents for the query."""
+        documents = [d for d in documents if d and d.strip()]
+        tokens_before = estimate_tokens("\n\n".join(documents))
+        sentences = [(chunk_pos, sentence) for chunk_pos, document in enumerate(documents)
+                     for sentence in split_sentences(document, self.min_sentence_chars)]
+        if not sentences:
+            return AssembledContext("", 0, len(documents), 0, 0, tokens_before, 0)
+
+        query_embedding = self.handler.embed_query(query)
+        scores = self.handler.embed_passages([s for _, s in sentences]) @ query_embedding
+
+        # adaptive top_k: a chunk is only as good as its best sentence
+        chunk_scores = np.full(len(documents), -np.inf, dtype=np.float32)
+        for (chunk_pos, _), score in zip(sentences, scores):
+            chunk_scores[chunk_pos] = max(chunk_scores[chunk_pos], score)
+        kept_chunks = set(np.flatnonzero(chunk_scores >= chunk_scores.max() - self.max_score_gap).tolist())
+
+        selected, used_tokens = [], 0
+        for i in np.argsort(-scores):
+            chunk_pos, sentence = sentences[i]
+            if chunk_pos not in kept_chunks:
+                continue
+            tokens = estimate_tokens(sentence)
+            if used_tokens + tokens > self.token_budget:
+                if selected:
+                    continue  # a shorter, lower scoring sentence may still fit
+                sentence = sentence[:self.token_budget * 4]  # never return nothing for one long sentence
+                tokens = estimate_tokens(sentence)
+            selected.append((int(i), sentence))
+            used_tokens += tokens
+
+        # original order keeps sentences of one chunk together and readable
+        selected.sort()
+        paragraphs, last_chunk = [], None
+        for i, sentence in selected:
+            chunk_pos = sentences[i][0]
+            if chunk_pos != last_chunk:
+                paragraphs.append(sentence)
+                last_chunk = chunk_pos
+            else:
+                paragraphs[-1] = f"{paragraphs[-1]} {sentence}"
+        text = "\n\n".join(paragraphs)
+        return AssembledContext(text=text,
+                                chunks_used=len({sentences[i][0] for i, _ in selected}),
+                                chunks_retrieved=len(documents),
+                                sentences_kept=len(selected),
+                                sentences_total=len(sentences),
+                                tokens_before=tokens_before,
+                                tokens_after=estimate_tokens(text))
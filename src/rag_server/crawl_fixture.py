@@ -0,0 +1,171 @@
+"""Recorded copies of a crawled site, served locally so crawls can be checked offline.
+
+A TextScraper with record_dir writes the HTML of every page it scrapes, plus the site's
+robots.txt and sitemap.xml, into a fixture directory::
+
+    fixture/
+        fixture.json          {"origin": "https://www.ias.uni-stuttgart.de"}
+        robots.txt
+        sitemap.xml
+        pages/<url path>/index.html   (index.<query hash>.html for urls with a query)
+
+serve_fixture replays it over HTTP on localhost. Links to the recorded origin are rewritten
+to the fixture server, so a crawl of the fixture stays on it. Pages carry an ETag and a
+Last-Modified header (the file's mtime) and conditional requests get 304 Not Modified, like
+from the real site; an optional per-response latency stands in for the network::
+
+    python -m src.rag_server.crawl_fixture record --output ./crawl_fixture --max-pages 200
+    python -m src.rag_server.crawl_fixture serve ./crawl_fixture --port 8765 --latency 0.05
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+FIXTURE_FILE = "fixture.json"
+
+
+def page_file(fixture_dir, path, query=""):
+    """File of a recorded page, from its url path and query."""
+    segments = [s for s in path.split("/") if s and s not in (".", "..")]
+    name = f"index.{hashlib.sha1(query.encode('utf-8')).hexdigest()[:12]}.html" if query else "index.html"
+    return os.path.join(fixture_dir, "pages", *segments, name)
+
+
+def init_recording(record_dir, base_url, session, headers=None):
+    """Starts a recording of base_url's site: writes fixture.json, robots.txt and sitemap.xml."""
+    parts = urlsplit(base_url)
+    origin = f"{parts.scheme}://{parts.netloc}"
+    os.makedirs(record_dir, exist_ok=True)
+    with open(os.path.join(record_dir, FIXTURE_FILE), "w", encoding="utf-8") as f:
+        json.dump({"origin": origin, "base_path": parts.path or "/"}, f, indent=2)
+    for name in ("robots.txt", "sitemap.xml"):
+        try:
+            response = session.get(f"{origin}/{name}", headers=headers, timeout=10)
+        except Exception:
+            continue
+        if response.status_code == 200:
+            with open(os.path.join(record_dir, name), "wb") as f:
+                f.write(response.content)
+
+
+def record_page(record_dir, url, html):
+    """Writes the decoded HTML of a scraped page into the recording (UTF-8)."""
+    parts = urlsplit(url)
+    path = page_file(record_dir, parts.path, parts.query)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        fixture_dir = self.server.fixture_dir
+        if parts.path == "/robots.txt":
+            path, content_type = os.path.join(fixture_dir, "robots.txt"), "text/plain; charset=utf-8"
+        elif parts.path == "/sitemap.xml":
+            path, content_type = os.path.join(fixture_dir, "sitemap.xml"), "application/xml"
+        else:
+            path, content_type = page_file(fixture_dir, parts.path, parts.query), "text/html; charset=utf-8"
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if not os.path.exists(path):
+            self.send_error(404)
+            return
+        with open(path, "rb") as f:
+            body = f.read()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        mtime = int(os.path.getmtime(path))
+        if self._not_modified(etag, mtime):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        if self.server.origin and not content_type.startswith("text/plain"):
+            body = body.replace(self.server.origin.encode("utf-8"), self.server.base_url.encode("utf-8"))
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(mtime, usegmt=True))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):  # the crawler went away (killed, or cancelled the request)
+            pass
+
+    def _not_modified(self, etag, mtime):
+        if self.headers.get("If-None-Match") is not None:
+            return self.headers["If-None-Match"] == etag
+        since = self.headers.get("If-Modified-Since")
+        try:
+            return since is not None and mtime <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def log_message(self, format, *args):
+        pass  # one line per request drowns the crawl log
+
+
+def serve_fixture(fixture_dir, port=0, latency=0.0):
+    """Serves a recording on localhost from a background thread.
+
+    Args:
+        fixture_dir (str): Directory written by a recording TextScraper.
+        port (int): Port to listen on; 0 picks a free one.
+        latency (float): Seconds each response is delayed (simulated network latency).
+
+    Returns:
+        Tuple[ThreadingHTTPServer, str]: The server (stop it with shutdown()) and the URL to crawl.
+    """
+    with open(os.path.join(fixture_dir, FIXTURE_FILE), "r", encoding="utf-8") as f:
+        fixture = json.load(f)
+    server = ThreadingHTTPServer(("127.0.0.1", port), _FixtureHandler)
+    server.daemon_threads = True
+    server.fixture_dir = fixture_dir
+    server.origin = fixture["origin"]
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, name="crawl-fixture", daemon=True).start()
+    return server, server.base_url + fixture.get("base_path", "/")
+
+
+def main():
+    from src.rag_server import config
+    from src.rag_server.text_scraper import make_scraper
+
+    parser = argparse.ArgumentParser(description="Record a crawl as a fixture, or serve a recorded fixture.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    record = subparsers.add_parser("record", help="crawl SCRAPE['base_url'] and record every page")
+    record.add_argument("--output", required=True, help="fixture directory")
+    record.add_argument("--max-pages", type=int, default=config.SCRAPE["max_pages"])
+    serve = subparsers.add_parser("serve", help="serve a fixture on localhost until interrupted")
+    serve.add_argument("fixture_dir")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        config.SCRAPE["max_pages"] = args.max_pages
+        scraper = make_scraper(config, os.path.join(args.output, "scraped"), record_dir=args.output)
+        scraper.scrape()
+        print(f"Recorded {len(scraper.scraped_data)} pages of {config.SCRAPE['base_url']} in {args.output}")
+        return
+    server, url = serve_fixture(args.fixture_dir, args.port, args.latency)
+    print(f"Serving {args.fixture_dir} at {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
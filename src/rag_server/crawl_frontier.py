@@ -0,0 +1,144 @@
+"""Crawl frontier of TextScraper: which URLs are still to be fetched, each queued once.
+
+Links are normalized to one canonical form before they are queued, so fragment, default
+port, case and trailing slash variants of a page are fetched once. Queueing and popping are
+O(1) (two deques and a seen set), however many links point at the same page.
+"""
+import gzip
+import posixpath
+from collections import deque
+from functools import lru_cache
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from xml.etree import ElementTree
+
+from src.rag_server.scraped_data import is_team_page_url
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+@lru_cache(maxsize=65536)  # navigation links repeat on every page
+def normalize_url(url):
+    """Canonical form of an absolute http(s) URL, or None for other schemes.
+
+    Lowercases scheme and host, drops the default port and the fragment, sorts the query
+    parameters, resolves dot segments and gives extensionless paths a trailing slash (the
+    site's canonical form, '/institut/team/x' -> '/institut/team/x/').
+    """
+    try:
+        parts = urlsplit((url or "").strip())
+        port = parts.port
+    except ValueError:  # malformed netloc or port
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return None
+    netloc = parts.hostname.lower()
+    if port and port != _DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+
+    path = posixpath.normpath(parts.path) if parts.path else "/"
+    path = "/" + path.lstrip("/") if path != "." else "/"
+    if path != "/" and "." not in path.rsplit("/", 1)[-1]:
+        path += "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True))) if parts.query else ""
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def parse_sitemap(content):
+    """Parses a sitemap document (plain or gzip-compressed bytes).
+
+    Returns:
+        Tuple[str, List[str]]: The root element ("urlset" or "sitemapindex") and its <loc> URLs.
+    """
+    if content[:2] == b"\x1f\x8b":
+        content = gzip.decompress(content)
+    root = ElementTree.fromstring(content)
+    kind = root.tag.rsplit("}", 1)[-1]  # without the sitemaps.org namespace
+    locations = [el.text.strip() for el in root.iter() if el.tag.rsplit("}", 1)[-1] == "loc" and el.text]
+    return kind, locations
+
+
+class CrawlFrontier:
+
+    """FIFO frontier with a seen set and an optional priority lane.
+
+    Every normalized URL is queued at most once (retry re-queues a failed one explicitly).
+    URLs matching the priority predicate (by default team member pages, which also feed
+    rooms.csv) are popped before all others, so a max_pages limit cuts generic pages first.
+    """
+
+    def __init__(self, seeds=(), allowed_hosts=None, prioritize=is_team_page_url):
+        """Initializes the frontier.
+
+        Args:
+            seeds (Iterable[str]): Start URLs.
+            allowed_hosts (Iterable[str]): Hosts (netloc) that may be crawled; None allows the seeds' hosts.
+            prioritize (Callable[[str], bool]): URLs popped first; None keeps plain FIFO order.
+        """
+        seeds = [u for u in (normalize_url(s) for s in seeds) if u]
+        self.allowed_hosts = ({h.lower() for h in allowed_hosts} if allowed_hosts is not None
+                              else {urlsplit(s).netloc for s in seeds})
+        self.prioritize = prioritize
+        self._priority = deque()
+        self._queue = deque()
+        self._seen = set()
+        for seed in seeds:
+            self.add(seed)
+
+    def add(self, url):
+        """Queues a URL unless it was seen before or is off the allowed hosts.
+
+        Returns:
+            str: The normalized URL if it was queued, else None.
+        """
+        url = normalize_url(url)
+        if url is None or url in self._seen or urlsplit(url).netloc not in self.allowed_hosts:
+            return None
+        self._seen.add(url)
+        self._push(url)
+        return url
+
+    def retry(self, url):
+        """Queues an already seen URL again (failed fetch)."""
+        self._push(normalize_url(url) or url)
+
+    def _push(self, url):
+        (self._priority if self.prioritize and self.prioritize(url) else self._queue).append(url)
+
+    def pop(self):
+        """Next URL to fetch, or None if the frontier is empty."""
+        if self._priority:
+            return self._priority.popleft()
+        if self._queue:
+            return self._queue.popleft()
+        return None
+
+    def state(self, requeue=()):
+        """JSON-serializable state for a crawl checkpoint.
+
+        Args:
+            requeue (Iterable[str]): Popped URLs whose fetch has not finished; they are queued first on restore.
+        """
+        requeue = list(requeue)
+        return {"priority": [u for u in requeue if self.prioritize and self.prioritize(u)] + list(self._priority),
+                "queue": [u for u in requeue if not (self.prioritize and self.prioritize(u))] + list(self._queue),
+                "seen": list(self._seen),
+                "allowed_hosts": sorted(self.allowed_hosts)}
+
+    def restore(self, state):
+        """Replaces the frontier's content with a checkpointed state."""
+        self.allowed_hosts = set(state["allowed_hosts"])
+        self._priority = deque(state["priority"])
+        self._queue = deque(state["queue"])
+        self._seen = set(state["seen"])
+
+    def seen(self, url):
+        url = normalize_url(url)
+        return url is not None and url in self._seen
+
+    @property
+    def seen_count(self):
+        return len(self._seen)
+
+    def __len__(self):
+        return len(self._priority) + len(self._queue)
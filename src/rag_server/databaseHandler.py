@@ -1,24 +1,80 @@
-import chromadb
 from importlib_metadata import metadata
-from sentence_transformers import SentenceTransformer
 import os
+import json
+import time
+import hashlib
+import queue
+import threading
+import numpy as np
+
+from src.rag_server.embedders import create_embedder, embedding_id
+from src.rag_server.thread_policy import subsystem_threads
+from src.rag_server.embedding_cache import PassageEmbeddingCache, QueryEmbeddingCache
+from src.rag_server.bm25_index import BM25Index, reciprocal_rank_fusion
+from src.rag_server.dedup import chunk_source_url, make_chunk_id
+from src.rag_server.vector_store import create_backend
+
+COLLECTION_NAME = "ias_documents_store"
+ACTIVE_COLLECTION_FILE = "active_collection.json"
+
+
+def _metadata_changed(stored, metadata):
+    """True if metadata sets a key to another value than the stored metadata (None values are not stored)."""
+    return any(stored.get(key) != value for key, value in metadata.items() if value is not None)
+
+
+def _hit(doc_id, document, metadata, score):
+    return {"id": doc_id, "content": document, "metadata": metadata or {}, "score": float(score)}
 
 
 class DatabaseHandler:
     
     """Handles storage and retrieval of documents from a database."""
     
-    def __init__(self, path, model_name, logger):
+    def __init__(self, path, model_name, logger, encode_batch_size=32, write_batch_size=256,
+                 query_cache_size=512, query_cache_ttl=3600, rrf_k=60, hybrid_candidates=20,
+                 vector_backend="chroma", hnsw_space="l2", hnsw_construction_ef=100, hnsw_search_ef=100,
+                 embedding_cache_path=None, embedding_cache_max_mb=256,
+                 embedding_backend="sentence_transformers", onnx_model_dir=None, embedding_threads=None):
         
         """Initializes the database handler with a directory and embedding model name.
 
         Args:
             path (str): Path to the database persistence directory.
             model_name (str): Name of the embedding model to be used.
+            encode_batch_size (int): Number of chunks encoded per model forward pass.
+            write_batch_size (int): Number of chunks written per vector store add/upsert call.
+            query_cache_size (int): Max. number of cached query embeddings (0 disables the cache).
+            query_cache_ttl (float): Lifetime of a cached query embedding in seconds.
+            rrf_k (int): Reciprocal rank fusion constant for hybrid queries.
+            hybrid_candidates (int): Candidates taken from each retriever before fusion in hybrid queries.
+            vector_backend (str): "chroma" (HNSW + SQLite) or "flat" (memory-mapped exact float16 index).
+            hnsw_space (str): ChromaDB distance space for new collections ("l2", "cosine", "ip").
+            hnsw_construction_ef (int): ChromaDB HNSW construction ef for new collections.
+            hnsw_search_ef (int): ChromaDB HNSW search ef for new collections.
+            embedding_cache_path (str): SQLite file caching chunk embeddings across ingests; None disables it.
+            embedding_cache_max_mb (float): Size limit of the cached vectors (least recently used are evicted).
+            embedding_backend (str): "sentence_transformers" (PyTorch) or "onnx" (int8 ONNX Runtime export).
+            onnx_model_dir (str): Export directory of the onnx backend (see embedders.export_onnx).
+            embedding_threads (int): Intra-op threads of the embedding model; None uses config.THREADS["embedding"].
         """
-        self.client = chromadb.PersistentClient(path=path)
-        self.collection = self.client.get_or_create_collection(name="ias_documents_store")
-        self.model = SentenceTransformer(model_name)
+        self.rrf_k = rrf_k
+        self.hybrid_candidates = hybrid_candidates
+        self.query_cache = QueryEmbeddingCache(query_cache_size, query_cache_ttl) if query_cache_size else None
+        self.passage_cache = (PassageEmbeddingCache(embedding_cache_path, int(embedding_cache_max_mb * 2**20))
+                              if embedding_cache_path else None)
+        self.encode_batch_size = encode_batch_size
+        self.write_batch_size = write_batch_size
+        self.backend = create_backend(vector_backend, path, hnsw_space, hnsw_construction_ef, hnsw_search_ef)
+        self.path = self.backend.root
+        # the active collection can be swapped by a background refresh (see refresh_documents)
+        self.store = self.backend.open(self._read_active_collection() or COLLECTION_NAME)
+        # BM25 index over the same chunks, persisted next to the vector store files
+        self.bm25 = BM25Index.load(self._bm25_path(self.store.name))
+        self.model = create_embedder(embedding_backend, model_name, onnx_model_dir, embedding_threads)
+        self.model_name = model_name
+        # vectors of different backends are close but not identical: caches and index versions use this id
+        self.embedding_id = embedding_id(embedding_backend, model_name, onnx_model_dir)
         self.logger = logger
         # E5 family models expect "passage: " / "query: " prefixes for best retrieval.
         # For non-E5 models, prefixes are left empty so behavior is identical to before.
@@ -29,45 +85,706 @@ class DatabaseHandler:
             self.logger.info(
                 f"E5 model detected ({model_name}); using 'query:'/'passage:' prefixes."
             )
-        self.logger.info("DatabaseHandler initialized successfully.")
+        if not self._embeddings_compatible(self.store):
+            self.logger.warning(f"Collection {self.store.name} was embedded with "
+                                f"{self.store.metadata.get('embedding_model')}, queries use {self.embedding_id}; "
+                                f"re-index (refresh) to get consistent scores.")
+        threads = embedding_threads or subsystem_threads("embedding")["intra_op"]
+        self.logger.info(f"DatabaseHandler initialized successfully ({embedding_backend} backend, {threads} threads).")
+
+    @classmethod
+    def from_config(cls, config, logger, **overrides):
+        """DatabaseHandler with every setting from config (the one the RAG node serves from).
+
+        Args:
+            config (module): src.rag_server.config.
+            logger (logging.Logger): Logger of the handler.
+            **overrides: __init__ keyword arguments replacing the config value (e.g. path of a scratch index).
+        """
+        kwargs = dict(path=config.CHROMA_PATH,
+                      model_name=config.EMBEDDING_MODEL_NAME,
+                      encode_batch_size=config.INGEST["encode_batch_size"],
+                      write_batch_size=config.INGEST["write_batch_size"],
+                      query_cache_size=config.QUERY_EMBEDDING_CACHE["max_size"],
+                      query_cache_ttl=config.QUERY_EMBEDDING_CACHE["ttl_seconds"],
+                      rrf_k=config.RETRIEVAL["rrf_k"],
+                      hybrid_candidates=config.RETRIEVAL["hybrid_candidates"],
+                      vector_backend=config.VECTOR_STORE["backend"],
+                      hnsw_space=config.VECTOR_STORE["hnsw_space"],
+                      hnsw_construction_ef=config.VECTOR_STORE["hnsw_construction_ef"],
+                      hnsw_search_ef=config.VECTOR_STORE["hnsw_search_ef"],
+                      embedding_cache_path=config.EMBEDDING_CACHE["path"] if config.EMBEDDING_CACHE["enabled"] else None,
+                      embedding_cache_max_mb=config.EMBEDDING_CACHE["max_mb"],
+                      embedding_backend=config.EMBEDDING_BACKEND["backend"],
+                      onnx_model_dir=config.EMBEDDING_BACKEND["onnx_model_dir"])
+        kwargs.update(overrides)
+        return cls(logger=logger, **kwargs)
 
-    def store_documents(self, chunks, metadatas):
+    def store_documents(self, chunks, metadatas, encode_batch_size=None, write_batch_size=None,
+                        upsert=False, log_every_batches=5):
 
-        """Stores processed documents into the database.
+        """Stores processed documents into the database in batches.
+
+        Chunks are sorted by length before encoding so every forward pass sees texts of
+        similar size (less padding), and are written with one bulk add/upsert per batch
+        instead of one vector store transaction per chunk. Ids are content-addressed
+        (see make_chunk_id), so duplicate (url, text) pairs are stored once.
 
         Args:
             chunks (List[str]): A list of documents' chunks to store.
             metadatas (List[Dict]): A list of metadata dictionaries for each chunk.
+            encode_batch_size (int): Chunks per forward pass (defaults to the handler setting).
+            write_batch_size (int): Chunks per add/upsert call (defaults to the handler setting).
+            upsert (bool): Use collection.upsert instead of add, so re-runs overwrite existing ids.
+            log_every_batches (int): Log progress and throughput every N write batches.
+
+        Returns:
+            Dict: Ingestion stats (chunks, seconds, chunks_per_sec).
         """
-        
-        for idx, chunk in enumerate(chunks):
-            text_to_embed = f"{self._passage_prefix}{chunk}"
-            embedding = self.model.encode(text_to_embed, normalize_embeddings=True).tolist() # using normalize for better results
-            self.collection.add(
-                ids=[f"doc_{idx}"],
-                documents=[chunk],
-                metadatas=metadatas[idx],
-                embeddings=[embedding]
+        stats = self._write_chunks(chunks, metadatas, encode_batch_size, write_batch_size,
+                                   upsert, log_every_batches)
+        self.rebuild_lexical_index()
+        return stats
+
+    def _write_chunks(self, chunks, metadatas, encode_batch_size=None, write_batch_size=None,
+                      upsert=False, log_every_batches=5, store=None):
+        """Batched encode + bulk write of chunks (see store_documents), without touching the BM25 index."""
+        store = store or self.store
+        encode_batch_size = encode_batch_size or self.encode_batch_size
+        write_batch_size = write_batch_size or self.write_batch_size
+
+        # keep the first occurrence of every id, a single add call must not contain duplicates
+        ids = {}
+        for i, chunk in enumerate(chunks):
+            ids.setdefault(make_chunk_id(chunk_source_url(metadatas[i]), chunk), i)
+        id_of = {i: chunk_id for chunk_id, i in ids.items()}
+
+        total = len(id_of)
+        if total == 0:
+            self.logger.info("No documents to store.")
+            return {"chunks": 0, "seconds": 0.0, "chunks_per_sec": 0.0}
+
+        # length-sorted order, longest first so the slowest batches surface early in the progress log
+        order = sorted(id_of, key=lambda i: len(chunks[i]), reverse=True)
+        write = store.upsert if upsert else store.add
+
+        start = time.perf_counter()
+        done = 0
+        for n_batch, b_start in enumerate(range(0, total, write_batch_size), start=1):
+            batch_idx = order[b_start:b_start + write_batch_size]
+            embeddings = self._encode_chunks([chunks[i] for i in batch_idx], encode_batch_size).tolist()
+            write(
+                ids=[id_of[i] for i in batch_idx],
+                documents=[chunks[i] for i in batch_idx],
+                metadatas=[metadatas[i] for i in batch_idx],
+                embeddings=embeddings
             )
-        self.logger.info(f"Stored {len(chunks)} documents in the database.")
+            done += len(batch_idx)
+            if n_batch % log_every_batches == 0 or done == total:
+                elapsed = time.perf_counter() - start
+                self.logger.info(f"Stored {done}/{total} chunks ({done / total:.0%}) | "
+                                 f"{done / elapsed if elapsed else 0.0:.1f} chunks/s")
+        store.flush()
+
+        elapsed = time.perf_counter() - start
+        rate = total / elapsed if elapsed else 0.0
+        self.logger.info(f"Stored {total} documents in the database in {elapsed:.2f}s ({rate:.1f} chunks/s).")
+        return {"chunks": total, "seconds": elapsed, "chunks_per_sec": rate}
+
+    def store_documents_stream(self, chunk_stream, store=None, existing_ids=(), copy_from=None,
+                               encode_batch_size=None, write_batch_size=None, queue_batches=4,
+                               log_every_batches=5):
+        """Streams (chunk, metadata) pairs into the store; parsing, embedding and writing overlap.
+
+        The caller's thread pulls from chunk_stream (e.g. DocumentProcessor.iter_text_chunks, which
+        chunks in a process pool) and fills write batches; an encoder thread embeds them and a writer
+        thread stores them. Both hand-offs are bounded queues of queue_batches batches, so memory
+        stays flat for any corpus size. Chunks are length-sorted within each batch.
+
+        A chunk id hashes only the url and the text, so a chunk that is already stored can come with
+        new metadata (the URLs of its duplicates, its row). Such chunks, and the metadata patches in
+        the stream, are written with metadata-only updates after the last batch.
+
+        Args:
+            chunk_stream (Iterable[Tuple[str, Dict]]): (chunk, metadata) pairs; a (None, patch) pair
+                patches the metadata of the chunk with id patch["chunk_id"] streamed before it (see
+                DocumentProcessor.iter_combined_chunks_with_rooms).
+            store (VectorStore): Target store (default: the active one).
+            existing_ids (Dict[str, Dict]): Ids already available in store, with their stored metadata;
+                they are not embedded again, only their changed metadata is updated. With copy_from,
+                a set of the ids is enough.
+            copy_from (VectorStore): Store to copy existing ids (with their embeddings) from; the
+                copies get the streamed metadata.
+            encode_batch_size (int): Chunks per forward pass (defaults to the handler setting).
+            write_batch_size (int): Chunks per add call (defaults to the handler setting).
+            queue_batches (int): Capacity of each hand-off queue, in batches.
+            log_every_batches (int): Log progress and throughput every N write batches.
+
+        Returns:
+            Dict: Stream stats (ids: every chunk id seen, added, copied, updated: chunks whose metadata
+                was updated, seconds, chunks_per_sec, cache_hits: added chunks whose embedding came
+                from the embedding cache).
+        """
+        store = store or self.store
+        encode_batch_size = encode_batch_size or self.encode_batch_size
+        write_batch_size = write_batch_size or self.write_batch_size
+        to_encode, to_write = queue.Queue(maxsize=queue_batches), queue.Queue(maxsize=queue_batches)
+        errors = []
+        stats = {"ids": set(), "added": 0, "copied": 0, "updated": 0}
+        patches = {}  # chunk id -> late metadata
+        changed = {}  # existing chunk id -> streamed metadata that differs from the stored one
+        cache_hits_before = self.passage_cache.hits if self.passage_cache is not None else 0
+        start = time.perf_counter()
+
+        # after a failure in any stage the others stop instead of blocking on a full or empty queue
+        def put(q, item):
+            while not errors:
+                try:
+                    q.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+
+        def get(q):
+            while not errors:
+                try:
+                    return q.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+            return None
+
+        def encoder():
+            try:
+                while (batch := get(to_encode)) is not None:
+                    batch.sort(key=lambda item: len(item[1]), reverse=True)
+                    embeddings = self._encode_chunks([chunk for _, chunk, _ in batch], encode_batch_size).tolist()
+                    put(to_write, ("add", batch, embeddings))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                put(to_write, None)
+
+        def writer():
+            try:
+                n_batch = 0
+                while (item := get(to_write)) is not None:
+                    kind, batch, embeddings = item
+                    if kind == "copy":
+                        metadata_of = dict(batch)
+                        copied = copy_from.get(ids=list(metadata_of), include=("documents", "embeddings"))
+                        store.add(copied["ids"], copied["documents"],
+                                  [metadata_of[chunk_id] for chunk_id in copied["ids"]], copied["embeddings"])
+                        stats["copied"] += len(copied["ids"])
+                        continue
+                    store.add([chunk_id for chunk_id, _, _ in batch], [chunk for _, chunk, _ in batch],
+                              [metadata for _, _, metadata in batch], embeddings)
+                    stats["added"] += len(batch)
+                    n_batch += 1
+                    if n_batch % log_every_batches == 0:
+                        elapsed = time.perf_counter() - start
+                        self.logger.info(f"Stored {stats['added']} chunks | "
+                                         f"{stats['added'] / elapsed if elapsed else 0.0:.1f} chunks/s")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=encoder, name="ingest-encoder", daemon=True),
+                   threading.Thread(target=writer, name="ingest-writer", daemon=True)]
+        for thread in threads:
+            thread.start()
+        try:
+            new_batch, copy_batch = [], []
+            for chunk, metadata in chunk_stream:
+                if errors:
+                    break
+                if chunk is None:
+                    patch = dict(metadata)
+                    patches[patch.pop("chunk_id")] = patch
+                    continue
+                chunk_id = make_chunk_id(chunk_source_url(metadata), chunk)
+                if chunk_id in stats["ids"]:
+                    continue  # an add call must not contain duplicates
+                stats["ids"].add(chunk_id)
+                if chunk_id in existing_ids:
+                    if copy_from is not None:
+                        copy_batch.append((chunk_id, metadata))
+                        if len(copy_batch) >= write_batch_size:
+                            put(to_write, ("copy", copy_batch, None))
+                            copy_batch = []
+                    elif _metadata_changed(existing_ids[chunk_id], metadata):
+                        changed[chunk_id] = metadata
+                    continue
+                new_batch.append((chunk_id, chunk, metadata))
+                if len(new_batch) >= write_batch_size:
+                    put(to_encode, new_batch)
+                    new_batch = []
+            if new_batch:
+                put(to_encode, new_batch)
+            if copy_batch:
+                put(to_write, ("copy", copy_batch, None))
+        finally:
+            put(to_encode, None)
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+        updates = changed
+        for chunk_id, patch in patches.items():
+            if chunk_id not in stats["ids"]:
+                continue
+            metadata = {**updates.get(chunk_id, {}), **patch}
+            stored = existing_ids.get(chunk_id) if copy_from is None else None
+            if stored is not None and not _metadata_changed(stored, metadata):
+                updates.pop(chunk_id, None)  # e.g. a survivor whose group of duplicates did not change
+            else:
+                updates[chunk_id] = metadata
+        updates = list(updates.items())
+        for b_start in range(0, len(updates), write_batch_size):
+            batch = updates[b_start:b_start + write_batch_size]
+            store.update_metadatas([chunk_id for chunk_id, _ in batch], [metadata for _, metadata in batch])
+        stats["updated"] = len(updates)
+        store.flush()
+
+        elapsed = time.perf_counter() - start
+        stats["seconds"] = elapsed
+        stats["chunks_per_sec"] = stats["added"] / elapsed if elapsed else 0.0
+        stats["cache_hits"] = self.passage_cache.hits - cache_hits_before if self.passage_cache is not None else 0
+        self.logger.info(f"Streamed {len(stats['ids'])} chunks in {elapsed:.2f}s: {stats['added']} added "
+                         f"({stats['chunks_per_sec']:.1f} chunks/s, {stats['cache_hits']} from the embedding cache), "
+                         f"{stats['copied']} copied, {stats['updated']} metadata updates.")
+        return stats
+
+    def _encode_chunks(self, chunks, encode_batch_size):
+        """Normalized passage embeddings of chunks; only texts missing from the embedding cache are encoded."""
+        texts = [f"{self._passage_prefix}{chunk}" for chunk in chunks]
+        if self.passage_cache is None:
+            return np.asarray(self.model.encode(texts, batch_size=encode_batch_size,
+                                                normalize_embeddings=True,  # using normalize for better results
+                                                show_progress_bar=False), dtype=np.float32)
+        embeddings = self.passage_cache.get_many(self.embedding_id, texts)
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+        if missing:
+            encoded = self.model.encode([texts[i] for i in missing], batch_size=encode_batch_size,
+                                        normalize_embeddings=True, show_progress_bar=False)
+            self.passage_cache.put_many(self.embedding_id, [texts[i] for i in missing], encoded)
+            for i, embedding in zip(missing, encoded):
+                embeddings[i] = embedding
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def sync_documents(self, chunks, metadatas, log_every_batches=5):
+
+        """Incrementally syncs the collection with the given chunks (see sync_documents_stream).
+
+        Args:
+            chunks (List[str]): The full, current list of chunks.
+            metadatas (List[Dict]): A list of metadata dictionaries for each chunk.
+            log_every_batches (int): Log progress and throughput every N write batches.
+
+        Returns:
+            Dict: Sync stats (added, deleted, unchanged, updated, index_version).
+        """
+        return self.sync_documents_stream(zip(chunks, metadatas), log_every_batches=log_every_batches)
+
+    def sync_documents_stream(self, chunk_stream, log_every_batches=5, queue_batches=4):
+
+        """Incrementally syncs the collection with a stream of (chunk, metadata) pairs.
+
+        Only chunks whose (url, text) id is not stored yet are embedded; stored chunks whose metadata
+        changed get a metadata-only update, and stored chunks that are no longer produced (page
+        changed or vanished) are deleted. Afterwards the collection is stamped with a new index
+        version.
+
+        Args:
+            chunk_stream (Iterable[Tuple[str, Dict]]): The full, current set of chunks.
+            log_every_batches (int): Log progress and throughput every N write batches.
+            queue_batches (int): Capacity of the ingestion hand-off queues, in batches.
+
+        Returns:
+            Dict: Sync stats (added, deleted, unchanged, updated, index_version).
+        """
+        if not self._embeddings_compatible(self.store):
+            self.logger.info(f"Embedding model changed to {self.embedding_id}, building a new collection version.")
+            stats = self.refresh_documents_stream(chunk_stream, log_every_batches=log_every_batches,
+                                                  queue_batches=queue_batches)
+            return {key: stats[key] for key in ("added", "deleted", "index_version")} | {"unchanged": 0,
+                                                                                         "updated": 0}
+        stored = self.store.get(include=("metadatas",))
+        existing = dict(zip(stored["ids"], stored["metadatas"]))
+        streamed = self.store_documents_stream(chunk_stream, existing_ids=existing, queue_batches=queue_batches,
+                                               log_every_batches=log_every_batches)
+        wanted = streamed["ids"]
+        stale = [chunk_id for chunk_id in existing if chunk_id not in wanted]
+
+        for start in range(0, len(stale), self.write_batch_size):
+            self.store.delete(stale[start:start + self.write_batch_size])
+        self.store.flush()
+        if streamed["added"] or stale or self.bm25 is None:
+            self.rebuild_lexical_index()
+
+        index_version = self._stamp_index_version(wanted)
+        stats = {"added": streamed["added"],
+                 "deleted": len(stale),
+                 "unchanged": len(wanted) - streamed["added"],
+                 "updated": streamed["updated"],
+                 "index_version": index_version}
+        self.logger.info(f"Synced collection: {stats['added']} added, {stats['deleted']} deleted, "
+                         f"{stats['unchanged']} unchanged, {stats['updated']} metadata updates | "
+                         f"index version {index_version}")
+        return stats
+
+    def refresh_documents(self, chunks, metadatas, log_every_batches=5, keep_versions=1):
+
+        """Builds a new collection version and atomically swaps it in (see refresh_documents_stream).
+
+        Args:
+            chunks (List[str]): The full, current list of chunks.
+            metadatas (List[Dict]): A list of metadata dictionaries for each chunk.
+            log_every_batches (int): Log progress and throughput every N write batches.
+            keep_versions (int): Number of previous collection versions kept after publishing.
+
+        Returns:
+            Dict: Refresh stats (collection, added, copied, deleted, index_version).
+        """
+        return self.refresh_documents_stream(zip(chunks, metadatas), log_every_batches=log_every_batches,
+                                             keep_versions=keep_versions)
+
+    def refresh_documents_stream(self, chunk_stream, log_every_batches=5, keep_versions=1, queue_batches=4):
+
+        """Builds a new collection version next to the active one and atomically swaps it in.
 
-    def query(self, query_text, top_k=5):
+        Unchanged chunks are copied over with their stored embeddings (and the streamed metadata), only
+        new chunks are embedded.
+        Queries keep hitting the old collection until the new one is complete and published.
+
+        Args:
+            chunk_stream (Iterable[Tuple[str, Dict]]): The full, current set of chunks.
+            log_every_batches (int): Log progress and throughput every N write batches.
+            keep_versions (int): Number of previous collection versions kept after publishing.
+            queue_batches (int): Capacity of the ingestion hand-off queues, in batches.
+
+        Returns:
+            Dict: Refresh stats (collection, added, copied, deleted, index_version).
+        """
+        old = self.store
+        new = self.backend.create(self._new_version_name())
+        # stored vectors of another embedding model must not be copied into the new version
+        previous = set(old.get(include=())["ids"])
+        existing = previous if self._embeddings_compatible(old) else set()
+        streamed = self.store_documents_stream(chunk_stream, store=new, existing_ids=existing, copy_from=old,
+                                               queue_batches=queue_batches, log_every_batches=log_every_batches)
+
+        bm25 = self._build_lexical_index(new)
+        index_version = self._stamp_index_version(streamed["ids"], store=new)
+        self.publish_collection(new, bm25, keep_versions=keep_versions)
+
+        stats = {"collection": new.name,
+                 "added": streamed["added"],
+                 "copied": streamed["copied"],
+                 "deleted": len(previous) - streamed["copied"],
+                 "index_version": index_version}
+        self.logger.info(f"Published collection {new.name}: {stats['added']} embedded, {stats['copied']} copied, "
+                         f"{stats['deleted']} dropped | index version {index_version}")
+        return stats
+
+    def _new_version_name(self):
+        """Unused name for a new collection version; versions sort by creation time.
+
+        Nanoseconds and the process id keep two refreshes started in the same second (a manual run
+        and the scheduler) from writing into one collection.
+        """
+        existing = set(self.backend.list_names())
+        while True:
+            name = f"{COLLECTION_NAME}_{time.strftime('%Y%m%d%H%M%S')}_{time.time_ns() % 10**9:09d}_{os.getpid()}"
+            if name not in existing:
+                return name
+
+    def publish_collection(self, store, bm25=None, keep_versions=1):
+        """Makes the collection the active one (pointer file + in-process swap) and drops old versions."""
+        pointer = os.path.join(self.path, ACTIVE_COLLECTION_FILE)
+        tmp_pointer = f"{pointer}.tmp"
+        with open(tmp_pointer, "w", encoding="utf-8") as f:
+            json.dump({"collection": store.name,
+                       "published_at": time.strftime("%Y-%m-%dT%H:%M:%S")}, f)
+        os.replace(tmp_pointer, pointer)
+
+        # plain attribute swaps; a query already running keeps its own references (see query)
+        self.bm25 = bm25 if bm25 is not None else BM25Index.load(self._bm25_path(store.name))
+        self.store = store
+        self._drop_old_versions(keep_versions)
+
+    def reload_active_collection(self):
+        """Switches to the collection named in the pointer file if another process published a new one.
+
+        Returns:
+            bool: True if the active collection changed.
+        """
+        name = self._read_active_collection()
+        if not name or name == self.store.name:
+            return False
+        store = self.backend.open(name)
+        self.bm25 = BM25Index.load(self._bm25_path(name))
+        self.store = store
+        self.logger.info(f"Switched to published collection {name}.")
+        return True
+
+    def _read_active_collection(self):
+        """Name of the published collection, or None if nothing was published yet."""
+        pointer = os.path.join(self.path, ACTIVE_COLLECTION_FILE)
+        try:
+            with open(pointer, "r", encoding="utf-8") as f:
+                return json.load(f).get("collection")
+        except (OSError, ValueError):
+            return None
+
+    def _drop_old_versions(self, keep_versions):
+        """Deletes collection versions older than the newest keep_versions previous ones."""
+        # the unversioned base collection sorts before every timestamped version, i.e. it is the oldest
+        versions = sorted((n for n in self.backend.list_names() if n.startswith(COLLECTION_NAME) and n != self.store.name),
+                          reverse=True)
+        for name in versions[keep_versions:]:
+            self.backend.drop(name)
+            bm25_path = self._bm25_path(name)
+            if os.path.exists(bm25_path):
+                os.remove(bm25_path)
+            self.logger.info(f"Dropped old collection version {name}.")
+
+    def _embeddings_compatible(self, store):
+        """False if the store was stamped by another embedding model/backend (unstamped stores are trusted)."""
+        stamped = store.metadata.get("embedding_model")
+        return stamped is None or stamped == self.embedding_id
+
+    def _bm25_path(self, collection_name):
+        return os.path.join(self.path, f"bm25_{collection_name}.json")
+
+    def _stamp_index_version(self, ids, store=None):
+        """Writes an index version (hash over embedding id and sorted chunk ids) into the collection metadata."""
+        store = store or self.store
+        digest = hashlib.sha256(self.embedding_id.encode("utf-8"))
+        for chunk_id in sorted(ids):
+            digest.update(chunk_id.encode("utf-8"))
+        index_version = digest.hexdigest()[:16]
+        metadata = store.metadata
+        metadata.update({"index_version": index_version,
+                         "indexed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                         "embedding_model": self.embedding_id})
+        store.set_metadata(metadata)
+        return index_version
+
+    def rebuild_lexical_index(self):
+        """Rebuilds the BM25 index from the documents currently stored in the collection and persists it."""
+        self.bm25 = self._build_lexical_index(self.store)
+
+    def _build_lexical_index(self, store):
+        start = time.perf_counter()
+        stored = store.get(include=("documents",))
+        bm25 = BM25Index().build(stored["ids"], stored["documents"])
+        bm25.save(self._bm25_path(store.name))
+        self.logger.info(f"BM25 index rebuilt over {len(bm25)} chunks in {time.perf_counter() - start:.2f}s.")
+        return bm25
+
+    def get_index_version(self):
+        """Returns the index version stamped by the last sync, or None for an unsynced collection."""
+        return self.store.metadata.get("index_version")
+
+    def query(self, query_text, top_k=5, hybrid=False, return_scores=False):
         
         """Queries the database to retrieve relevant documents.
 
         Args:
             query_text (str): The query or question to match.
             top_k (int): Number of top documents to retrieve.
+            hybrid (bool): Fuse dense results with BM25 results (reciprocal rank fusion).
+            return_scores (bool): Return hits ({"id", "content", "metadata", "score"}) instead of texts;
+                score is the cosine similarity between query and chunk.
 
         Returns:
-            List[str]: List of relevant document texts.
+            List[List[str]]: Relevant document texts (one list per query, ChromaDB style), or hits.
         """
         self.logger.info(f"Executing Query Retrieval.")
-        text_to_embed = f"{self._query_prefix}{query_text}"
-        query_embedding = self.model.encode([text_to_embed], normalize_embeddings=True).tolist()
-        results = self.collection.query(query_embeddings=query_embedding, n_results=top_k)
+        store, bm25 = self.store, self.bm25  # stable view while a refresh may swap them
+        query_embedding = self.embed_query(query_text)
+        if hybrid and bm25 is None:
+            self.logger.warning("Hybrid retrieval requested but no BM25 index is built; using dense retrieval only.")
+            hybrid = False
+        n_results = max(top_k, self.hybrid_candidates) if hybrid else top_k
+        results = store.query([query_embedding.tolist()], n_results)
+        hits = [_hit(*row) for row in zip(results["ids"][0], results["documents"][0],
+                                          results["metadatas"][0], results["similarities"][0])]
+        if hybrid:
+            hits = self._fuse_with_lexical(query_text, query_embedding, hits, top_k, store, bm25)
         self.logger.info(f"Query Retrieval successful.")
-        return results["documents"]
+        return [hits] if return_scores else [[hit["content"] for hit in hits]]
+
+    def relevance_score(self, query_text):
+        """Best cosine similarity between the question and any stored chunk; None if the store is empty.
+
+        This is the score of the RAG relevance gate. It judges the bare question (not the summary or
+        context tags the retrieval adds), and calibrate_relevance_gate measures exactly this call.
+        """
+        store = self.store  # stable view while a refresh may swap it
+        similarities = store.query([self.embed_query(query_text).tolist()], 1)["similarities"][0]
+        return float(similarities[0]) if similarities else None
+
+    def query_many(self, sub_queries, top_k=5, candidates_per_query=10, weights=None, mmr_lambda=0.7,
+                   hybrid=False, return_scores=False):
+        """Retrieves documents for several sub-queries (e.g. the raw question, context tags, a trimmed summary)
+        with one batched encode and one vector store query.
+
+        Candidates of all sub-queries are deduplicated, scored by their best weighted similarity to any
+        sub-query and picked with max-marginal-relevance, so near-duplicate chunks do not fill all slots.
+
+        Args:
+            sub_queries (List[str]): Sub-queries, the most important (the raw user question) first.
+            top_k (int): Number of documents to return.
+            candidates_per_query (int): Candidates retrieved per sub-query before fusion.
+            weights (List[float]): Weight per sub-query (default 1.0 each).
+            mmr_lambda (float): Relevance vs. diversity trade-off of MMR (1.0 = relevance only).
+            hybrid (bool): Add the BM25 hits of the first sub-query to the candidates.
+            return_scores (bool): Return hits like query(); score is the similarity to the first sub-query,
+                so a relevance threshold judges the actual question, not the summary.
+
+        Returns:
+            List[List[str]]: Relevant document texts (one list, like query()), or hits.
+        """
+        sub_queries = [q for q in dict.fromkeys(q.strip() for q in sub_queries if q and q.strip())]
+        if not sub_queries:
+            return [[]]
+        self.logger.info(f"Executing multi-query retrieval with {len(sub_queries)} sub-queries.")
+        store, bm25 = self.store, self.bm25  # stable view while a refresh may swap them
+        query_embeddings = self.embed_queries(sub_queries)
+        results = store.query(query_embeddings.tolist(), max(top_k, candidates_per_query), include_embeddings=True)
+
+        documents, metadatas, candidate_embeddings = {}, {}, {}
+        for row in zip(results["ids"], results["documents"], results["metadatas"], results["embeddings"]):
+            for doc_id, document, metadata, embedding in zip(*row):
+                documents[doc_id] = document
+                metadatas[doc_id] = metadata
+                candidate_embeddings[doc_id] = embedding
+        if hybrid and bm25 is not None:
+            lexical_ids = [doc_id for doc_id, _ in bm25.search(sub_queries[0], self.hybrid_candidates)
+                           if doc_id not in documents]
+            if lexical_ids:
+                fetched = store.get(ids=lexical_ids, include=("documents", "metadatas", "embeddings"))
+                documents.update(zip(fetched["ids"], fetched["documents"]))
+                metadatas.update(zip(fetched["ids"], fetched["metadatas"]))
+                candidate_embeddings.update(zip(fetched["ids"], fetched["embeddings"]))
+        if not documents:
+            return [[]]
+
+        ids = list(documents)
+        matrix = np.asarray([candidate_embeddings[doc_id] for doc_id in ids], dtype=np.float32)
+        weights = np.asarray(weights[:len(sub_queries)] if weights else [1.0] * len(sub_queries), dtype=np.float32)
+        if len(weights) < len(sub_queries):
+            weights = np.pad(weights, (0, len(sub_queries) - len(weights)), constant_values=1.0)
+        # relevance of a candidate: its best weighted similarity to any sub-query (max over duplicates)
+        similarities = matrix @ query_embeddings.T
+        relevance = (similarities * weights).max(axis=1)
+        selected = self._max_marginal_relevance(matrix, relevance, top_k, mmr_lambda)
+        self.logger.info(f"Multi-query retrieval successful, {len(ids)} unique candidates.")
+        if return_scores:
+            return [[_hit(ids[i], documents[ids[i]], metadatas[ids[i]], similarities[i, 0]) for i in selected]]
+        return [[documents[ids[i]] for i in selected]]
+
+    @staticmethod
+    def _max_marginal_relevance(matrix, relevance, top_k, mmr_lambda):
+        """Greedy MMR over normalized candidate embeddings; returns the selected row indices."""
+        selected = []
+        redundancy = np.zeros(len(relevance), dtype=np.float32)  # max similarity to the selected ones
+        remaining = np.ones(len(relevance), dtype=bool)
+        for _ in range(min(top_k, len(relevance))):
+            scores = np.where(remaining, mmr_lambda * relevance - (1 - mmr_lambda) * redundancy, -np.inf)
+            best = int(np.argmax(scores))
+            selected.append(best)
+            remaining[best] = False
+            redundancy = np.maximum(redundancy, matrix @ matrix[best])
+        return selected
+
+    def _fuse_with_lexical(self, query_text, query_embedding, dense_hits, top_k, store, bm25):
+        """Reciprocal rank fusion of the dense candidates with the BM25 candidates; returns the top_k hits."""
+        hits = {hit["id"]: hit for hit in dense_hits}
+        lexical_ids = [doc_id for doc_id, _ in bm25.search(query_text, self.hybrid_candidates)]
+        fused_ids = [doc_id for doc_id, _ in reciprocal_rank_fusion([list(hits), lexical_ids], k=self.rrf_k)[:top_k]]
+
+        # BM25-only hits are not part of the dense result, fetch their text and score them against the query
+        missing = [doc_id for doc_id in fused_ids if doc_id not in hits]
+        if missing:
+            fetched = store.get(ids=missing, include=("documents", "metadatas", "embeddings"))
+            scores = np.asarray(fetched["embeddings"], dtype=np.float32) @ query_embedding
+            for row in zip(fetched["ids"], fetched["documents"], fetched["metadatas"], scores):
+                hits[row[0]] = _hit(*row)
+        return [hits[doc_id] for doc_id in fused_ids if doc_id in hits]
+
+    def embed_query(self, query_text):
+        """Returns the normalized query embedding, served from the query cache when possible.
+
+        Args:
+            query_text (str): The query or question to embed (without prefix).
+
+        Returns:
+            np.ndarray: The normalized embedding vector.
+        """
+        text_to_embed = f"{self._query_prefix}{query_text}"
+        if self.query_cache is not None:
+            cached = self.query_cache.get(self.embedding_id, text_to_embed)
+            if cached is not None:
+                return cached
+        embedding = self.model.encode([text_to_embed], normalize_embeddings=True)[0]
+        if self.query_cache is not None:
+            self.query_cache.put(self.embedding_id, text_to_embed, embedding)
+        return embedding
+
+    def embed_queries(self, query_texts):
+        """Embeds several queries; cache misses are encoded in one batched forward pass.
+
+        Returns:
+            np.ndarray: Normalized embeddings, one row per query.
+        """
+        texts = [f"{self._query_prefix}{q}" for q in query_texts]
+        embeddings = [self.query_cache.get(self.embedding_id, t) if self.query_cache is not None else None
+                      for t in texts]
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+        if missing:
+            encoded = self.model.encode([texts[i] for i in missing], batch_size=len(missing),
+                                        normalize_embeddings=True)
+            for i, embedding in zip(missing, encoded):
+                embeddings[i] = embedding
+                if self.query_cache is not None:
+                    self.query_cache.put(self.embedding_id, texts[i], embedding)
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def embed_passages(self, texts):
+        """Embeds passage texts (chunks, sentences) in one batched pass, through the embedding cache.
+
+        The context assembler embeds the sentences of every retrieved chunk; with the cache, the
+        sentences of chunks retrieved in an earlier turn are looked up instead of encoded again.
+
+        Returns:
+            np.ndarray: Normalized embeddings, one row per text.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._encode_chunks(texts, self.encode_batch_size)
+
+    def warm_up(self):
+        """Runs a dummy encode and query so model weights, tokenizer and the HNSW index are loaded.
+
+        Returns:
+            float: Warm-up time in seconds.
+        """
+        start = time.perf_counter()
+        embedding = self.model.encode([f"{self._query_prefix}warm up"], normalize_embeddings=True)
+        if self.store.count() > 0:
+            self.store.query(embedding.tolist(), 1)
+        elapsed = time.perf_counter() - start
+        self.logger.info(f"DatabaseHandler warm-up done in {elapsed:.2f}s.")
+        return elapsed
+
+    def cache_stats(self):
+        """Returns the query-embedding cache counters (hits, misses, hit_rate, ...) for monitoring."""
+        return self.query_cache.stats() if self.query_cache is not None else {}
+
+    def embedding_cache_stats(self):
+        """Returns the on-disk chunk embedding cache stats (entries, size, hits, misses, ...)."""
+        return self.passage_cache.stats() if self.passage_cache is not None else {}
 
 
 
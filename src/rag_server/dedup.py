@@ -0,0 +1,125 @@
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+_WORD_PATTERN = re.compile(r"\w+")
+_SHIFT = np.uint64(32)
+
+
+def make_chunk_id(url, text):
+    """Stable, content-addressed id for a chunk: the same (url, text) always maps to the same id,
+    so a re-scrape does not shift ids the way list positions (doc_{idx}) did."""
+    digest = hashlib.sha256(f"{url or ''}\n{text}".encode("utf-8")).hexdigest()
+    return f"chunk_{digest[:32]}"
+
+
+def chunk_source_url(metadata):
+    """Source URL of a chunk; page chunks carry 'url', room chunks carry 'source'."""
+    metadata = metadata or {}
+    return metadata.get("url") or metadata.get("source") or ""
+
+
+def shingles(text, size=5):
+    """Word shingles of a text; texts shorter than size words are one shingle."""
+    tokens = _WORD_PATTERN.findall((text or "").lower())
+    if len(tokens) <= size:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class ChunkDeduplicator:
+
+    """MinHash + LSH near-duplicate detection over a stream of chunks.
+
+    Chunks are added in order; a chunk whose estimated Jaccard similarity (on word shingles)
+    to an earlier surviving chunk reaches the threshold is marked as a duplicate of it, and
+    its URL is recorded on the survivor. Only the survivors' signatures are kept, so memory
+    grows with the number of distinct chunks, not with their text.
+    """
+
+    def __init__(self, threshold=0.85, num_perm=64, bands=16, shingle_size=5, seed=1):
+        """Initializes an empty deduplicator.
+
+        Args:
+            threshold (float): Minimum estimated Jaccard similarity of two near-duplicate chunks.
+            num_perm (int): MinHash signature length.
+            bands (int): LSH bands (num_perm must be divisible by it); more bands find more candidates.
+            shingle_size (int): Words per shingle.
+            seed (int): Seed of the hash functions.
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        # multiply-shift hashing: h(x) = (a * x + b) mod 2^64 >> 32, with odd a
+        self._a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+        self._buckets = {}      # (band, band hash) -> [survivor positions]
+        self._signatures = {}   # survivor position -> signature
+        self._root = []         # position -> survivor position
+        self._urls = {}         # survivor position -> [urls]
+        self._duplicates = {}   # survivor position -> number of collapsed chunks
+        self.chars_before = 0
+        self.chars_after = 0
+
+    def signature(self, text):
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(text, self.shingle_size)),
+                             dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            return ((np.outer(hashes, self._a) + self._b) >> _SHIFT).min(axis=0).astype(np.uint32)
+
+    def add(self, text, url=None):
+        """Adds the next chunk; returns its position."""
+        position = len(self._root)
+        signature = self.signature(text)
+        band_keys = [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                     for band in range(self.bands)]
+        self.chars_before += len(text)
+
+        for survivor in dict.fromkeys(s for key in band_keys for s in self._buckets.get(key, ())):
+            if np.mean(self._signatures[survivor] == signature) >= self.threshold:
+                self._root.append(survivor)
+                self._duplicates[survivor] += 1
+                if url and url not in self._urls[survivor]:
+                    self._urls[survivor].append(url)
+                return position
+
+        self._root.append(position)
+        self._signatures[position] = signature
+        self._urls[position] = [url] if url else []
+        self._duplicates[position] = 0
+        for key in band_keys:
+            self._buckets.setdefault(key, []).append(position)
+        self.chars_after += len(text)
+        return position
+
+    def is_duplicate(self, position):
+        return self._root[position] != position
+
+    def urls(self, position):
+        """All URLs of the chunk at position and its duplicates, first seen first."""
+        return list(self._urls.get(self._root[position], []))
+
+    def duplicates(self, position):
+        """Number of chunks collapsed into the survivor at position."""
+        return self._duplicates.get(position, 0)
+
+    def merged(self):
+        """Positions of the survivors that absorbed at least one duplicate, in order."""
+        return [position for position, count in self._duplicates.items() if count]
+
+    def stats(self):
+        """How much smaller the index gets."""
+        before, after = len(self._root), len(self._signatures)
+        return {"chunks_before": before,
+                "chunks_after": after,
+                "removed": before - after,
+                "reduction": (before - after) / before if before else 0.0,
+                "chars_before": self.chars_before,
+                "chars_after": self.chars_after}
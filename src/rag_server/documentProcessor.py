@@ -1,20 +1,97 @@
 import pandas as pd
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 import ast
-from itertools import zip_longest
-from typing import List, Dict, Tuple
+import csv
+import hashlib
+import sys
+import multiprocessing
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, zip_longest
+from typing import List, Dict, Tuple, Iterator
+
+from src.rag_server.dedup import ChunkDeduplicator, chunk_source_url, make_chunk_id
+from src.rag_server.scraped_data import is_parquet_path, is_team_page_url, iter_page_batches, parse_list_cell
+from src.rag_server.thread_policy import limit_worker_threads
+
+# scraped pages can have very long paragraph cells
+csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+
+_splitters = {}  # (chunk_size, chunk_overlap) -> splitter, per (worker) process
+
+
+def _get_splitter(chunk_size=800, chunk_overlap=150):
+    splitter = _splitters.get((chunk_size, chunk_overlap))
+    if splitter is None:
+        # splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50) # needs improvement
+        splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size,  # larger chunk size, improved overlap
+                                                  chunk_overlap=chunk_overlap,
+                                                  separators=["\n\n", "\n", " ", "", "."])
+        _splitters[(chunk_size, chunk_overlap)] = splitter
+    return splitter
+
+
+def _interleave_row(heads, paras, rooms):
+    """Page text of one row: header -> paragraph -> room number -> header -> ...
+
+    If one list is longer, the remaining items are appended at the end.
+    """
+    interleaved: List[str] = []
+    for h, p, r in zip_longest(heads, paras, rooms, fillvalue=None):
+        if h is not None:
+            interleaved.append(h.strip())
+        if p is not None:
+            interleaved.append(p.strip())
+        if r is not None:
+            interleaved.append(r.strip())
+    return "\n\n".join(interleaved)
+
+
+def _chunk_rows(rows, chunk_size=800, chunk_overlap=150):
+    """Chunks a group of (row_idx, url, page text) rows; runs in the chunking worker processes."""
+    splitter = _get_splitter(chunk_size, chunk_overlap)
+    return [(row_idx, url, splitter.split_text(doc_text)) for row_idx, url, doc_text in rows]
+
+
+def apply_metadata_patches(chunk_stream) -> List[Tuple[str, Dict]]:
+    """Lists a (chunk, metadata) stream with its metadata patches (see
+    DocumentProcessor.iter_combined_chunks_with_rooms) merged into the chunks they address."""
+    pairs, row_of = [], {}
+    for chunk, metadata in chunk_stream:
+        if chunk is None:
+            patch = dict(metadata)
+            pairs[row_of[patch.pop("chunk_id")]][1].update(patch)
+            continue
+        row_of.setdefault(make_chunk_id(chunk_source_url(metadata), chunk), len(pairs))
+        pairs.append((chunk, metadata))
+    return pairs
+
 
 class DocumentProcessor:
     
     """Processes and splits documents into manageable text chunks."""
     
-    def __init__(self, csv_path):
-        """Initializes the processor with csv_path of scrapped data.
+    def __init__(self, data_path, boilerplate_max_page_fraction=None, boilerplate_min_pages=10,
+                 chunk_size=800, chunk_overlap=150, team_pages_only=False):
+        """Initializes the processor with data_path of scrapped data.
 
         Args:
-            csv_path (str): Path to the CSV file containing scraped data.
+            data_path (str): Scraped data: a CSV export, or a Parquet file/dataset (read without parsing).
+            boilerplate_max_page_fraction (float): Headers/paragraphs found on more than this fraction of
+                pages (navigation, "Suche", news teasers) are dropped before chunking; None keeps everything.
+            boilerplate_min_pages (int): Boilerplate detection is skipped for corpora with fewer pages.
+            chunk_size (int): Maximum characters per page chunk.
+            chunk_overlap (int): Characters shared by consecutive chunks of a page.
+            team_pages_only (bool): Only read team member pages (pushed down to the row groups for Parquet).
         """
-        self.csv_path = csv_path
+        self.data_path = data_path
+        self.team_pages_only = team_pages_only
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.boilerplate_max_page_fraction = boilerplate_max_page_fraction
+        self.boilerplate_min_pages = boilerplate_min_pages
+        self._boilerplate = None  # block digests, computed on the first pass over the CSV
+        self.boilerplate_stats = {}
 
     def get_combined_text_chunks(self):
         
@@ -24,7 +101,7 @@ class DocumentProcessor:
             List[str]: List of text chunks.
         """
         
-        df = pd.read_csv(self.csv_path)
+        df = pd.read_csv(self.data_path)
         df["paragraphs"] = df["paragraphs"].apply(eval)
         df["headers"] = df["headers"].apply(eval)
         all_texts = df["paragraphs"].dropna().explode().tolist() + df["headers"].dropna().explode().tolist() # Combine paragraphs and headers
@@ -33,19 +110,7 @@ class DocumentProcessor:
     
     def _parse_list_cell(self, x):
         """this method parses a cell that contains a lists. This is better than eval as earlier used."""
-        if pd.isna(x): # If the cell is NaN, return an empty list
-            return []
-        if isinstance(x, list): # already a list then do nothing
-            return x
-        if isinstance(x, str):
-            try:
-                v = ast.literal_eval(x)
-                if isinstance(v, list):
-                    return v
-                return [str(v)] # if not a list, return as single-item list (fallback)
-            except (ValueError, SyntaxError):
-                return [x]
-        return [str(x)]
+        return parse_list_cell(x)
 
     def get_combined_text_chunks_interleaved(self):
         """
@@ -56,65 +121,151 @@ class DocumentProcessor:
             chunks: List[str]
             metadatas: List[Dict]  # one metadata per chunk (url, row_idx, source='interleaved')
         """
-        df = pd.read_csv(self.csv_path)
+        chunks: List[str] = []
+        metadatas: List[Dict] = []
+        for chunk, metadata in self.iter_text_chunks(workers=0):
+            chunks.append(chunk)
+            metadatas.append(metadata)
+        return chunks, metadatas
 
-        # Ensure required columns exist
-        for col in ("paragraphs", "headers", "room_numbers"):
-            if col not in df.columns:
-                raise KeyError(f"Missing required column: {col}")
+    def _iter_rows(self) -> Iterator[Tuple[int, str, List[str], List[str], List[str]]]:
+        """Streams (row_idx, url, headers, paragraphs, room numbers) from the scraped data, one row at a time."""
+        rows = self._iter_parquet_rows() if is_parquet_path(self.data_path) else self._iter_csv_rows()
+        for i, url, heads, paras, rooms in rows:
+            yield (i, url,
+                   [h for h in heads if isinstance(h, str) and h.strip()],
+                   [p for p in paras if isinstance(p, str) and p.strip()],
+                   [r for r in rooms if isinstance(r, str) and r.strip()])
 
-        # Parse both columns safely into Python lists
-        df["paragraphs"] = df["paragraphs"].apply(self._parse_list_cell)
-        df["headers"] = df["headers"].apply(self._parse_list_cell)
-        df["room_numbers"] = df["room_numbers"].apply(self._parse_list_cell)
+    def _iter_csv_rows(self):
+        with open(self.data_path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            # Ensure required columns exist
+            for col in ("paragraphs", "headers", "room_numbers"):
+                if col not in (reader.fieldnames or []):
+                    raise KeyError(f"Missing required column: {col}")
 
-        # splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50) # needs improvement
-        splitter = RecursiveCharacterTextSplitter(chunk_size=800,  # larger chunk size, improved overlap
-                                                  chunk_overlap=150,
-                                                  separators=["\n\n", "\n", " ", "", "."])
-        
-        chunks: List[str] = []
-        metadatas: List[Dict] = []
+            for i, row in enumerate(reader):
+                url = row.get("url") or None
+                if self.team_pages_only and not is_team_page_url(url):
+                    continue
+                yield (i, url, self._parse_list_cell(row["headers"] or None),
+                       self._parse_list_cell(row["paragraphs"] or None),
+                       self._parse_list_cell(row["room_numbers"] or None))
+
+    def _iter_parquet_rows(self):
+        # native list columns: no parsing, and only the needed columns are read
+        i = 0
+        for batch in iter_page_batches(self.data_path, columns=("url", "headers", "paragraphs", "room_numbers"),
+                                       team_pages_only=self.team_pages_only):
+            columns = batch.to_pydict()
+            for url, heads, paras, rooms in zip(columns["url"], columns["headers"], columns["paragraphs"],
+                                                columns["room_numbers"]):
+                yield i, url or None, heads or [], paras or [], rooms or []
+                i += 1
+
+    @staticmethod
+    def _block_digest(text):
+        return hashlib.blake2b(" ".join(text.lower().split()).encode("utf-8"), digest_size=8).digest()
 
-        # Iterate row-by-row to preserve document boundaries
-        for i, row in df.iterrows():
-            paras: List[str] = [p for p in row["paragraphs"] if isinstance(p, str) and p.strip()]
-            heads: List[str] = [h for h in row["headers"] if isinstance(h, str) and h.strip()]
-            rooms: List[str] = [r for r in row["room_numbers"] if isinstance(r, str) and r.strip()] 
-
-            # --- Interleave strategy ---
-            # We alternate: header -> paragraph -> header -> paragraph ...
-            # If one list is longer, the remaining items are appended at the end.
-            interleaved: List[str] = []
-            for h, p, r in zip_longest(heads, paras, rooms, fillvalue=None):
-                if h or h is not None:
-                    interleaved.append(h.strip())
-                if p or p is not None:
-                    interleaved.append(p.strip())
-                if r or r is not None:
-                    interleaved.append(r.strip())
-
-            # If both were empty, skip
-            if not interleaved:
+    @staticmethod
+    def _page_group(url):
+        """Language section of a page; the English mirror has its own navigation strings."""
+        return "en" if url and "/en/" in url else "default"
+
+    def find_boilerplate(self):
+        """
+        First pass over the scraped data: digests of the headers/paragraphs that occur on more than
+        boilerplate_max_page_fraction of the pages of a language section (German pages and the
+        /en/ mirror are counted separately). Only 8-byte digests are counted, not texts.
+
+        Returns:
+            Set[bytes]: Block digests to drop (empty if disabled or the corpus is too small).
+        """
+        if self._boilerplate is not None:
+            return self._boilerplate
+        self._boilerplate = set()
+        if self.boilerplate_max_page_fraction is None:
+            return self._boilerplate
+
+        block_pages = {}  # group -> Counter(block digest -> pages)
+        group_pages = Counter()
+        for _, url, heads, paras, _ in self._iter_rows():
+            group = self._page_group(url)
+            group_pages[group] += 1
+            block_pages.setdefault(group, Counter()).update({self._block_digest(block) for block in heads + paras})
+        for group, pages in group_pages.items():
+            if pages < self.boilerplate_min_pages:
                 continue
+            max_pages = self.boilerplate_max_page_fraction * pages
+            self._boilerplate.update(digest for digest, count in block_pages[group].items() if count > max_pages)
+        self.boilerplate_stats = {"pages": sum(group_pages.values()),
+                                  "distinct_blocks": len(set().union(*block_pages.values())),
+                                  "boilerplate_blocks": len(self._boilerplate),
+                                  "removed_blocks": 0}
+        return self._boilerplate
 
-            doc_text = "\n\n".join(interleaved)
+    def _iter_page_texts(self) -> Iterator[Tuple[int, str, str]]:
+        """Streams (row_idx, url, interleaved page text) with the boilerplate blocks dropped."""
+        boilerplate = self.find_boilerplate()
+        removed = 0
+        for i, url, heads, paras, rooms in self._iter_rows():
+            if boilerplate:
+                kept_heads = [h for h in heads if self._block_digest(h) not in boilerplate]
+                kept_paras = [p for p in paras if self._block_digest(p) not in boilerplate]
+                removed += len(heads) + len(paras) - len(kept_heads) - len(kept_paras)
+                heads, paras = kept_heads, kept_paras
+            # If all were empty, skip
+            if not (paras or heads or rooms):
+                continue
+            yield i, url, _interleave_row(heads, paras, rooms)
+        if boilerplate:
+            self.boilerplate_stats["removed_blocks"] = removed
+
+    def iter_text_chunks(self, workers=None, rows_per_task=16, max_pending_tasks=None) -> Iterator[Tuple[str, Dict]]:
+        """
+        Streams (chunk, metadata) pairs of the scraped pages, in CSV order.
+
+        Rows are read incrementally and chunked in a process pool; at most max_pending_tasks groups
+        of rows are in flight, so memory stays flat however large the CSV is.
+
+        Args:
+            workers: Chunking processes; 0 chunks in this process, None uses the CPU count.
+            rows_per_task: Rows sent to a worker at once.
+            max_pending_tasks: Row groups in flight (default 2 per worker).
+        """
+        rows = self._iter_page_texts()
+        if workers == 0:
+            while True:
+                group = list(islice(rows, rows_per_task))
+                if not group:
+                    return
+                yield from self._chunk_pairs(_chunk_rows(group, self.chunk_size, self.chunk_overlap))
 
-            # Chunk *this row's* text, this is a list of chunks for this row of type List[str]
-            row_chunks = splitter.split_text(doc_text)
+        workers = workers or multiprocessing.cpu_count()
+        max_pending_tasks = max_pending_tasks or 2 * workers
+        # spawn, not fork: the caller may already run torch / HTTP client threads. Each worker's
+        # OpenMP/BLAS threads follow THREADS["ingest_workers"] so the pool does not oversubscribe the cores.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=limit_worker_threads) as pool:
+            pending = deque()
+            while True:
+                while len(pending) < max_pending_tasks:
+                    group = list(islice(rows, rows_per_task))
+                    if not group:
+                        break
+                    pending.append(pool.submit(_chunk_rows, group, self.chunk_size, self.chunk_overlap))
+                if not pending:
+                    return
+                yield from self._chunk_pairs(pending.popleft().result())
 
-            # Metadata (keeps provenance for retrieval & debugging)
-            url = row["url"] if "url" in df.columns and pd.notna(row["url"]) else None
+    @staticmethod
+    def _chunk_pairs(results):
+        # Metadata (keeps provenance for retrieval & debugging)
+        for row_idx, url, row_chunks in results:
             for c in row_chunks:
-                chunks.append(c)
-                metadatas.append({
-                    "url": url,
-                    "row_idx": int(i),
-                    "source": "interleaved_headers_paragraphs"
-                })
+                yield c, {"url": url, "row_idx": int(row_idx), "source": "interleaved_headers_paragraphs"}
 
-        return chunks, metadatas
-    
     def get_rooms_text_chunks(self, rooms_csv_path):
         """
         Process rooms.csv with full_name, room_number, urls, research_info columns
@@ -170,17 +321,23 @@ class DocumentProcessor:
             print(f"Error occured in get_rooms_text_chunks: {e}")
             return [], []
 
-    def get_combined_chunks_with_rooms(self, rooms_csv_path):
+    def get_combined_chunks_with_rooms(self, rooms_csv_path, deduplicator=None):
         """
         This methods combines both regular document chunks and room information chunks.
 
         Args:
             rooms_csv_path: Optional path to rooms.csv file
+            deduplicator: Optional ChunkDeduplicator, see iter_combined_chunks_with_rooms
 
         Returns:
             chunks: List[str] - all text chunks combined
             metadatas: List[Dict] - all metadata combined
         """
+        if deduplicator is not None:
+            pairs = apply_metadata_patches(self.iter_combined_chunks_with_rooms(rooms_csv_path, workers=0,
+                                                                                deduplicator=deduplicator))
+            return [c for c, _ in pairs], [m for _, m in pairs]
+
         doc_chunks, doc_metadatas = self.get_combined_text_chunks_interleaved() # fetching document chunks
 
         room_chunks, room_metadatas = self.get_rooms_text_chunks(rooms_csv_path)
@@ -189,4 +346,42 @@ class DocumentProcessor:
         all_chunks = doc_chunks + room_chunks
         all_metadatas = doc_metadatas + room_metadatas
         
-        return all_chunks, all_metadatas
\ No newline at end of file
+        return all_chunks, all_metadatas
+
+    def iter_combined_chunks_with_rooms(self, rooms_csv_path, workers=None, deduplicator=None) -> Iterator[Tuple[str, Dict]]:
+        """
+        Streaming variant of get_combined_chunks_with_rooms: (chunk, metadata) pairs of the pages
+        (see iter_text_chunks), followed by the room information chunks.
+
+        With a deduplicator, near-duplicate chunks (German/English mirror pages, people listed on both
+        team pages, shared navigation text) are collapsed in a single pass over the pages: every chunk
+        is checked against the earlier survivors as it is produced, and a survivor is yielded right
+        away, with its own URL in metadata["urls"] and metadata["duplicates"] = 0. Only the signatures
+        and the chunk ids of the survivors are kept. A duplicate found later still adds its URL to the
+        group: after the last chunk, every survivor that absorbed duplicates gets a metadata patch
+        (None, {"chunk_id", "urls", "duplicates"}) with the URLs of the whole group (space separated)
+        and the group size, to be merged into the metadata of that chunk id (see
+        DatabaseHandler.store_documents_stream and apply_metadata_patches). Stats are in
+        deduplicator.stats().
+        """
+        if deduplicator is None:
+            yield from self._iter_combined(rooms_csv_path, workers)
+            return
+
+        chunk_ids = {}  # survivor position -> chunk id, addresses the patches
+        for chunk, metadata in self._iter_combined(rooms_csv_path, workers):
+            url = chunk_source_url(metadata)
+            position = deduplicator.add(chunk, url)
+            if deduplicator.is_duplicate(position):
+                continue
+            chunk_ids[position] = make_chunk_id(url, chunk)
+            yield chunk, {**metadata, "urls": " ".join(deduplicator.urls(position)), "duplicates": 0}
+        for position in deduplicator.merged():
+            yield None, {"chunk_id": chunk_ids[position],
+                         "urls": " ".join(deduplicator.urls(position)),
+                         "duplicates": deduplicator.duplicates(position)}
+
+    def _iter_combined(self, rooms_csv_path, workers):
+        yield from self.iter_text_chunks(workers=workers)
+        room_chunks, room_metadatas = self.get_rooms_text_chunks(rooms_csv_path)
+        yield from zip(room_chunks, room_metadatas)
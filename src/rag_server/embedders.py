@@ -0,0 +1,220 @@
+"""Embedding model backends of DatabaseHandler.
+
+Both backends expose the subset of SentenceTransformer.encode the handler uses
+(encode(texts, batch_size, normalize_embeddings, show_progress_bar) -> np.ndarray), so
+prefixing, caching and batching stay in DatabaseHandler:
+
+- "sentence_transformers": the PyTorch model, as before.
+- "onnx": an int8-quantized ONNX Runtime export of the same model (no torch at runtime,
+  a fraction of the RSS). Export it once with::
+
+    python -m src.rag_server.embedders export --model intfloat/multilingual-e5-base \\
+        --output ./src/rag_server/onnx/multilingual-e5-base
+"""
+import argparse
+import inspect
+import json
+import os
+
+import numpy as np
+
+from src.rag_server.thread_policy import configure_torch, subsystem_threads
+
+EXPORT_CONFIG_FILE = "embedder.json"
+BACKENDS = ("sentence_transformers", "onnx")
+
+
+def embedding_id(backend, model_name, onnx_model_dir=None):
+    """Identity of the vectors a backend produces; caches and index versions are keyed on it.
+
+    The PyTorch backend keeps the plain model name (existing indexes stay valid); ONNX int8
+    vectors are close to but not identical with them, so they get their own id.
+    """
+    if backend == "onnx":
+        quantization = OnnxEmbedder.read_export_config(onnx_model_dir).get("quantization") or "fp32"
+        return f"{model_name}+onnx-{quantization}"
+    return model_name
+
+
+def create_embedder(backend, model_name, onnx_model_dir=None, threads=None):
+    """Loads the embedding model for a backend.
+
+    Args:
+        backend (str): "sentence_transformers" or "onnx".
+        model_name (str): Hugging Face model name (must match the export for "onnx").
+        onnx_model_dir (str): Directory written by export_onnx.
+        threads (int): Intra-op threads; None uses the THREADS["embedding"] policy.
+    """
+    policy = subsystem_threads("embedding")
+    intra_op, inter_op = threads or policy["intra_op"], policy["inter_op"]
+    if backend == "sentence_transformers":
+        from sentence_transformers import SentenceTransformer
+        configure_torch(intra_op, inter_op)
+        return SentenceTransformer(model_name)
+    if backend == "onnx":
+        if not onnx_model_dir:
+            raise ValueError("The onnx embedding backend needs onnx_model_dir (see export_onnx)")
+        embedder = OnnxEmbedder(onnx_model_dir, threads=intra_op, inter_op_threads=inter_op)
+        if embedder.source_model != model_name:
+            raise ValueError(f"ONNX export in {onnx_model_dir} is of {embedder.source_model}, not {model_name}")
+        return embedder
+    raise ValueError(f"Unknown embedding backend: {backend} (expected one of {BACKENDS})")
+
+
+class OnnxEmbedder:
+
+    """Sentence embeddings from an ONNX Runtime export of a SentenceTransformer model.
+
+    Runs the exported transformer, then applies the model's pooling (mean or CLS) and the
+    optional L2 normalization in numpy. Texts are length-sorted per call so each batch is
+    padded only to its own longest text.
+    """
+
+    def __init__(self, model_dir, threads=None, inter_op_threads=None):
+        """Loads the export (model file, tokenizer and embedder.json) from model_dir.
+
+        Args:
+            model_dir (str): Directory written by export_onnx.
+            threads (int): ONNX Runtime intra-op threads; None lets ONNX Runtime decide.
+            inter_op_threads (int): ONNX Runtime inter-op threads; None lets ONNX Runtime decide.
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        export = self.read_export_config(model_dir)
+        self.source_model = export["source_model"]
+        self.pooling = export["pooling"]
+        self.max_seq_length = export["max_seq_length"]
+        self.quantization = export.get("quantization")
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.no_padding()  # padded per batch in encode
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        if inter_op_threads:
+            options.inter_op_num_threads = inter_op_threads
+        self.session = ort.InferenceSession(os.path.join(model_dir, export["model_file"]), options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.pad_token_id = export.get("pad_token_id", 0)
+
+    @staticmethod
+    def read_export_config(model_dir):
+        with open(os.path.join(model_dir, EXPORT_CONFIG_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def get_sentence_embedding_dimension(self):
+        return self.session.get_outputs()[0].shape[-1]
+
+    def encode(self, sentences, batch_size=32, normalize_embeddings=False, show_progress_bar=False, **kwargs):
+        """Embeds sentences like SentenceTransformer.encode (numpy output)."""
+        if isinstance(sentences, str):
+            return self.encode([sentences], batch_size, normalize_embeddings)[0]
+        encodings = self.tokenizer.encode_batch(list(sentences))
+        order = sorted(range(len(encodings)), key=lambda i: len(encodings[i].ids))
+        embeddings = [None] * len(encodings)
+        for start in range(0, len(order), batch_size):
+            batch = [encodings[i] for i in order[start:start + batch_size]]
+            for i, embedding in zip(order[start:start + batch_size], self._embed_batch(batch)):
+                embeddings[i] = embedding
+        result = np.asarray(embeddings, dtype=np.float32)
+        if normalize_embeddings and len(result):
+            result /= np.maximum(np.linalg.norm(result, axis=1, keepdims=True), 1e-12)
+        return result
+
+    def _embed_batch(self, encodings):
+        length = max(len(e.ids) for e in encodings)
+        input_ids = np.full((len(encodings), length), self.pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros((len(encodings), length), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask,
+                 "token_type_ids": np.zeros_like(input_ids)}
+        hidden = self.session.run(None, {name: feeds[name] for name in self.input_names})[0]
+        if self.pooling == "cls":
+            return hidden[:, 0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+
+def export_onnx(model_name, output_dir, quantize=True, opset=17):
+    """Exports a SentenceTransformer model to ONNX and (by default) quantizes it to int8.
+
+    Only the transformer runs in ONNX Runtime; the pooling mode is read from the SentenceTransformer
+    modules and applied by OnnxEmbedder (normalization is requested per encode call, as with
+    SentenceTransformer). Needs torch, sentence-transformers and onnxruntime at export time only.
+
+    Returns:
+        str: Path of the model file OnnxEmbedder loads.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(output_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer, pooling = st_model[0], st_model[1]
+    # get_pooling_mode_str() before sentence-transformers 6, the pooling_mode attribute since
+    pooling_mode = pooling.get_pooling_mode_str() if hasattr(pooling, "get_pooling_mode_str") else pooling.pooling_mode
+    if pooling_mode not in ("mean", "cls"):
+        raise ValueError(f"Unsupported pooling mode for the ONNX backend: {pooling_mode}")
+    tokenizer = transformer.tokenizer
+    sample = tokenizer(["query: export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class _HiddenStates(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    # the TorchScript exporter: newer torch defaults to the dynamo one, which does not take dynamic_axes
+    legacy = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(_HiddenStates(transformer.auto_model.eval()), tuple(sample[n] for n in input_names),
+                          fp32_path, input_names=input_names, output_names=["last_hidden_state"],
+                          dynamic_axes=dynamic_axes, opset_version=opset, **legacy)
+    tokenizer.save_pretrained(output_dir)  # tokenizer.json is all OnnxEmbedder needs
+
+    model_file = "model.onnx"
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, os.path.join(output_dir, "model_int8.onnx"), weight_type=QuantType.QInt8)
+        model_file = "model_int8.onnx"
+
+    with open(os.path.join(output_dir, EXPORT_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump({"source_model": model_name,
+                   "model_file": model_file,
+                   "quantization": "int8" if quantize else None,
+                   "pooling": pooling_mode,
+                   "max_seq_length": st_model.max_seq_length,
+                   "pad_token_id": tokenizer.pad_token_id or 0}, f, indent=2)
+    return os.path.join(output_dir, model_file)
+
+
+def main():
+    from src.rag_server import config
+
+    parser = argparse.ArgumentParser(description="Export an embedding model for the ONNX backend.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="export + int8-quantize a SentenceTransformer model")
+    export.add_argument("--model", default=config.EMBEDDING_MODEL_NAME)
+    export.add_argument("--output", default=config.EMBEDDING_BACKEND["onnx_model_dir"])
+    export.add_argument("--no-quantize", action="store_true", help="keep the fp32 ONNX model")
+    args = parser.parse_args()
+
+    path = export_onnx(args.model, args.output, quantize=not args.no_quantize)
+    print(f"Exported {args.model} to {path}")
+
+
+if __name__ == "__main__":
+    main()
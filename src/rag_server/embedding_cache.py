@@ -0,0 +1,250 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_query_text(text):
+    """Normalizes a (prefixed) query so trivially different spellings of the same turn share a cache entry."""
+    text = unicodedata.normalize("NFC", text or "")
+    return " ".join(text.split())
+
+
+class QueryEmbeddingCache:
+
+    """Bounded in-memory LRU cache of normalized query embeddings.
+
+    Entries are keyed on (model name, normalized prefixed query text) and expire after a TTL.
+    The cache remembers which embedding model filled it and clears itself when it is
+    used with a different model, so vectors from two models are never mixed.
+    """
+
+    def __init__(self, max_size=512, ttl_seconds=3600):
+        """Initializes an empty cache.
+
+        Args:
+            max_size (int): Maximum number of cached embeddings (least recently used are evicted).
+            ttl_seconds (float): Lifetime of an entry in seconds; None or 0 disables expiry.
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (created_at, vector)
+        self._model_name = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_model(self, model_name):
+        """Drops every entry if the cache is now used with another embedding model."""
+        if self._model_name != model_name:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._model_name = model_name
+
+    def get(self, model_name, text):
+        """Returns the cached vector for the query, or None on a miss."""
+        key = (model_name, normalize_query_text(text))
+        with self._lock:
+            self._check_model(model_name)
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, model_name, text, vector):
+        """Stores a normalized embedding vector for the query."""
+        key = (model_name, normalize_query_text(text))
+        vector = np.asarray(vector, dtype=np.float32)
+        vector.setflags(write=False)  # shared between callers, must not be modified in place
+        with self._lock:
+            self._check_model(model_name)
+            self._entries[key] = (time.monotonic(), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Removes all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Returns hit/miss counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._entries),
+                    "max_size": self.max_size,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "evictions": self.evictions,
+                    "invalidations": self.invalidations,
+                    "model_name": self._model_name}
+
+
+class PassageEmbeddingCache:
+
+    """Persistent SQLite cache of passage (chunk) embeddings.
+
+    Vectors are stored as float16 blobs under sha256(model name + prefixed text), so a
+    re-ingest or a chunking experiment only encodes texts the model has never seen, and
+    vectors of different models never mix. When the blobs exceed max_bytes, the least
+    recently used entries are deleted down to 90% of the limit.
+    """
+
+    # SQLite limits the number of bound parameters per statement
+    _LOOKUP_BATCH = 500
+
+    def __init__(self, path, max_bytes=256 * 2**20):
+        """Opens (or creates) the cache database.
+
+        Args:
+            path (str): SQLite file.
+            max_bytes (int): Maximum total size of the stored vectors; None or 0 disables eviction.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)  # used by the ingest threads
+        self._conn.execute("PRAGMA journal_mode=WAL")  # the guide process and the CLI may share the file
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings ("
+                           "key BLOB PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, "
+                           "vector BLOB NOT NULL, last_used REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._bytes = self._stored_bytes()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(model_name, text):
+        return hashlib.sha256(f"{model_name}\n{text}".encode("utf-8")).digest()
+
+    def _stored_bytes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model_name, texts):
+        """Cached vectors (float32) for the prefixed texts, None for misses."""
+        keys = [self._key(model_name, text) for text in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), self._LOOKUP_BATCH):
+                batch = keys[start:start + self._LOOKUP_BATCH]
+                rows = self._conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN "
+                                          f"({','.join('?' * len(batch))})", batch).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return [np.frombuffer(found[key], dtype=np.float16).astype(np.float32) if key in found else None
+                for key in keys]
+
+    def put_many(self, model_name, texts, vectors):
+        """Stores the vectors of the prefixed texts, then evicts if the cache is over its size limit."""
+        now = time.time()
+        rows = [(self._key(model_name, text), model_name, len(vector),
+                 np.asarray(vector, dtype=np.float16).tobytes(), now) for text, vector in zip(texts, vectors)]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, model, dim, vector, last_used) "
+                                   "VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+            self._bytes += sum(len(row[3]) for row in rows)
+            if self.max_bytes and self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Deletes least recently used entries until the vectors fit into 90% of max_bytes."""
+        self._bytes = self._stored_bytes()  # other processes may have written or evicted
+        excess = self._bytes - int(self.max_bytes * 0.9)
+        if excess <= 0:
+            return
+        doomed, freed = [], 0
+        for key, size in self._conn.execute("SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", doomed)
+        self._conn.commit()
+        self._bytes -= freed
+        self.evictions += len(doomed)
+
+    def clear(self, model_name=None):
+        """Deletes every entry, or only those of one model."""
+        with self._lock:
+            if model_name is None:
+                self._conn.execute("DELETE FROM embeddings")
+            else:
+                self._conn.execute("DELETE FROM embeddings WHERE model = ?", (model_name,))
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+            self._bytes = self._stored_bytes()
+
+    def stats(self):
+        """Entry and size counts per model, plus this session's hit/miss counters."""
+        with self._lock:
+            models = {model: {"entries": entries, "dim": dim, "mb": round(size / 2**20, 2)}
+                      for model, entries, dim, size in self._conn.execute(
+                          "SELECT model, COUNT(*), MAX(dim), SUM(LENGTH(vector)) FROM embeddings GROUP BY model")}
+            lookups = self.hits + self.misses
+            return {"path": self.path,
+                    "entries": sum(m["entries"] for m in models.values()),
+                    "mb": round(self._bytes / 2**20, 2),
+                    "max_mb": round(self.max_bytes / 2**20, 2) if self.max_bytes else None,
+                    "file_mb": round(sum(os.path.getsize(f) for f in (self.path, f"{self.path}-wal")
+                                         if os.path.exists(f)) / 2**20, 2),
+                    "models": models,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "evictions": self.evictions}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    from src.rag_server import config
+
+    parser = argparse.ArgumentParser(description="Inspect or clear the on-disk passage embedding cache.")
+    parser.add_argument("command", choices=("stats", "clear"))
+    parser.add_argument("--path", default=config.EMBEDDING_CACHE["path"])
+    parser.add_argument("--model", help="clear only the entries of this embedding model")
+    args = parser.parse_args()
+
+    cache = PassageEmbeddingCache(args.path, max_bytes=config.EMBEDDING_CACHE["max_mb"] * 2**20)
+    if args.command == "clear":
+        cache.clear(args.model)
+    print(json.dumps(cache.stats(), indent=2))
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""HTML parser backends of TextScraper: one parse and one pass over the tree per page.
+
+TextScraper used to parse every page with BeautifulSoup's pure-Python html.parser and then
+walk the tree once per field (find_all("p"), the headings, soup.text, get_text for room
+numbers, the h1, the research section). extract_page parses once and collects paragraphs,
+headings, the h1 and links in a single traversal; the page text (phone and room numbers)
+and the research section come from the same tree. All patterns are compiled once.
+
+Backends (SCRAPE["html_parser"]):
+
+- "bs4": BeautifulSoup with html.parser, the reference (extracts what TextScraper always did).
+- "lxml": libxml2's HTML parser; text is collected with a compiled XPath.
+- "selectolax": the lexbor HTML5 parser; the traversal is a single CSS selector query.
+
+Text follows BeautifulSoup's get_text on every backend: script, style and template text
+and comments are skipped, text nodes are stripped and joined with a space. The parsers repair
+broken markup differently, so a page's extraction (and content hash) can differ slightly
+between backends. Compare speed and agreement on a recorded crawl fixture with::
+
+    python -m benchmarks.html_extraction_benchmark ./crawl_fixture
+"""
+import re
+from functools import lru_cache
+from urllib.parse import urljoin
+
+BACKENDS = ("bs4", "lxml", "selectolax")
+
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+SECTION_TAGS = frozenset({"p", "ul", "ol", "li", "div"})  # research section content after its heading
+PHONE_PATTERN = re.compile(r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}')
+ROOM_PATTERN = re.compile(r'\b(?:Raum|Room)\s*:?\s*([0-9]{1,3}\.[0-9]{1,3})\b', re.IGNORECASE)  # Raum 2.116, Room:2.116
+RESEARCH_HEADING_PATTERN = re.compile(r"research|forschung|interests", re.IGNORECASE)
+RESEARCH_PARAGRAPH_PATTERN = re.compile(r"research|forschung", re.IGNORECASE)
+
+_HEADING_SET = frozenset(HEADING_TAGS)
+_SKIPPED_TEXT_TAGS = ("script", "style", "template")  # BeautifulSoup's get_text leaves their text out
+
+
+def available_backends():
+    """Backends whose parser library is installed."""
+    available = []
+    for backend, module in (("bs4", "bs4"), ("lxml", "lxml.html"), ("selectolax", "selectolax.lexbor")):
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        available.append(backend)
+    return available
+
+
+def extract_page(html, url, backend="bs4", team_page=False):
+    """Parses a page once and extracts everything TextScraper stores of it.
+
+    Args:
+        html (str): Decoded page.
+        url (str): Page URL, to resolve relative links.
+        backend (str): "bs4", "lxml" or "selectolax".
+        team_page (bool): Also extract room numbers, the full name (h1) and the research section.
+
+    Returns:
+        dict: {"paragraphs", "headers", "phone_numbers", "room_numbers", "full_name", "research_info",
+        "links"}; links are absolute and deduplicated, in page order.
+    """
+    if backend == "bs4":
+        parts = _parse_bs4(html, team_page)
+    elif backend == "lxml":
+        parts = _parse_lxml(html, team_page)
+    elif backend == "selectolax":
+        parts = _parse_selectolax(html, team_page)
+    else:
+        raise ValueError(f"Unknown HTML parser backend: {backend} (expected one of {BACKENDS})")
+    strings = parts["strings"]
+    room_numbers = []
+    if team_page:
+        room_numbers = list(dict.fromkeys(m.group(1) for m in ROOM_PATTERN.finditer(_join_stripped(strings))))
+    return {"paragraphs": parts["paragraphs"],
+            "headers": parts["headers"],
+            "phone_numbers": PHONE_PATTERN.findall("".join(strings)),
+            "room_numbers": room_numbers,
+            "full_name": parts["full_name"],
+            "research_info": parts["research_info"],
+            "links": list(dict.fromkeys(urljoin(url, href) for href in parts["hrefs"]))}
+
+
+def _join_stripped(strings, separator=" "):
+    """get_text(separator, strip=True) of a node's text strings."""
+    return separator.join(s for s in (s.strip() for s in strings) if s)
+
+
+def _parts(paragraphs, headers, strings, hrefs, full_name="", research_info=""):
+    return {"paragraphs": paragraphs, "headers": headers, "strings": strings, "hrefs": hrefs,
+            "full_name": full_name, "research_info": research_info}
+
+
+# --- BeautifulSoup (html.parser) ---
+
+def _parse_bs4(html, team_page):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    paragraphs, headings, hrefs, h1 = [], [], [], None
+    for tag in soup.find_all(("p", "a") + HEADING_TAGS):
+        name = tag.name
+        if name == "p":
+            paragraphs.append(tag.get_text(" ", strip=True))
+        elif name == "a":
+            href = tag.get("href")
+            if href is not None:
+                hrefs.append(href)
+        else:
+            headings.append((tag, tag.get_text(" ", strip=True)))
+            if h1 is None and name == "h1":
+                h1 = tag
+    parts = _parts(paragraphs, [text for _, text in headings], list(soup.strings), hrefs)
+    if team_page:
+        parts["full_name"] = h1.get_text(strip=True) if h1 is not None else ""
+        parts["research_info"] = _research_bs4(soup, headings)
+    return parts
+
+
+def _research_bs4(soup, headings):
+    heading = next((tag for tag, text in headings if RESEARCH_HEADING_PATTERN.search(text)), None)
+    if heading is None:
+        # Fallback: the first paragraph mentioning research
+        p = soup.find("p", string=RESEARCH_PARAGRAPH_PATTERN)
+        return p.get_text(" ", strip=True) if p else ""
+    section = []
+    for sibling in heading.next_siblings:
+        name = getattr(sibling, "name", None)
+        if name in _HEADING_SET:
+            break
+        if name in SECTION_TAGS:
+            section.append(sibling.get_text(" ", strip=True))
+    return " ".join(s for s in section if s)
+
+
+# --- lxml ---
+
+@lru_cache(maxsize=None)
+def _lxml_text_xpath():
+    from lxml import etree
+
+    return etree.XPath("descendant-or-self::text()[not(" +
+                       " or ".join(f"ancestor::{t}" for t in _SKIPPED_TEXT_TAGS) + ")]")
+
+
+def _lxml_text(el):
+    """Text strings of an element, like BeautifulSoup's tag.strings (compiled XPath, no Python walk)."""
+    return _lxml_text_xpath()(el)
+
+
+def _parse_lxml(html, team_page):
+    import lxml.html
+    from lxml import etree
+
+    try:
+        root = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):  # empty document
+        return _parts([], [], [], [])
+    paragraphs, headings, hrefs, h1 = [], [], [], None
+    for el in root.iter(("p", "a") + HEADING_TAGS):
+        tag = el.tag
+        if tag == "p":
+            paragraphs.append(_join_stripped(_lxml_text(el)))
+        elif tag == "a":
+            href = el.get("href")
+            if href is not None:
+                hrefs.append(href)
+        else:
+            headings.append((el, _join_stripped(_lxml_text(el))))
+            if h1 is None and tag == "h1":
+                h1 = el
+    parts = _parts(paragraphs, [text for _, text in headings], _lxml_text(root), hrefs)
+    if team_page:
+        parts["full_name"] = _join_stripped(_lxml_text(h1), "") if h1 is not None else ""
+        parts["research_info"] = _research_lxml(root, headings)
+    return parts
+
+
+def _research_lxml(root, headings):
+    heading = next((el for el, text in headings if RESEARCH_HEADING_PATTERN.search(text)), None)
+    if heading is None:
+        for p in root.iter("p"):
+            string = _lxml_single_string(p)
+            if string is not None and RESEARCH_PARAGRAPH_PATTERN.search(string):
+                return _join_stripped(_lxml_text(p))
+        return ""
+    section = []
+    for sibling in heading.itersiblings():
+        tag = sibling.tag if isinstance(sibling.tag, str) else None  # comments have a function as tag
+        if tag in _HEADING_SET:
+            break
+        if tag in SECTION_TAGS:
+            section.append(_join_stripped(_lxml_text(sibling)))
+    return " ".join(s for s in section if s)
+
+
+def _lxml_single_string(el):
+    """BeautifulSoup's tag.string: the text of an element whose content is a single string."""
+    while True:
+        children = list(el)
+        if not children:
+            return el.text
+        if el.text or len(children) > 1 or children[0].tail:
+            return None
+        el = children[0]
+        if not isinstance(el.tag, str):  # a lone comment
+            return el.text
+
+
+# --- selectolax (lexbor) ---
+
+_SELECTOLAX_QUERY = ", ".join(("p", "a[href]") + HEADING_TAGS)
+_NODE_SEPARATOR = "\x00"  # parsers replace NUL in documents, so it cannot occur in a text node
+
+
+def _selectolax_strings(node):
+    return node.text(deep=True, separator=_NODE_SEPARATOR).split(_NODE_SEPARATOR)
+
+
+def _parse_selectolax(html, team_page):
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(list(_SKIPPED_TEXT_TAGS))
+    paragraphs, headings, hrefs, h1 = [], [], [], None
+    for node in tree.css(_SELECTOLAX_QUERY):  # one traversal, matches in document order
+        tag = node.tag
+        if tag == "p":
+            paragraphs.append(_join_stripped(_selectolax_strings(node)))
+        elif tag == "a":
+            hrefs.append(node.attributes["href"] or "")
+        else:
+            headings.append((node, _join_stripped(_selectolax_strings(node))))
+            if h1 is None and tag == "h1":
+                h1 = node
+    parts = _parts(paragraphs, [text for _, text in headings],
+                   _selectolax_strings(tree.root) if tree.root is not None else [], hrefs)
+    if team_page:
+        parts["full_name"] = _join_stripped(_selectolax_strings(h1), "") if h1 is not None else ""
+        parts["research_info"] = _research_selectolax(tree, headings)
+    return parts
+
+
+def _research_selectolax(tree, headings):
+    heading = next((node for node, text in headings if RESEARCH_HEADING_PATTERN.search(text)), None)
+    if heading is None:
+        for p in tree.css("p"):
+            string = _selectolax_single_string(p)
+            if string is not None and RESEARCH_PARAGRAPH_PATTERN.search(string):
+                return _join_stripped(_selectolax_strings(p))
+        return ""
+    section = []
+    sibling = heading.next
+    while sibling is not None:
+        tag = sibling.tag
+        if tag in _HEADING_SET:
+            break
+        if tag in SECTION_TAGS:
+            section.append(_join_stripped(_selectolax_strings(sibling)))
+        sibling = sibling.next
+    return " ".join(s for s in section if s)
+
+
+def _selectolax_single_string(node):
+    """BeautifulSoup's tag.string: the text of an element whose content is a single string."""
+    while True:
+        children = list(node.iter(include_text=True))
+        if len(children) != 1:
+            return None
+        node = children[0]
+        if node.tag == "-text":
+            return node.text_content
+        if node.tag == "-comment":
+            return node.comment_content
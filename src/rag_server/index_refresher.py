@@ -0,0 +1,214 @@
+"""Background re-scrape and re-index of the IAS knowledge base.
+
+Scraping and embedding never run inside a user's turn. The refresh either runs
+in a daemon thread of the guide process (``IndexRefresher.start``) or as a
+separate process, e.g. from cron::
+
+    python -m src.rag_server.index_refresher --once
+
+A refresh crawls into a staging directory, moves the finished CSV/JSON files
+into ``SCRAPE['data_dir']`` and builds a new collection version with
+``DatabaseHandler.refresh_documents``. Queries keep hitting the old collection
+until the new one is published; a guide process running next to the CLI picks
+the published version up through ``DatabaseHandler.reload_active_collection``.
+"""
+import os
+import shutil
+import threading
+import time
+
+from src.rag_server.databaseHandler import DatabaseHandler
+from src.rag_server.page_cache import PageCache
+from src.rag_server.text_scraper import (make_scraper, make_document_processor, make_deduplicator,
+                                         log_boilerplate_stats, log_dedup_stats)
+
+# files produced by TextScraper that are moved from staging into the data dir
+_SCRAPE_OUTPUT_FILES = ("scraped_data.json", "scraped_data.parquet", "scraped_data.csv", "rooms.json", "rooms.csv",
+                        "page_changes.json")
+
+
+class IndexRefresher:
+
+    """Runs scrape + re-index off the query path, on demand or on a schedule."""
+
+    def __init__(self, get_handler, config, logger, interval_hours=24, follow_seconds=60,
+                 keep_versions=1, on_published=None, chunk_workers=0):
+        """Initializes the refresher.
+
+        Args:
+            get_handler (Callable[[], DatabaseHandler]): Returns the (shared) database handler.
+            config (module): The rag_server config module (paths, SCRAPE settings).
+            interval_hours (float): Time between scheduled refreshes; None or 0 only follows published versions.
+            follow_seconds (float): How often to check for a collection published by another process.
+            keep_versions (int): Number of previous collection versions kept after publishing.
+            on_published (Callable[[Dict], None]): Called with the refresh stats after a new version is live.
+            chunk_workers (int): Chunking processes. Keep 0 inside the guide process: spawned workers
+                re-import its __main__ (audio and LLM setup); the CLI uses INGEST['chunk_workers'].
+        """
+        self.get_handler = get_handler
+        self.config = config
+        self.logger = logger
+        self.interval_hours = interval_hours
+        self.follow_seconds = follow_seconds
+        self.keep_versions = keep_versions
+        self.on_published = on_published
+        self.chunk_workers = chunk_workers
+        self._stop = threading.Event()
+        self._run_now = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+
+    def refresh_once(self, scrape=True):
+        """Scrapes (optionally) and publishes a new collection version.
+
+        With SCRAPE['incremental'], a crawl that found no added, changed or removed page keeps the
+        active collection (re-index with scrape=False to rebuild it anyway), unless the page cache
+        still holds changes of an earlier crawl that were never published (its re-index failed).
+
+        Returns:
+            Dict: Refresh stats from DatabaseHandler.refresh_documents ({} if no page changed), or None if a
+            refresh is already running.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            self.logger.info("[IndexRefresher] Refresh already running, skipped.")
+            return None
+        try:
+            start = time.perf_counter()
+            if scrape:
+                changes = self._scrape()
+                if changes is not None and not (changes["added"] or changes["changed"] or changes["removed"]):
+                    if not changes["unindexed"]:
+                        self.logger.info(f"[IndexRefresher] No page changed since the last crawl "
+                                         f"({changes['unchanged']} unchanged), keeping the active collection.")
+                        return {}
+                    self.logger.info("[IndexRefresher] No page changed since the last crawl, but its changes "
+                                     "were never indexed, re-indexing.")
+            data_processor = make_document_processor(self.config)
+            deduplicator = make_deduplicator(self.config)
+            chunk_stream = data_processor.iter_combined_chunks_with_rooms(self.config.ROOMS_CSV_PATH,
+                                                                          workers=self.chunk_workers,
+                                                                          deduplicator=deduplicator)
+            stats = self.get_handler().refresh_documents_stream(chunk_stream,
+                                                                log_every_batches=self.config.INGEST["log_every_batches"],
+                                                                keep_versions=self.keep_versions,
+                                                                queue_batches=self.config.INGEST["queue_batches"])
+            self._mark_indexed()
+            log_boilerplate_stats(data_processor, self.logger)
+            if deduplicator is not None:
+                log_dedup_stats(deduplicator, self.logger)
+            self.logger.info(f"[IndexRefresher] Refresh finished in {time.perf_counter() - start:.1f}s")
+            if self.on_published:
+                self.on_published(stats)
+            return stats
+        finally:
+            self._refresh_lock.release()
+
+    def _mark_indexed(self):
+        """Clears the page cache's unindexed mark; only called once the new collection is published."""
+        if not self.config.SCRAPE["incremental"]:
+            return
+        page_cache = PageCache(self.config.SCRAPE["page_cache_path"])
+        try:
+            page_cache.mark_indexed()
+        finally:
+            page_cache.close()
+
+    def _scrape(self):
+        """Crawls into a staging dir and moves the finished files into the data dir (one os.replace per file).
+
+        A crawl interrupted by a crash or restart left its checkpoint in the staging dir and resumes from it.
+
+        Returns:
+            Dict: The crawl's page changes (see TextScraper.page_changes) and "unindexed" (the page cache
+            has changes no published collection contains yet), None without a page cache.
+        """
+        data_dir = self.config.SCRAPE["data_dir"]
+        staging_dir = f"{data_dir.rstrip(os.sep)}.staging"
+        scraper = make_scraper(self.config, staging_dir)
+        self.logger.info("[IndexRefresher] Starting web scraping...")
+        scraper.scrape(resume=True)
+        scraper.save(self.config.SCRAPE["formats"])
+        os.makedirs(data_dir, exist_ok=True)
+        for name in _SCRAPE_OUTPUT_FILES:
+            src_path, dst_path = os.path.join(staging_dir, name), os.path.join(data_dir, name)
+            if os.path.exists(src_path):
+                os.replace(src_path, dst_path)
+            elif name.startswith("scraped_data.") and os.path.exists(dst_path):
+                os.remove(dst_path)  # a format that is no longer written must not shadow the new data
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        self.logger.info(f"[IndexRefresher] Web scraping completed, {len(scraper.scraped_data)} pages.")
+        if scraper.page_cache is None:
+            return None
+        changes = {**scraper.page_changes, "unindexed": scraper.page_cache.has_unindexed_changes()}
+        self.logger.info(f"[IndexRefresher] Page changes: {len(changes['added'])} added, {len(changes['changed'])} "
+                         f"changed, {len(changes['removed'])} removed, {changes['unchanged']} unchanged "
+                         f"({scraper.crawl_stats['not_modified']} not modified responses)")
+        return changes
+
+    def trigger(self):
+        """Asks the background thread to refresh as soon as possible."""
+        self._run_now.set()
+
+    def start(self, run_now=False):
+        """Starts the scheduler daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if run_now:
+            self._run_now.set()
+        self._thread = threading.Thread(target=self._loop, name="index-refresher", daemon=True)
+        self._thread.start()
+        self.logger.info(f"[IndexRefresher] Started (interval: {self.interval_hours}h, follow: {self.follow_seconds}s)")
+
+    def stop(self):
+        self._stop.set()
+        self._run_now.set()
+
+    def _loop(self):
+        next_refresh = time.monotonic() + self.interval_hours * 3600 if self.interval_hours else None
+        while not self._stop.is_set():
+            self._run_now.wait(timeout=self.follow_seconds)
+            if self._stop.is_set():
+                break
+            due = next_refresh is not None and time.monotonic() >= next_refresh
+            try:
+                if self._run_now.is_set() or due:
+                    self._run_now.clear()
+                    self.refresh_once()
+                    if self.interval_hours:
+                        next_refresh = time.monotonic() + self.interval_hours * 3600
+                elif self.get_handler().reload_active_collection() and self.on_published:
+                    self.on_published({})
+            except Exception as e:
+                self.logger.error(f"[IndexRefresher] Refresh failed, old collection stays active: {e}")
+
+
+def main():
+    import argparse
+    from src.rag_server import config
+    from src.logger import set_logger
+
+    parser = argparse.ArgumentParser(description="Re-scrape and re-index the IAS knowledge base.")
+    parser.add_argument("--once", action="store_true", help="run a single refresh and exit")
+    parser.add_argument("--no-scrape", action="store_true", help="re-index the existing CSV files only")
+    parser.add_argument("--interval-hours", type=float, default=config.REFRESH["interval_hours"])
+    args = parser.parse_args()
+
+    logger = set_logger("RAG_Server")
+    handler = DatabaseHandler.from_config(config, logger)
+    refresher = IndexRefresher(lambda: handler, config, logger,
+                               interval_hours=args.interval_hours,
+                               keep_versions=config.REFRESH["keep_versions"],
+                               chunk_workers=config.INGEST["chunk_workers"])
+    if args.once:
+        refresher.refresh_once(scrape=not args.no_scrape)
+        return
+    while True:
+        try:
+            refresher.refresh_once(scrape=not args.no_scrape)
+        except Exception as e:
+            logger.error(f"[IndexRefresher] Refresh failed, old collection stays active: {e}")
+        time.sleep(args.interval_hours * 3600)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""On-disk cache of crawled pages for incremental re-crawls.
+
+For every scraped URL the cache keeps the response validators (ETag, Last-Modified), the
+content hash and what TextScraper extracted from the page (page data, outgoing links and
+room record). A re-crawl sends conditional requests; a 304 Not Modified page is restored
+from the cache without downloading or parsing it, and its links still feed the frontier.
+
+Storing a new or changed page, or deleting one, also marks the cache as ahead of the index
+(in the same transaction); IndexRefresher clears the mark once a collection built from the
+crawl is published. A refresh whose crawl finds nothing new still re-indexes while the mark
+is set, so a failed re-index is retried instead of being hidden behind 304s.
+
+Inspect or clear it with::
+
+    python -m src.rag_server.page_cache stats
+    python -m src.rag_server.page_cache clear
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+
+class PageCache:
+
+    """Persistent SQLite cache of crawled pages, keyed by normalized URL."""
+
+    def __init__(self, path):
+        """Opens (or creates) the cache database.
+
+        Args:
+            path (str): SQLite file.
+        """
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS pages ("
+                           "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content_hash TEXT NOT NULL, "
+                           "page TEXT NOT NULL, links TEXT NOT NULL, room TEXT, fetched_at REAL NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+    def get(self, url):
+        """Cached entry of a URL ({"etag", "last_modified", "content_hash", "page", "links", "room"}) or None."""
+        row = self._conn.execute("SELECT etag, last_modified, content_hash, page, links, room FROM pages "
+                                 "WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, content_hash, page, links, room = row
+        return {"etag": etag, "last_modified": last_modified, "content_hash": content_hash,
+                "page": json.loads(page), "links": json.loads(links), "room": json.loads(room) if room else None}
+
+    @staticmethod
+    def conditional_headers(entry):
+        """If-None-Match / If-Modified-Since headers revalidating a cached entry."""
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url, etag, last_modified, page, links, room=None):
+        """Stores (or replaces) the entry of a scraped page."""
+        previous = self._conn.execute("SELECT content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+        if previous is None or previous[0] != page["hash"]:
+            self._set_unindexed(True)
+        self._conn.execute("INSERT OR REPLACE INTO pages (url, etag, last_modified, content_hash, page, links, "
+                           "room, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                           (url, etag, last_modified, page["hash"], json.dumps(page, ensure_ascii=False),
+                            json.dumps(links), json.dumps(room, ensure_ascii=False) if room else None, time.time()))
+        self._conn.commit()
+
+    def urls(self, prefix=""):
+        """Cached URLs starting with prefix (e.g. one site's origin)."""
+        return {url for (url,) in self._conn.execute("SELECT url FROM pages WHERE substr(url, 1, ?) = ?",
+                                                     (len(prefix), prefix))}
+
+    def delete(self, urls):
+        deleted = self._conn.executemany("DELETE FROM pages WHERE url = ?", [(url,) for url in urls]).rowcount
+        if deleted > 0:
+            self._set_unindexed(True)
+        self._conn.commit()
+
+    def has_unindexed_changes(self):
+        """True if pages were added, changed or removed since the last mark_indexed()."""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'unindexed'").fetchone()
+        return row is not None and row[0] == "1"
+
+    def mark_indexed(self):
+        """Records that the published collection contains every page change in the cache."""
+        self._set_unindexed(False)
+        self._conn.commit()
+
+    def _set_unindexed(self, unindexed):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('unindexed', ?)",
+                           ("1" if unindexed else "0",))
+
+    def clear(self):
+        self._conn.execute("DELETE FROM pages")
+        self._conn.commit()
+        self._conn.execute("VACUUM")
+
+    def stats(self):
+        entries, validated = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(etag IS NOT NULL OR last_modified IS NOT NULL), 0) FROM pages").fetchone()
+        return {"path": self.path,
+                "entries": entries,
+                "with_validators": validated,  # pages that can be revalidated with a conditional GET
+                "unindexed_changes": self.has_unindexed_changes(),
+                "file_mb": round(sum(os.path.getsize(f) for f in (self.path, f"{self.path}-wal")
+                                     if os.path.exists(f)) / 2**20, 2)}
+
+    def close(self):
+        self._conn.close()
+
+
+def main():
+    from src.rag_server import config
+
+    parser = argparse.ArgumentParser(description="Inspect or clear the crawl page cache.")
+    parser.add_argument("command", choices=("stats", "clear"))
+    parser.add_argument("--path", default=config.SCRAPE["page_cache_path"])
+    args = parser.parse_args()
+
+    cache = PageCache(args.path)
+    if args.command == "clear":
+        cache.clear()
+    print(json.dumps(cache.stats(), indent=2))
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
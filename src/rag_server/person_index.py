@@ -0,0 +1,224 @@
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+_SHARP_S = str.maketrans({"ß": "ss"})
+_POSSESSIVE = re.compile(r"(\w)['’]s\b")
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+
+# "where is X" / "take me to X" shaped queries are the only ones answered from the index.
+# Matched against normalize_name output (lowercase, no accents or punctuation, "where's" -> "where").
+_LOCATE_INTENT_PATTERN = re.compile(
+    r"\b(where|wo|locate|located|how (do i|can i|to) get to|wie komme ich|"
+    r"(which|what) (room|office|building|floor)|welche[mnrs]? (raum|buro|buero|zimmer|gebaude|stock)|"
+    r"room number|office number|raumnummer|zimmernummer)\b")
+_LOCATE_WORD_PATTERN = re.compile(r"\b(office|room|find|location|buro|buero|raum|zimmer)\b")
+# any other question type ("office phone", "find papers by X", "office hours") goes to RAG
+_OTHER_QUESTION_PATTERN = re.compile(
+    r"\b(phone|telephone|telefon|fax|e ?mail|contact|kontakt|papers?|publications?|publikation(en)?|"
+    r"research|forschung|teach(es|ing)?|lectures?|vorlesung(en)?|courses?|projects?|projekte?|thesis|"
+    r"theses|stud(y|ied|ies)|studiert|hours|sprechstunde|opening|when|wann|who|wer|why|warum|"
+    r"what does|was macht|topics?|works? on|biography|cv)\b")
+_ACTION_PATTERN = re.compile(
+    r"\b(take me|bring me|guide me|lead me|show me the way|walk me|navigate|escort|go to|bring mich|fuhre mich|fuehre mich)\b")
+
+# Cologne phonetics (Koelner Phonetik): letters without context rules; "h" is silent
+_PHONETIC_DIGITS = {**dict.fromkeys("aeijouy", "0"), "b": "1", **dict.fromkeys("fvw", "3"),
+                    **dict.fromkeys("gkq", "4"), "l": "5", "m": "6", "n": "6", "r": "7", "s": "8", "z": "8"}
+_C_HARD_INITIAL = frozenset("ahkloqrux")
+_C_HARD = frozenset("ahkoqux")
+
+
+def normalize_name(text):
+    """Lowercases, strips accents (Gül -> gul, like the ASR spells it), drops punctuation and
+    collapses whitespace ("Florian  Pfaff" -> "florian pfaff")."""
+    text = _POSSESSIVE.sub(r"\1", (text or "").lower()).translate(_SHARP_S)
+    text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def is_locate_query(normalized):
+    """True for a question about where someone is ("where is X", "which room is X in", "X's office").
+
+    A locate word alone ("office", "room", "find") only counts when no other question type is
+    detected, so "what is X's office phone?" or "find papers by X" are left to RAG.
+    """
+    if _OTHER_QUESTION_PATTERN.search(normalized):
+        return False
+    return bool(_LOCATE_INTENT_PATTERN.search(normalized) or _LOCATE_WORD_PATTERN.search(normalized))
+
+
+def phonetic_code(token):
+    """Cologne phonetics code of a normalized token; names that sound alike share it
+    ("weyrich", "wyrich", "weyrik" -> "374", "jazdi", "jasdi" -> "082")."""
+    digits = []
+    for i, c in enumerate(token):
+        prev = token[i - 1] if i else ""
+        nxt = token[i + 1] if i + 1 < len(token) else ""
+        if c in _PHONETIC_DIGITS:
+            digits.append(_PHONETIC_DIGITS[c])
+        elif c == "p":
+            digits.append("3" if nxt == "h" else "1")
+        elif c in ("d", "t"):
+            digits.append("8" if nxt in ("c", "s", "z") else "2")
+        elif c == "c":
+            hard = nxt in _C_HARD_INITIAL if i == 0 else nxt in _C_HARD and prev not in ("s", "z")
+            digits.append("4" if hard else "8")
+        elif c == "x":
+            digits.append("8" if prev in ("c", "k", "q") else "48")
+    code = "".join(digits)
+    code = "".join(d for i, d in enumerate(code) if i == 0 or d != code[i - 1])
+    return code[:1] + code[1:].replace("0", "")
+
+
+def _trigrams(token):
+    """Character trigrams of a token, padded so word boundaries count as well."""
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(a, b):
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+@dataclass
+class PersonRecord:
+    full_name: str
+    room_number: str
+    source: str
+    tokens: List[str]
+    token_trigrams: List[set]
+    token_codes: List[str]
+
+
+@dataclass
+class PersonMatch:
+    full_name: str
+    room_number: str
+    source: str
+    score: float
+    requires_action: bool
+
+
+class PersonIndex:
+
+    """In-memory trigram index over the people in rooms.csv.
+
+    Answers "where is X" / "take me to X" queries without vector search or an LLM call.
+    Every name token is matched against the query tokens on character trigrams; a query token
+    that sounds like the name token (same Cologne phonetics code) and shares part of its spelling
+    counts as a near match. So ASR misspellings of the full name or the surname alone ("where is
+    Wyrich", "take me to professor Weyrik", "Nasser Jasdi"), missing umlauts and stray whitespace
+    still hit the right person. A query is only answered when exactly one person matches with
+    high confidence.
+    """
+
+    def __init__(self, min_score=0.8, min_margin=0.1, surname_weight=0.95, min_surname_len=4,
+                 phonetic_score=0.9, min_phonetic_overlap=0.4):
+        """Initializes an empty index.
+
+        Args:
+            min_score (float): Minimum score of the best person.
+            min_margin (float): Minimum score gap between the best and the second best person.
+            surname_weight (float): Score factor for surname-only matches ("where is Weyrich").
+            min_surname_len (int): Shorter surnames are only matched together with the first name.
+            phonetic_score (float): Token score of a query token with the name token's phonetic code.
+            min_phonetic_overlap (float): Minimum trigram Dice score for a phonetic match, so words that
+                merely sound alike ("gripper" / "Gruber") do not count.
+        """
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.surname_weight = surname_weight
+        self.min_surname_len = min_surname_len
+        self.phonetic_score = phonetic_score
+        self.min_phonetic_overlap = min_phonetic_overlap
+        self.people: List[PersonRecord] = []
+        self._postings: Dict[str, set] = defaultdict(set)
+
+    @classmethod
+    def from_room_metadatas(cls, metadatas, **kwargs):
+        """Builds the index from the metadatas of DocumentProcessor.get_rooms_text_chunks."""
+        index = cls(**kwargs)
+        for meta in metadatas:
+            index.add(meta.get("full_name"), meta.get("room_number"), meta.get("source", ""))
+        return index
+
+    def add(self, full_name, room_number, source=""):
+        """Adds a person; the same name + room listed under several URLs is stored once."""
+        tokens = normalize_name(full_name).split()
+        if not tokens or not room_number:
+            return
+        full_name = " ".join(str(full_name).split())
+        room_number = str(room_number).strip()
+        for person in self.people:
+            if person.tokens == tokens and person.room_number == room_number:
+                return
+        person = PersonRecord(full_name=full_name,
+                              room_number=room_number,
+                              source=source,
+                              tokens=tokens,
+                              token_trigrams=[_trigrams(t) for t in tokens],
+                              token_codes=[phonetic_code(t) for t in tokens])
+        person_id = len(self.people)
+        self.people.append(person)
+        for grams in person.token_trigrams:
+            for gram in grams:
+                self._postings[gram].add(person_id)
+
+    def __len__(self):
+        return len(self.people)
+
+    def _token_score(self, grams, code, query_grams, query_code):
+        score = _dice(grams, query_grams)
+        if len(code) >= 2 and code == query_code and score >= self.min_phonetic_overlap:
+            score = max(score, self.phonetic_score)
+        return score
+
+    def _score(self, person, query_trigrams, query_codes):
+        """Score of a person: mean best-token similarity over the full name, or the surname alone."""
+        token_scores = [max((self._token_score(grams, code, q, q_code)
+                             for q, q_code in zip(query_trigrams, query_codes)), default=0.0)
+                        for grams, code in zip(person.token_trigrams, person.token_codes)]
+        best = sum(token_scores) / len(token_scores)
+        if len(person.tokens[-1]) >= self.min_surname_len:
+            best = max(best, self.surname_weight * token_scores[-1])
+        return best
+
+    def match(self, query, max_candidates=20) -> Optional[PersonMatch]:
+        """Returns the person a locate/navigate query is about, or None if not confident.
+
+        Args:
+            query (str): The user query.
+            max_candidates (int): Number of persons (by shared trigrams) that are scored exactly.
+        """
+        normalized = normalize_name(query)
+        if not self.people or not (_ACTION_PATTERN.search(normalized) or is_locate_query(normalized)):
+            return None
+
+        query_trigrams = [_trigrams(t) for t in normalized.split()]
+        query_codes = [phonetic_code(t) for t in normalized.split()]
+
+        # shortlist by shared trigrams via the inverted index, then score exactly
+        shared = defaultdict(int)
+        for gram in set().union(*query_trigrams):
+            for person_id in self._postings.get(gram, ()):
+                shared[person_id] += 1
+        candidates = sorted(shared, key=shared.get, reverse=True)[:max_candidates]
+        scored = sorted(((self._score(self.people[pid], query_trigrams, query_codes), pid) for pid in candidates),
+                        reverse=True)
+        if not scored:
+            return None
+
+        best_score, best_id = scored[0]
+        best = self.people[best_id]
+        # another entry for the same name (person listed with two rooms) makes the answer ambiguous too
+        runner_up = scored[1][0] if len(scored) > 1 else 0.0
+        if best_score < self.min_score or best_score - runner_up < self.min_margin:
+            return None
+        return PersonMatch(full_name=best.full_name,
+                           room_number=best.room_number,
+                           source=best.source,
+                           score=best_score,
+                           requires_action=bool(_ACTION_PATTERN.search(normalized)))
@@ -0,0 +1,189 @@
+"""Columnar (Parquet) storage of the scraped pages.
+
+The CSV export stores the list columns as Python reprs that have to be literal_eval'd
+back on every read. The Parquet file keeps them as native list<string> columns, so
+reading needs no parsing, and pyarrow.dataset can project columns and push filters
+(e.g. only team pages) down to the row groups.
+
+While a crawl runs, pages are appended to a JSONL log (JsonlWriter) instead of rewriting a
+whole JSON file, so a crashed crawl loses at most the pages after its last sync.
+
+Convert an existing CSV export::
+
+    python -m src.rag_server.scraped_data ./src/rag_server/ias_scraped_data/scraped_data.csv
+"""
+import argparse
+import ast
+import csv
+import json
+import os
+import sys
+from urllib.parse import urlparse
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for the Parquet format
+    pa = ds = pq = None
+
+LIST_COLUMNS = ("paragraphs", "headers", "phone_numbers", "room_numbers")
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for Parquet scraped data (pip install pyarrow)")
+
+
+def page_schema():
+    _require_pyarrow()
+    return pa.schema([("url", pa.string()),
+                      ("paragraphs", pa.list_(pa.string())),
+                      ("headers", pa.list_(pa.string())),
+                      ("phone_numbers", pa.list_(pa.string())),
+                      ("room_numbers", pa.list_(pa.string())),
+                      ("hash", pa.string()),
+                      ("is_team_page", pa.bool_())])
+
+
+def is_parquet_path(path):
+    """Parquet file, or a directory of Parquet files (a dataset)."""
+    return str(path).endswith(".parquet") or os.path.isdir(path)
+
+
+def is_team_page_url(url):
+    """True for team member pages like '/institut/team/<familyname>/'."""
+    parts = [p for p in urlparse(url or "").path.split("/") if p]
+    return any(part.lower() == "team" and i + 1 < len(parts) for i, part in enumerate(parts))
+
+
+def parse_list_cell(x):
+    """Parses a stringified list cell of the CSV export (safer than eval)."""
+    if x is None or (isinstance(x, float) and x != x):  # None or NaN
+        return []
+    if isinstance(x, list):
+        return x
+    if isinstance(x, str):
+        try:
+            v = ast.literal_eval(x)
+            if isinstance(v, list):
+                return v
+            return [str(v)]  # if not a list, return as single-item list (fallback)
+        except (ValueError, SyntaxError):
+            return [x]
+    return [str(x)]
+
+
+def _page_record(page):
+    record = {"url": page.get("url"), "hash": page.get("hash")}
+    for column in LIST_COLUMNS:
+        record[column] = [str(v) for v in page.get(column) or []]
+    record["is_team_page"] = bool(page["is_team_page"]) if "is_team_page" in page else is_team_page_url(page.get("url"))
+    return record
+
+
+def write_pages(pages, path, row_group_size=64):
+    """Writes scraped page dicts (TextScraper.scraped_data) as a Parquet file.
+
+    Small row groups keep streaming reads flat in memory and let filters skip whole groups.
+    """
+    _require_pyarrow()
+    table = pa.Table.from_pylist([_page_record(page) for page in pages], schema=page_schema())
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, compression="zstd", row_group_size=row_group_size)
+    os.replace(tmp_path, path)  # readers never see a half written file
+    return table.num_rows
+
+
+def csv_to_parquet(csv_path, parquet_path):
+    """Converts a scraped_data.csv export to Parquet."""
+    csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        pages = [{**row, **{c: parse_list_cell(row.get(c) or None) for c in LIST_COLUMNS}}
+                 for row in csv.DictReader(f)]
+    return write_pages(pages, parquet_path)
+
+
+def read_pages(path, columns=None, team_pages_only=False, filter=None):
+    """Reads the scraped pages as a pyarrow Table.
+
+    Args:
+        path (str): Parquet file or dataset directory.
+        columns (List[str]): Columns to read; None reads all.
+        team_pages_only (bool): Only rows with is_team_page (pushed down to the row groups).
+        filter (pyarrow.dataset.Expression): Additional row filter.
+    """
+    return _scanner(path, columns, team_pages_only, filter).to_table()
+
+
+def iter_page_batches(path, columns=None, team_pages_only=False, filter=None, batch_size=64):
+    """Streams the scraped pages as pyarrow RecordBatches, see read_pages."""
+    yield from _scanner(path, columns, team_pages_only, filter, batch_size).to_batches()
+
+
+def _scanner(path, columns, team_pages_only, filter, batch_size=64):
+    _require_pyarrow()
+    dataset = ds.dataset(path, format="parquet")
+    if team_pages_only:
+        team_filter = ds.field("is_team_page") == True  # noqa: E712 (pyarrow expression)
+        filter = team_filter if filter is None else filter & team_filter
+    return dataset.scanner(columns=list(columns) if columns else None, filter=filter, batch_size=batch_size)
+
+
+class JsonlWriter:
+
+    """Append-only JSON Lines file; sync() makes the lines written so far durable."""
+
+    def __init__(self, path, truncate_to=None):
+        """Opens path for appending.
+
+        Args:
+            path (str): JSONL file.
+            truncate_to (int): Drop everything after this byte offset first (lines written after
+                the last checkpoint of a resumed crawl); None keeps the file as it is.
+        """
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        if truncate_to is not None:
+            self._file.truncate(truncate_to)
+
+    def append(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def sync(self):
+        """Flushes and fsyncs the file; returns its size (the offset to resume from)."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return os.fstat(self._file.fileno()).st_size
+
+    def close(self):
+        self._file.close()
+
+
+def read_jsonl(path, limit_bytes=None):
+    """Records of a JSONL file, up to byte offset limit_bytes; a torn last line is ignored."""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "rb") as f:
+        data = f.read() if limit_bytes is None else f.read(limit_bytes)
+    for line in data.splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            break  # written while the process died
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a scraped_data.csv export to Parquet.")
+    parser.add_argument("csv_path")
+    parser.add_argument("parquet_path", nargs="?", help="default: next to the CSV with a .parquet suffix")
+    args = parser.parse_args()
+    parquet_path = args.parquet_path or os.path.splitext(args.csv_path)[0] + ".parquet"
+    rows = csv_to_parquet(args.csv_path, parquet_path)
+    print(f"Wrote {rows} pages to {parquet_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,40 +6,112 @@ import json
 import re
 import hashlib
 import random
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 import pandas as pd
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 from urllib.robotparser import RobotFileParser
 from requests.adapters import HTTPAdapter, Retry
 
 from src.rag_server.databaseHandler import DatabaseHandler
 from src.rag_server.documentProcessor import DocumentProcessor
+from src.rag_server.dedup import ChunkDeduplicator
+from src.rag_server.scraped_data import JsonlWriter, is_team_page_url, read_jsonl, write_pages
+from src.rag_server.crawl_fixture import init_recording, record_page
+from src.rag_server.crawl_frontier import CrawlFrontier, normalize_url, parse_sitemap
+from src.rag_server.page_cache import PageCache
+from src.rag_server.html_extractors import BACKENDS, available_backends, extract_page
+
+
+class HostRateLimiter:
+    """Per-host politeness of the concurrent crawl: at most max_concurrent requests in flight per
+    host, and request starts at least min_interval seconds apart (the robots.txt crawl delay)."""
+
+    def __init__(self, max_concurrent=2, min_interval=1.0):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._semaphores = {}  # host -> BoundedSemaphore
+        self._next_start = {}  # host -> earliest monotonic time of the next request
+
+    @contextmanager
+    def slot(self, url):
+        """Blocks until a request to the url's host may start; the slot is held until the block exits."""
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.max_concurrent))
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+
+CHECKPOINT_FILE = "crawl_checkpoint.json"
+PAGE_LOG_FILE = "scraped_data.jsonl"
+ROOM_LOG_FILE = "rooms.jsonl"
+_NON_NAME_CHARS = re.compile(r'[^A-Za-z\-]')  # keeps only letters and dashes of a surname url segment
+
 
 class TextScraper:
     """Scrapes text data from URLs"""
-    def __init__(self, base_url, output_dir="scraped_data", max_pages=1000):
+    def __init__(self, base_url, output_dir="scraped_data", max_pages=1000, concurrency=1,
+                 per_host_concurrency=2, crawl_delay=1, record_dir=None, prioritize_team_pages=True,
+                 page_cache_path=None, use_sitemap=False, checkpoint_every=25, html_parser="bs4"):
         """
         Initialize the scraper with necessary attributes.
         :param base_url: The base URL to scrape.
         :param output_dir: Directory where scraped data will be stored.
         :param max_pages: Maximum number of pages to scrape.
+        :param concurrency: Pages fetched at once; 1 crawls sequentially with a random 1-2x crawl delay sleep.
+        :param per_host_concurrency: Max. requests in flight per host (concurrent crawl).
+        :param crawl_delay: Seconds between requests to a host unless robots.txt sets a Crawl-delay / Request-rate.
+        :param record_dir: If set, the HTML of every scraped page is recorded there (see crawl_fixture).
+        :param prioritize_team_pages: Fetch queued team member pages before other pages.
+        :param page_cache_path: SQLite page cache for conditional re-crawls (see page_cache); None fetches everything.
+        :param use_sitemap: Seed the frontier with the URLs of the site's sitemap.xml (or robots.txt Sitemap entries).
+        :param checkpoint_every: Pages between two crawl checkpoints (fsync of the JSONL logs + crawl state).
+        :param html_parser: HTML parser backend, "bs4", "lxml" or "selectolax" (see html_extractors).
         """
+        if html_parser not in BACKENDS:
+            raise ValueError(f"Unknown HTML parser backend: {html_parser} (expected one of {BACKENDS})")
+        if html_parser not in available_backends():
+            raise ImportError(f"The {html_parser} HTML parser backend is not installed")
+        self.html_parser = html_parser
         self.base_url = base_url
         self.output_dir = output_dir
         self.max_pages = max_pages
+        self.concurrency = max(1, concurrency)
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.record_dir = record_dir
         self.visited = set()
-        self.to_visit = [base_url]
+        self.frontier = CrawlFrontier([base_url], prioritize=is_team_page_url if prioritize_team_pages else None)
         self.failed_urls = {}
         self.scraped_data = []
         self.content_hashes = set()
         self.headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
         self.robot_parser = RobotFileParser()
-        self.delay = 1  # Default delay, will update if `Crawl-Delay` exists
+        self.delay = crawl_delay  # Default delay, will update if `Crawl-Delay` exists
         self._setup_logging()
         self._setup_output_dir()
         self._initialize_robot_parser()
         self.session = self._setup_session()
-        self._room_records = []  # room info
+        self._room_records = {}  # (full_name, url) -> room info
+        self.use_sitemap = use_sitemap
+        self.page_cache = PageCache(page_cache_path) if page_cache_path else None
+        self.page_changes = {"added": [], "changed": [], "removed": [], "unchanged": 0}
+        self.crawl_stats = {"fetched": 0, "not_modified": 0, "bytes": 0}
+        self._gone = set()  # cached urls answered with 404 / 410
+        self.checkpoint_every = max(1, checkpoint_every)
+        self._page_log = self._room_log = None
+        self._in_flight = set()  # popped urls whose fetch has not been processed yet (concurrent crawl)
+        self._cache_writes = []  # page cache entries written at the next checkpoint
+        if record_dir:
+            init_recording(record_dir, self.base_url, self.session, self.headers)
 
     def _setup_logging(self):
         """Set up logging for the scraper."""
@@ -62,6 +134,9 @@ class TextScraper:
             self.robot_parser.read()  # downloads and parses the robots.txt file
             if self.robot_parser.crawl_delay("*"):
                 self.delay = self.robot_parser.crawl_delay("*")
+            request_rate = self.robot_parser.request_rate("*")
+            if request_rate and request_rate.requests:
+                self.delay = max(self.delay, request_rate.seconds / request_rate.requests)
             logging.info(f"Robots.txt initialized from {robots_url}, Crawl Delay: {self.delay}s")
         except Exception as e:
             logging.warning(f"Failed to read robots.txt from {robots_url}: {e}")
@@ -74,8 +149,10 @@ class TextScraper:
             backoff_factor=1,  # exponential backoff factor, for example: 1, 2, 4 seconds
             status_forcelist=[500, 502, 503, 504]  # only retry on these status codes
         )
-        session.mount("http://", HTTPAdapter(max_retries=retries))
-        session.mount("https://", HTTPAdapter(max_retries=retries))
+        # one pooled connection per concurrent fetch, so the pool never discards connections
+        pool_size = max(10, self.concurrency)
+        session.mount("http://", HTTPAdapter(max_retries=retries, pool_maxsize=pool_size))
+        session.mount("https://", HTTPAdapter(max_retries=retries, pool_maxsize=pool_size))
         return session
 
     def _can_scrape_url(self, url):
@@ -83,48 +160,108 @@ class TextScraper:
         return self.robot_parser.can_fetch("*", url)
 
     def _save_data(self):
-        """Save scraped text data periodically to avoid data loss."""
+        """Save scraped text data to scraped_data.json (once, at the end of the crawl)."""
         file_path = os.path.join(self.output_dir, "scraped_data.json")
         with open(file_path, "w", encoding="utf-8") as f:
             json.dump(self.scraped_data, f, ensure_ascii=False, indent=4)
         logging.info(f"Data saved to {file_path}.")
 
     def _save_rooms_json(self):
-        """Save room numbers to rooms.json periodically to avoid data loss."""
+        """Save room numbers to rooms.json (once, at the end of the crawl)."""
         file_path = os.path.join(self.output_dir, "rooms.json")
         with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(self._room_records, f, ensure_ascii=False, indent=4)
+            json.dump(self.room_records, f, ensure_ascii=False, indent=4)
         logging.info(f"Room info saved to {file_path}.")
 
-    def _extract_text_content(self, soup, url=None):
-        """Extract all text content from the page and room numbers if it's a team page (contains /team/ in the URL)."""
-        # Normalize page text (turns weird whitespace like NBSP into spaces)
-        
-        try:
-            
-            paragraphs = [p.get_text(" ", strip=True) for p in soup.find_all("p")]
-            headers = [h.get_text(" ", strip=True) for h in soup.find_all(re.compile('^h[1-6]$'))]
-            contact_info = re.findall(r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}', soup.text) # already existing regex
-            
-            if url and self._extract_surname_from_url(url):
-                text = soup.get_text(" ", strip=True)
-                pattern = re.compile(r'\b(?:Raum|Room)\s*:?\s*([0-9]{1,3}\.[0-9]{1,3})\b', re.IGNORECASE) # regex generated by AI to match room numbers like Raum 2.116, Room:2.116 etc.
-                room_numbers = list(dict.fromkeys(m.group(1) for m in pattern.finditer(text)))
-
-            text_content = " ".join(paragraphs + headers + contact_info + room_numbers)
-
-            extracted_text = {
-                "paragraphs": paragraphs,
-                "headers": headers,
-                "phone_numbers": contact_info,
-                "room_numbers": room_numbers,
-                "hash": hashlib.md5(text_content.encode()).hexdigest()
-            }
-            return extracted_text
-        
-        except Exception as e:
-            print(f"Error occured in _extract_text_content: {e}")
-            return {}
+    def _save_page_changes(self):
+        """Save the pages added, changed and removed since the previous crawl (page_changes.json)."""
+        file_path = os.path.join(self.output_dir, "page_changes.json")
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump({**self.page_changes, **self.crawl_stats}, f, ensure_ascii=False, indent=4)
+        logging.info(f"Page changes saved to {file_path}.")
+
+    def _open_logs(self, checkpoint=None):
+        """Opens the append-only page and room logs; a resumed crawl cuts them back to its checkpoint."""
+        offsets = checkpoint["log_offsets"] if checkpoint else {PAGE_LOG_FILE: 0, ROOM_LOG_FILE: 0}
+        self._page_log = JsonlWriter(os.path.join(self.output_dir, PAGE_LOG_FILE), offsets[PAGE_LOG_FILE])
+        self._room_log = JsonlWriter(os.path.join(self.output_dir, ROOM_LOG_FILE), offsets[ROOM_LOG_FILE])
+
+    def _checkpoint(self):
+        """Makes the logs durable and atomically writes the crawl state matching them.
+
+        The state holds the frontier (with in-flight urls queued again), the visited set, the
+        content hashes and the change tracking. Page cache entries are written after the
+        checkpoint, so a resumed crawl never finds a page in the cache newer than its state.
+        """
+        checkpoint = {"base_url": self.base_url,
+                      "frontier": self.frontier.state(requeue=self._in_flight),
+                      "visited": list(self.visited),
+                      "content_hashes": list(self.content_hashes),
+                      "failed_urls": self.failed_urls,
+                      "gone": list(self._gone),
+                      "page_changes": self.page_changes,
+                      "crawl_stats": self.crawl_stats,
+                      "log_offsets": {PAGE_LOG_FILE: self._page_log.sync(), ROOM_LOG_FILE: self._room_log.sync()}}
+        file_path = os.path.join(self.output_dir, CHECKPOINT_FILE)
+        with open(f"{file_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{file_path}.tmp", file_path)
+        self._flush_page_cache()
+
+    def _load_checkpoint(self):
+        """Restores the crawl state and the scraped pages of the last checkpoint.
+
+        Returns:
+            bool: False if there is no checkpoint of this base url to resume from.
+        """
+        file_path = os.path.join(self.output_dir, CHECKPOINT_FILE)
+        if not os.path.exists(file_path):
+            return False
+        with open(file_path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint["base_url"] != self.base_url:
+            logging.warning(f"Checkpoint in {self.output_dir} is of {checkpoint['base_url']}, starting a new crawl.")
+            return False
+        self.frontier.restore(checkpoint["frontier"])
+        self.visited = set(checkpoint["visited"])
+        self.content_hashes = set(checkpoint["content_hashes"])
+        self.failed_urls = checkpoint["failed_urls"]
+        self._gone = set(checkpoint["gone"])
+        self.page_changes = checkpoint["page_changes"]
+        self.crawl_stats = checkpoint["crawl_stats"]
+        offsets = checkpoint["log_offsets"]
+        self.scraped_data = read_jsonl(os.path.join(self.output_dir, PAGE_LOG_FILE), offsets[PAGE_LOG_FILE])
+        self._room_records = {(room["full_name"], room["urls"]): room for room in
+                              read_jsonl(os.path.join(self.output_dir, ROOM_LOG_FILE), offsets[ROOM_LOG_FILE])}
+        self._open_logs(checkpoint)
+        logging.info(f"Resuming crawl from {file_path}: {len(self.scraped_data)} pages scraped, "
+                     f"{len(self.frontier)} queued.")
+        return True
+
+    def _flush_page_cache(self):
+        for entry in self._cache_writes:
+            self.page_cache.put(*entry)
+        self._cache_writes = []
+
+    @property
+    def room_records(self):
+        """Room records (full_name, room_number, urls, research_info) in the order they were found."""
+        return list(self._room_records.values())
+
+    @staticmethod
+    def _page_data(extracted):
+        """Stored text content of a page (see html_extractors.extract_page) and its content hash."""
+        text_content = " ".join(extracted["paragraphs"] + extracted["headers"] + extracted["phone_numbers"]
+                                + extracted["room_numbers"])
+        return {
+            "paragraphs": extracted["paragraphs"],
+            "headers": extracted["headers"],
+            "phone_numbers": extracted["phone_numbers"],
+            "room_numbers": extracted["room_numbers"],
+            "hash": hashlib.md5(text_content.encode()).hexdigest()
+        }
 
     def _extract_surname_from_url(self, url: str) -> str:
         """Extract family name segments from teams URLs like '/institut/team/<familyname>/"""
@@ -133,129 +270,281 @@ class TextScraper:
             for i, part in enumerate(path_parts):
                 if part.lower() == 'team' and i + 1 < len(path_parts):
                     surname_seg = path_parts[i + 1]
-                    surname = re.sub(r'[^A-Za-z\-]', '', surname_seg) # regex generated by AI to keep only letters and dashes
+                    surname = _NON_NAME_CHARS.sub('', surname_seg)
                     return surname
         except Exception as e:
             print(f"Error occured in _extract_surname_from_url: {e}")
             return ''
 
-    def _extract_full_name(self, soup: BeautifulSoup) -> str:
-        """Extract the full name from teams page, which are in H1 tags."""
+    def scrape(self, resume=False):
+        """Main scraping function.
+
+        Pages and room records are appended to scraped_data.jsonl / rooms.jsonl as they are
+        scraped, and every checkpoint_every pages the logs are fsynced and the crawl state is
+        saved to crawl_checkpoint.json. With resume=True, a crawl that was interrupted (crash,
+        kill) continues exactly from its last checkpoint; without a checkpoint it starts anew.
+        """
+        if not (resume and self._load_checkpoint()):
+            self._open_logs()
+            if self.use_sitemap:
+                self._seed_from_sitemaps()
+        if self.concurrency > 1:
+            self._scrape_concurrent()
+        else:
+            self._scrape_sequential()
+        self._finish_crawl()
+
+    def _scrape_sequential(self):
+        while self.frontier and len(self.scraped_data) < self.max_pages:  # Limit to max_pages
+            url = self.frontier.pop()
+
+            if url in self.visited or not self._can_scrape_url(url):
+                continue  # Skip already visited or disallowed URLs
+
+            try:
+                response = self.session.get(url, headers=self._request_headers(url), timeout=10)
+                if self._process_response(url, response):
+                    time.sleep(random.uniform(self.delay, self.delay * 2))
+            except Exception as e:
+                logging.error(f"Error scraping {url}: {e}")
+                self._scrape_failed(url)
+
+    def _scrape_concurrent(self):
+        """Fetches up to `concurrency` pages at once in a thread pool over the shared session.
+
+        Worker threads only download (holding a HostRateLimiter slot per request); parsing, dedup
+        and queueing links happen on the calling thread, so the crawl state needs no locks.
+        """
+        limiter = HostRateLimiter(self.per_host_concurrency, self.delay)
+        logging.info(f"Concurrent crawl: {self.concurrency} fetchers, {self.per_host_concurrency} per host, "
+                     f"{self.delay}s between requests to a host")
+        pending = {}  # future -> url
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="crawl") as pool:
+            while len(self.scraped_data) < self.max_pages:
+                # the frontier hands out every url once, so no url is fetched twice at a time
+                while self.frontier and len(pending) < self.concurrency \
+                        and len(self.scraped_data) + len(pending) < self.max_pages:
+                    url = self.frontier.pop()
+                    if url in self.visited or not self._can_scrape_url(url):
+                        continue
+                    pending[pool.submit(self._fetch, url, self._request_headers(url), limiter)] = url
+                    self._in_flight.add(url)
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    self._in_flight.discard(url)
+                    try:
+                        self._process_response(url, future.result())
+                    except Exception as e:
+                        logging.error(f"Error scraping {url}: {e}")
+                        self._scrape_failed(url)
+            for future in pending:  # max_pages reached
+                future.cancel()
+            self._in_flight.clear()
+
+    def _fetch(self, url, headers, limiter):
+        """Downloads a page on a crawl thread; a missing charset is detected here, off the parsing thread."""
+        with limiter.slot(url):
+            response = self.session.get(url, headers=headers, timeout=10)
+        if response.encoding is None:  # Response.text would run the charset detection on every access
+            response.encoding = response.apparent_encoding
+        return response
+
+    def _request_headers(self, url):
+        """Request headers, with If-None-Match / If-Modified-Since for pages in the page cache."""
+        if self.page_cache is None:
+            return self.headers
+        return {**self.headers, **PageCache.conditional_headers(self.page_cache.get(url))}
+
+    def _process_response(self, url, response):
+        """Parses a fetched page, stores its data and room record and queues its links.
+
+        A 304 Not Modified page is restored from the page cache instead of being parsed.
+
+        Returns:
+            bool: True if the page was scraped (False for non-HTML, failed or duplicate pages).
+        """
+        cached = self.page_cache.get(url) if self.page_cache is not None else None
+        if response.status_code == 304 and cached:
+            self.crawl_stats["not_modified"] += 1
+            return self._restore_cached_page(url, cached)
+
+        content_type = response.headers.get("Content-Type", "")
+
+        if "text/html" not in content_type:
+            logging.info(f"Skipping non-HTML content: {url}")
+            return False
+
+        if response.status_code != 200:
+            logging.warning(f"Failed to fetch {url}: HTTP {response.status_code}")
+            if response.status_code in (404, 410):
+                self._gone.add(url)
+                return False
+            return self._retry_or_restore(url, cached)
+
+        self.crawl_stats["fetched"] += 1
+        self.crawl_stats["bytes"] += len(response.content)
+        if self.record_dir:
+            record_page(self.record_dir, url, response.text)
+        self.visited.add(url)
+        # get family name, full names, room numbers, research info for team pages only NOT for geneic URLs
+        surname = self._extract_surname_from_url(url)
         try:
-            h1 = soup.find("h1")
-            if h1:
-                return h1.get_text(strip=True)
+            extracted = extract_page(response.text, url, self.html_parser, team_page=bool(surname))
         except Exception as e:
-            print(f"Error occured in _extract_full_name: {e}")
-        return ""
+            logging.error(f"Failed to parse {url}: {e}")
+            return False
+
+        page_data = self._page_data(extracted)
+        if page_data["hash"] in self.content_hashes:
+            logging.info(f"Duplicate content skipped: {url}")
+            return False
+
+        page_data["url"] = url
+        page_data["is_team_page"] = bool(surname)
+
+        room = None
+        if surname:  # Only process if this is a team page
+            full_name = extracted["full_name"]
+            room_numbers = page_data.get("room_numbers")
+            if room_numbers and full_name:
+                room = {
+                    "full_name": full_name,
+                    "room_number": room_numbers[0],  # to avoid multiple rooms, only consider 1st room number
+                    "urls": url,
+                    "research_info": extracted["research_info"]
+                }
+
+        links = extracted["links"]
+        if self.page_cache is not None:
+            if cached is None:
+                self.page_changes["added"].append(url)
+            elif cached["content_hash"] != page_data["hash"]:
+                self.page_changes["changed"].append(url)
+            else:
+                self.page_changes["unchanged"] += 1  # the server sent no validators, or ignored them
+            self._cache_writes.append((url, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                                       page_data, links, room))
+        self._add_page(page_data, room, links)
+        return True
 
-    def _extract_research_info(self, soup: BeautifulSoup) -> str:
-        """Extract research info by finding a heading containing 'Research' (or German 'Forschung') and
-        concatenating following paragraph/list texts until the next heading."""
+    def _scrape_failed(self, url):
+        """A fetch that raised (timeout, connection error, retries exhausted) or a page that failed to process."""
         try:
-            heading = None
-            for tag in soup.find_all(re.compile('^h[1-6]$', re.I)):
-                text = tag.get_text(" ", strip=True)
-                if re.search(r"research|forschung|interests", text, flags=re.I):
-                    heading = tag
-                    break
-            if not heading:
-                # Fallback: look for any paragraph mentioning research
-                p = soup.find("p", string=re.compile(r"research|forschung", re.I))
-                return p.get_text(" ", strip=True) if p else ""
-
-            parts = []
-            for sib in heading.next_siblings:
-                if getattr(sib, "name", None) and re.match(r"^h[1-6]$", sib.name, flags=re.I):
-                    break  # stop at next heading
-                if getattr(sib, "name", None) in {"p", "ul", "ol", "li", "div"}:
-                    parts.append(sib.get_text(" ", strip=True))
-            text = " ".join([p for p in parts if p])
-            return text
-        except Exception:
-            return ""
-
-    def scrape(self):
-        """Main scraping function."""
-        while self.to_visit and len(self.scraped_data) < self.max_pages:  # Limit to max_pages
-            url = self.to_visit.pop(0)
+            cached = self.page_cache.get(url) if self.page_cache is not None else None
+        except Exception as e:
+            logging.error(f"Page cache lookup of {url} failed: {e}")
+            cached = None
+        self._retry_or_restore(url, cached)
 
-            if url in self.visited or not self._can_scrape_url(url):
-                continue  # Skip already visited or disallowed URLs
+    def _retry_or_restore(self, url, cached):
+        """Queues a failed url again, up to 3 attempts; then falls back to its cached copy, if any.
+
+        Returns:
+            bool: True if the cached copy was restored.
+        """
+        self.failed_urls[url] = self.failed_urls.get(url, 0) + 1  # Count failures for each URL
+        if self.failed_urls[url] < 3:  # Retry up to 3 times
+            self.frontier.retry(url)
+        elif cached:  # keep the last known copy rather than dropping the page from the index
+            return self._restore_cached_page(url, cached)
+        return False
+
+    def _restore_cached_page(self, url, cached):
+        """Adds an unchanged page from the page cache, without downloading or parsing it."""
+        self.visited.add(url)
+        page_data = cached["page"]
+        if page_data["hash"] in self.content_hashes:
+            logging.info(f"Duplicate content skipped: {url}")
+            return False
+        self.page_changes["unchanged"] += 1
+        self._add_page(page_data, cached["room"], cached["links"])
+        return True
+
+    def _add_page(self, page_data, room, links):
+        """Stores a scraped page and its room record and queues its links."""
+        self.content_hashes.add(page_data["hash"])
+        self.scraped_data.append(page_data)
+        self._page_log.append(page_data)
+        # only add if not already present for this full_name + url, to prevent duplicates
+        if room and (room["full_name"], room["urls"]) not in self._room_records:
+            self._room_records[(room["full_name"], room["urls"])] = room
+            self._room_log.append(room)
+
+        # Find and queue new links to visit (the frontier normalizes them and drops seen / off-site ones)
+        for link in links:
+            self.frontier.add(link)
 
+        # Checkpoint periodically
+        if len(self.scraped_data) % self.checkpoint_every == 0:
+            self._checkpoint()
+
+    def _seed_from_sitemaps(self):
+        """Queues the URLs of the site's sitemaps (robots.txt Sitemap entries, else /sitemap.xml)."""
+        parsed_url = urlparse(self.base_url)
+        sitemaps = list(self.robot_parser.site_maps() or []) or [f"{parsed_url.scheme}://{parsed_url.netloc}/sitemap.xml"]
+        queued, fetched = 0, set()
+        while sitemaps and len(fetched) < 50:  # sitemap indexes can nest; bound the requests
+            sitemap_url = sitemaps.pop(0)
+            if sitemap_url in fetched:
+                continue
+            fetched.add(sitemap_url)
             try:
-                response = self.session.get(url, headers=self.headers, timeout=10)
-                content_type = response.headers.get("Content-Type", "")
-                
-                if "text/html" not in content_type:
-                    logging.info(f"Skipping non-HTML content: {url}")
-                    continue
-                
+                response = self.session.get(sitemap_url, headers=self.headers, timeout=10)
                 if response.status_code != 200:
-                    logging.warning(f"Failed to fetch {url}: HTTP {response.status_code}")
-                    self.failed_urls[url] = self.failed_urls.get(url, 0) + 1  # Count failures for each URL
-                    if self.failed_urls[url] < 3:  # Retry up to 3 times
-                        self.to_visit.append(url)
                     continue
-                
-                soup = BeautifulSoup(response.text, "html.parser")
-                self.visited.add(url)
-
-                # Extract text content
-                page_data = self._extract_text_content(soup, url)
-                if page_data["hash"] in self.content_hashes:
-                    logging.info(f"Duplicate content skipped: {url}")
-                    continue
-                
-                self.content_hashes.add(page_data["hash"])
-                page_data["url"] = url
-                self.scraped_data.append(page_data)
-
-                # get family name, full names, room numbers, research info for team pages only NOT for geneic URLs
-                surname = self._extract_surname_from_url(url)
-                if surname:  # Only process if this is a team page
-                    full_name = self._extract_full_name(soup)
-                    research_info = self._extract_research_info(soup)
-                    room_numbers = page_data.get("room_numbers")
-                    if room_numbers and full_name:
-                        rn = room_numbers[0] # to avoid multiple rooms, only consider 1st room number
-                        # only add if not already present for this full_name + url, to prevent duplicates
-                        exists = any(
-                            rec["full_name"] == full_name and rec["urls"] == url
-                            for rec in self._room_records
-                        )
-                        if not exists:
-                            self._room_records.append({
-                                "full_name": full_name,
-                                "room_number": rn,
-                                "urls": url,
-                                "research_info": research_info
-                            })
-
-                # Save periodically
-                if len(self.scraped_data) % 10 == 0:
-                    self._save_data()
-                    self._save_rooms_json()
-
-                # Find and queue new links to visit
-                for link in soup.find_all("a", href=True):
-                    href = urljoin(url, link['href'])
-                    if urlparse(href).netloc == urlparse(self.base_url).netloc and href not in self.visited:
-                        self.to_visit.append(href)
-                
-                time.sleep(random.uniform(self.delay, self.delay * 2))
+                kind, locations = parse_sitemap(response.content)
             except Exception as e:
-                logging.error(f"Error scraping {url}: {e}")
+                logging.warning(f"Failed to read sitemap {sitemap_url}: {e}")
+                continue
+            if kind == "sitemapindex":
+                sitemaps.extend(locations)
+            else:
+                queued += sum(self.frontier.add(location) is not None for location in locations)
+        logging.info(f"Queued {queued} URLs from {len(fetched)} sitemap(s).")
 
+    def _finish_crawl(self):
+        """Writes the final outputs of a crawl and removes its checkpoint."""
+        self._page_log.sync()
+        self._room_log.sync()
+        self._page_log.close()
+        self._room_log.close()
+        if self.page_cache is not None:
+            self._flush_page_cache()
+            self._update_page_changes()
         self._save_data()
         self._save_rooms_json()
+        checkpoint_path = os.path.join(self.output_dir, CHECKPOINT_FILE)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)  # finished: nothing left to resume
+
+    def _update_page_changes(self):
+        """Determines the removed pages, updates the page cache and writes page_changes.json.
+
+        Cached pages answered with 404/410 are removed. If the crawl ran to the end of the frontier
+        (not stopped by max_pages), so are cached pages of the site it no longer reached.
+        """
+        scraped = {page["url"] for page in self.scraped_data}
+        complete = not self.frontier and len(self.scraped_data) < self.max_pages
+        parsed_url = urlparse(normalize_url(self.base_url) or self.base_url)
+        cached = self.page_cache.urls(f"{parsed_url.scheme}://{parsed_url.netloc}/")
+        removed = (cached - scraped) if complete else (cached & self._gone)
+        self.page_changes["removed"] = sorted(removed)
+        self.page_changes["complete"] = complete
+        self.page_cache.delete(removed)
+        self._save_page_changes()
+        logging.info(f"Page changes: {len(self.page_changes['added'])} added, {len(self.page_changes['changed'])} "
+                     f"changed, {len(removed)} removed, {self.page_changes['unchanged']} unchanged "
+                     f"({self.crawl_stats['not_modified']} not modified responses)")
 
     def _save_rooms(self):
         """Save collected (full_name, room_number, urls, research_info) records into rooms.csv."""
         if not self._room_records:
             return
         try:
-            df = pd.DataFrame(self._room_records)
+            df = pd.DataFrame(self.room_records)
             # Keep only required columns in the specified order
             cols = ["full_name", "room_number", "urls", "research_info"]
             df = df[[c for c in cols if c in df.columns]]
@@ -267,6 +556,23 @@ class TextScraper:
         except Exception as e:
             logging.error(f"Failed to save rooms.csv: {e}")
 
+    def save_to_parquet(self):
+        """Save scraped data to Parquet with native list columns (read by DocumentProcessor without parsing)."""
+        file_path = os.path.join(self.output_dir, "scraped_data.parquet")
+        write_pages(self.scraped_data, file_path)
+        logging.info(f"Scraped data saved to {file_path}.")
+        self._save_rooms()
+
+    def save(self, formats=("parquet", "csv")):
+        """Save scraped data in the given formats ("parquet", "csv")."""
+        for data_format in formats:
+            if data_format == "parquet":
+                self.save_to_parquet()
+            elif data_format == "csv":
+                self.save_to_csv()
+            else:
+                raise ValueError(f"Unknown scraped data format: {data_format}")
+
     def save_to_csv(self):
         """Save scraped data to CSV."""
         file_path = os.path.join(self.output_dir, "scraped_data.csv")
@@ -281,20 +587,77 @@ def run_default_scraping():
     base_url = "https://www.ias.uni-stuttgart.de/"
     scraper = TextScraper(base_url=base_url, output_dir="ias_scraped_data", max_pages=500)
     scraper.scrape()
-    scraper.save_to_csv()
+    scraper.save()
     
+def make_scraper(config, output_dir, record_dir=None):
+    """TextScraper of config.SCRAPE (base url, page limit, concurrency and politeness)."""
+    scrape = config.SCRAPE
+    return TextScraper(scrape["base_url"], output_dir, scrape["max_pages"],
+                       concurrency=scrape["concurrency"],
+                       per_host_concurrency=scrape["per_host_concurrency"],
+                       crawl_delay=scrape["crawl_delay_seconds"],
+                       record_dir=record_dir,
+                       prioritize_team_pages=scrape["prioritize_team_pages"],
+                       # a recording needs every page's HTML, not 304s
+                       page_cache_path=scrape["page_cache_path"] if scrape["incremental"] and not record_dir else None,
+                       use_sitemap=scrape["use_sitemap"],
+                       checkpoint_every=scrape["checkpoint_every"],
+                       html_parser=scrape["html_parser"])
+
+def scraped_data_path(config):
+    """The Parquet scraped data if it exists, else the CSV export."""
+    return config.PARQUET_FILE_PATH if os.path.exists(config.PARQUET_FILE_PATH) else config.CSV_FILE_PATH
+
+def make_document_processor(config):
+    """DocumentProcessor of the scraped data, with chunking from config.INGEST and boilerplate
+    stripping from config.BOILERPLATE."""
+    boilerplate = config.BOILERPLATE
+    return DocumentProcessor(scraped_data_path(config),
+                             boilerplate_max_page_fraction=boilerplate["max_page_fraction"] if boilerplate["enabled"] else None,
+                             boilerplate_min_pages=boilerplate["min_pages"],
+                             chunk_size=config.INGEST["chunk_size"],
+                             chunk_overlap=config.INGEST["chunk_overlap"])
+
+def log_boilerplate_stats(data_processor, logger):
+    stats = data_processor.boilerplate_stats
+    if stats:
+        logger.info(f"Boilerplate: {stats['boilerplate_blocks']} repeated blocks, {stats['removed_blocks']} "
+                    f"occurrences removed from {stats['pages']} pages")
+
+def make_deduplicator(config):
+    """ChunkDeduplicator from config.DEDUP, or None if deduplication is disabled."""
+    if not config.DEDUP["enabled"]:
+        return None
+    return ChunkDeduplicator(threshold=config.DEDUP["threshold"],
+                             num_perm=config.DEDUP["num_perm"],
+                             bands=config.DEDUP["bands"])
+
+def log_dedup_stats(deduplicator, logger):
+    stats = deduplicator.stats()
+    logger.info(f"Dedup: {stats['chunks_before']} -> {stats['chunks_after']} chunks "
+                f"({stats['reduction']:.1%} smaller, {stats['chars_before'] - stats['chars_after']} chars "
+                f"not embedded)")
+
 def save_to_chromadb(config, logger=None):
     # save to chroma db
     # OUTPUT_DIR = config.OUTPUT_DIR
     # os.makedirs(OUTPUT_DIR, exist_ok=True)
     logger.info("Initializing DatabaseHandler...")
-    vector_db_handler = DatabaseHandler(path=config.CHROMA_PATH, model_name=config.EMBEDDING_MODEL_NAME, logger=logger)
+    vector_db_handler = DatabaseHandler.from_config(config, logger)
     logger.info("Initializing DocumentProcessor...")
-    data_processor = DocumentProcessor(config.CSV_FILE_PATH)
-    text_chunks, metadatas = data_processor.get_combined_chunks_with_rooms(config.ROOMS_CSV_PATH)
-    logger.info(f"Number of text chunks to store: {len(text_chunks)}")
-    vector_db_handler.store_documents(text_chunks, metadatas)
-    logger.info(f"Stored {len(text_chunks)} chunks in ChromaDB")
+    data_processor = make_document_processor(config)
+    deduplicator = make_deduplicator(config)
+    chunk_stream = data_processor.iter_combined_chunks_with_rooms(config.ROOMS_CSV_PATH,
+                                                                  workers=config.INGEST["chunk_workers"],
+                                                                  deduplicator=deduplicator)
+    stats = vector_db_handler.sync_documents_stream(chunk_stream,
+                                                    log_every_batches=config.INGEST["log_every_batches"],
+                                                    queue_batches=config.INGEST["queue_batches"])
+    log_boilerplate_stats(data_processor, logger)
+    if deduplicator is not None:
+        log_dedup_stats(deduplicator, logger)
+    logger.info(f"Synced {stats['added'] + stats['unchanged']} chunks to ChromaDB "
+                f"({stats['added']} embedded, {stats['updated']} metadata updates, {stats['deleted']} deleted)")
 
 if __name__ == "__main__":
     import os, sys
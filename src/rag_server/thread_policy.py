@@ -0,0 +1,116 @@
+"""Compute thread counts per subsystem, from config.THREADS.
+
+Importing src.rag_server used to set OMP_NUM_THREADS=1 (and LD_PRELOAD the libgomp of one
+machine's venv) in every process, as a workaround for scikit-learn's OpenMP TLS error. That
+made every embedding encode and numpy op single-threaded. The workaround is now opt-in
+(THREADS["sklearn_openmp_workaround"]) and the thread counts are set per subsystem:
+
+- "embedding": intra-/inter-op threads of the embedding model (torch or ONNX Runtime), for
+  queries and ingestion. None uses every usable core minus the ASR reservation.
+- "ingest_workers": OpenMP/BLAS threads of each chunking process. None splits the usable
+  cores between the INGEST["chunk_workers"] processes.
+- "asr": cores kept free for a speech recognizer on the same host.
+
+Compare settings with::
+
+    python -m benchmarks.thread_policy_benchmark
+"""
+import os
+
+from src.rag_server import config
+
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def available_cores():
+    """Cores this process may run on: its CPU affinity, capped by a cgroup v2 CPU quota (containers)."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS / Windows
+        cores = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cores = min(cores, int(quota) // int(period))
+    except (OSError, ValueError):
+        pass
+    return max(1, cores)
+
+
+def subsystem_threads(subsystem, policy=None):
+    """Resolved thread counts of a subsystem.
+
+    Args:
+        subsystem (str): "embedding" or "ingest_workers".
+        policy (dict): Thread policy; defaults to config.THREADS.
+
+    Returns:
+        dict: {"intra_op": int, "inter_op": int}
+    """
+    policy = policy if policy is not None else config.THREADS
+    settings = policy.get(subsystem) or {}
+    intra_op = settings.get("intra_op")
+    if not intra_op:
+        if policy.get("sklearn_openmp_workaround"):
+            intra_op = 1  # the old global OMP_NUM_THREADS=1
+        elif subsystem == "ingest_workers":
+            intra_op = available_cores() // max(1, config.INGEST["chunk_workers"])
+        else:
+            intra_op = available_cores() - (policy.get("asr") or {}).get("reserved_cores", 0)
+    return {"intra_op": max(1, int(intra_op)), "inter_op": max(1, int(settings.get("inter_op") or 1))}
+
+
+def apply_process_policy(policy=None):
+    """Process-wide settings, applied when src.rag_server is imported.
+
+    Only the opt-in scikit-learn workaround changes the environment: OMP_NUM_THREADS=1 for
+    the process and libgomp_preload for the processes it starts (LD_PRELOAD set at runtime
+    cannot affect the running process).
+    """
+    policy = policy if policy is not None else config.THREADS
+    if not policy.get("sklearn_openmp_workaround"):
+        return
+    os.environ["OMP_NUM_THREADS"] = "1"
+    preload = policy.get("libgomp_preload")
+    if preload and os.path.exists(preload):
+        os.environ["LD_PRELOAD"] = preload
+
+
+def configure_torch(intra_op, inter_op=1):
+    """Sets the torch thread pools of this process (they are process-wide)."""
+    import torch
+
+    torch.set_num_threads(intra_op)
+    try:
+        torch.set_num_interop_threads(inter_op)
+    except RuntimeError:  # only settable before the first inter-op parallel work of the process
+        pass
+
+
+def limit_worker_threads(subsystem="ingest_workers"):
+    """Caps the OpenMP/BLAS threads of the current process; initializer of the chunking pool.
+
+    The environment variables cover libraries loaded later; threadpoolctl (installed with
+    scikit-learn) also caps the ones already loaded.
+    """
+    threads = subsystem_threads(subsystem)["intra_op"]
+    for name in _THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return threads
+    threadpool_limits(threads)
+    return threads
+
+
+def describe(policy=None):
+    """Resolved policy, for logs and benchmark reports."""
+    policy = policy if policy is not None else config.THREADS
+    return {"available_cores": available_cores(),
+            "sklearn_openmp_workaround": bool(policy.get("sklearn_openmp_workaround")),
+            "embedding": subsystem_threads("embedding", policy),
+            "ingest_workers": {**subsystem_threads("ingest_workers", policy),
+                               "processes": config.INGEST["chunk_workers"]},
+            "asr_reserved_cores": (policy.get("asr") or {}).get("reserved_cores", 0)}
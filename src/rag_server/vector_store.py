@@ -0,0 +1,475 @@
+"""Vector store backends used by DatabaseHandler.
+
+Both backends expose the same small, ChromaDB-shaped API so ingestion and retrieval
+code does not care where the vectors live:
+
+- ``ChromaBackend``: ChromaDB PersistentClient with HNSW (space and ef configurable).
+- ``FlatIndexBackend``: exact top-k over a float16 matrix in a memory-mapped ``.npy``
+  file. For a corpus of a few thousand chunks this opens faster, queries faster and
+  needs far less RAM than HNSW + SQLite.
+
+All stored embeddings are normalized, so the similarity reported by ``query`` is the
+cosine similarity for every backend/space.
+"""
+import json
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+import numpy as np
+
+
+def _clean_metadata(metadata):
+    """ChromaDB rejects None metadata values; they are dropped (missing key == None on read)."""
+    return {k: v for k, v in (metadata or {}).items() if v is not None}
+
+
+class VectorStore(ABC):
+
+    """One collection of (id, document, metadata, embedding) records."""
+
+    name = None
+
+    @property
+    @abstractmethod
+    def metadata(self):
+        """Collection-level metadata (index version, embedding model, ...)."""
+
+    @abstractmethod
+    def set_metadata(self, metadata):
+        """Replaces the collection-level metadata."""
+
+    @abstractmethod
+    def count(self):
+        """Number of stored records."""
+
+    @abstractmethod
+    def add(self, ids, documents, metadatas, embeddings):
+        """Adds new records (ids must not exist yet)."""
+
+    @abstractmethod
+    def upsert(self, ids, documents, metadatas, embeddings):
+        """Adds or overwrites records."""
+
+    @abstractmethod
+    def update_metadatas(self, ids, metadatas):
+        """Merges metadata into existing records (the given keys replace the stored ones); the
+        documents and embeddings stay as they are."""
+
+    @abstractmethod
+    def delete(self, ids):
+        """Deletes records by id."""
+
+    def flush(self):
+        """Persists buffered writes (a no-op for stores that write through)."""
+
+    @abstractmethod
+    def get(self, ids=None, include=("documents", "metadatas")):
+        """Returns {"ids", "documents", "metadatas", "embeddings"} for the given ids (all records if None).
+
+        Only the fields in include are filled, the others are None.
+        """
+
+    @abstractmethod
+    def query(self, query_embeddings, n_results, include_embeddings=False):
+        """Top-n records per query embedding.
+
+        Returns:
+            Dict: ChromaDB-shaped lists of lists per query: "ids", "documents", "metadatas",
+            "distances" and "similarities" (cosine similarity, higher is better), plus the
+            stored "embeddings" if include_embeddings is set.
+        """
+
+
+class VectorStoreBackend(ABC):
+
+    """Creates, opens, lists and drops collections; root is where side files (BM25, pointers) live."""
+
+    root = None
+
+    @abstractmethod
+    def open(self, name):
+        """Opens the collection, creating it if it does not exist."""
+
+    @abstractmethod
+    def create(self, name):
+        """Creates a new, empty collection."""
+
+    @abstractmethod
+    def list_names(self):
+        """Names of all collections."""
+
+    @abstractmethod
+    def drop(self, name):
+        """Deletes a collection."""
+
+
+class ChromaVectorStore(VectorStore):
+
+    """ChromaDB collection behind the VectorStore API."""
+
+    def __init__(self, collection, space):
+        self.collection = collection
+        self.name = collection.name
+        self.space = space
+
+    @property
+    def metadata(self):
+        return {k: v for k, v in (self.collection.metadata or {}).items() if not k.startswith("hnsw:")}
+
+    def set_metadata(self, metadata):
+        # older ChromaDB versions read the HNSW settings from the metadata and need them kept,
+        # newer ones keep them in the configuration and refuse hnsw:* keys in modify()
+        hnsw = {k: v for k, v in (self.collection.metadata or {}).items() if k.startswith("hnsw:")}
+        try:
+            self.collection.modify(metadata={**metadata, **hnsw})
+        except Exception:
+            self.collection.modify(metadata=metadata)
+
+    def count(self):
+        return self.collection.count()
+
+    def add(self, ids, documents, metadatas, embeddings):
+        self.collection.add(ids=ids, documents=documents, embeddings=embeddings,
+                            metadatas=[_clean_metadata(m) for m in metadatas])
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        self.collection.upsert(ids=ids, documents=documents, embeddings=embeddings,
+                               metadatas=[_clean_metadata(m) for m in metadatas])
+
+    def update_metadatas(self, ids, metadatas):
+        self.collection.update(ids=ids, metadatas=[_clean_metadata(m) for m in metadatas])
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+
+    def get(self, ids=None, include=("documents", "metadatas")):
+        result = self.collection.get(ids=ids, include=list(include))
+        embeddings = result.get("embeddings") if "embeddings" in include else None
+        return {"ids": result["ids"],
+                "documents": result.get("documents") if "documents" in include else None,
+                "metadatas": [m or {} for m in result["metadatas"]] if "metadatas" in include else None,
+                "embeddings": [list(e) for e in embeddings] if embeddings is not None else None}
+
+    def _similarity(self, distance):
+        # cosine/ip distances are 1 - dot; l2 is the squared distance, 2 - 2 * dot for normalized vectors
+        return 1.0 - distance / 2.0 if self.space == "l2" else 1.0 - distance
+
+    def query(self, query_embeddings, n_results, include_embeddings=False):
+        include = ["documents", "metadatas", "distances"] + (["embeddings"] if include_embeddings else [])
+        results = self.collection.query(query_embeddings=query_embeddings, n_results=n_results, include=include)
+        if include_embeddings:
+            results["embeddings"] = [[list(e) for e in row] for row in results["embeddings"]]
+        results["metadatas"] = [[m or {} for m in row] for row in results["metadatas"]]
+        results["similarities"] = [[self._similarity(d) for d in row] for row in results["distances"]]
+        return results
+
+
+class ChromaBackend(VectorStoreBackend):
+
+    """ChromaDB PersistentClient; HNSW settings apply to newly created collections."""
+
+    def __init__(self, path, hnsw_space="l2", hnsw_construction_ef=100, hnsw_search_ef=100):
+        """
+        Args:
+            path (str): ChromaDB persistence directory.
+            hnsw_space (str): "l2", "cosine" or "ip".
+            hnsw_construction_ef (int): HNSW ef used while building the graph.
+            hnsw_search_ef (int): HNSW ef used at query time.
+        """
+        import chromadb  # only needed for this backend
+
+        self.root = path
+        self.client = chromadb.PersistentClient(path=path)
+        self.hnsw_space = hnsw_space
+        self.hnsw_metadata = {"hnsw:space": hnsw_space,
+                              "hnsw:construction_ef": hnsw_construction_ef,
+                              "hnsw:search_ef": hnsw_search_ef}
+
+    def _wrap(self, collection):
+        # the space a collection was created with; newer ChromaDB keeps it in the configuration,
+        # older versions in the metadata, and collections created without either use l2
+        configuration = getattr(collection, "configuration", None)
+        hnsw = configuration.get("hnsw") if isinstance(configuration, dict) else None
+        space = (hnsw or {}).get("space") or (collection.metadata or {}).get("hnsw:space") or "l2"
+        return ChromaVectorStore(collection, space)
+
+    def open(self, name):
+        # get_or_create_collection would rewrite the metadata (index version) of an existing collection
+        # on some ChromaDB versions
+        if name in self.list_names():
+            return self._wrap(self.client.get_collection(name=name))
+        return self.create(name)
+
+    def create(self, name):
+        return self._wrap(self.client.create_collection(name=name, metadata=self.hnsw_metadata))
+
+    def list_names(self):
+        return [c if isinstance(c, str) else c.name for c in self.client.list_collections()]
+
+    def drop(self, name):
+        self.client.delete_collection(name=name)
+
+
+# one immutable generation of a flat collection; readers take it with a single attribute read
+_FlatSnapshot = namedtuple("_FlatSnapshot", "ids documents metadatas embeddings row_of")
+
+
+class FlatIndexVectorStore(VectorStore):
+
+    """Exact top-k search over a memory-mapped float16 embedding matrix.
+
+    Layout of a collection directory:
+        embeddings.npy  float16 matrix (n, dim), opened with mmap_mode="r"
+        records.json    ids, documents and metadatas in matrix row order
+        meta.json       collection-level metadata
+
+    The records and the matrix form one immutable snapshot that is replaced with a single
+    assignment, so a query never pairs new ids with old vectors. Writes only go to a
+    write buffer; the buffer is merged into a new snapshot once (on get/count/delete) and
+    written to disk by flush, so a batched ingest costs one rebuild instead of one per batch.
+    Queries see the snapshot as of the last merge. Files are swapped in with os.replace, so
+    readers holding the old memory map are not affected. Upcasting float16 is slower than the
+    dot product itself, so small matrices are upcast once on the first query and kept as float32.
+    """
+
+    _QUERY_BLOCK_ROWS = 8192  # rows upcast to float32 at a time while scoring
+    _MAX_FLOAT32_CACHE_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, directory, name):
+        self.directory = directory
+        self.name = name
+        self._lock = threading.Lock()
+        self._pending = None  # write buffer since the last merge
+        self._dirty = False   # snapshot not yet written to disk
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, file_name):
+        return os.path.join(self.directory, file_name)
+
+    def _load(self):
+        records_path = self._path("records.json")
+        if os.path.exists(records_path):
+            with open(records_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+            ids = records["ids"]
+            snapshot = _FlatSnapshot(ids, records["documents"], records["metadatas"],
+                                     np.load(self._path("embeddings.npy"), mmap_mode="r"),
+                                     {doc_id: row for row, doc_id in enumerate(ids)})
+        else:
+            snapshot = _FlatSnapshot([], [], [], None, {})
+        self._embeddings32 = None
+        self._snapshot = snapshot
+        meta_path = self._path("meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                self._metadata = json.load(f)
+        else:
+            self._metadata = {}
+
+    def _write_json(self, file_name, data):
+        tmp_path = self._path(f"{file_name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(file_name))
+
+    def _persist(self, snapshot):
+        """Writes a new generation of the collection files and reloads the memory map."""
+        tmp_path = self._path("embeddings.tmp.npy")
+        embeddings = snapshot.embeddings if snapshot.embeddings is not None else np.zeros((0, 0), dtype=np.float16)
+        np.save(tmp_path, embeddings.astype(np.float16, copy=False))
+        os.replace(tmp_path, self._path("embeddings.npy"))
+        self._write_json("records.json", {"ids": snapshot.ids, "documents": snapshot.documents,
+                                          "metadatas": snapshot.metadatas})
+        self._load()
+
+    @property
+    def metadata(self):
+        return dict(self._metadata)
+
+    def set_metadata(self, metadata):
+        with self._lock:
+            self._write_json("meta.json", metadata)
+            self._metadata = dict(metadata)
+
+    def count(self):
+        pending = self._pending
+        return len(pending["ids"]) if pending is not None else len(self._snapshot.ids)
+
+    def _pending_buffer(self):
+        """The write buffer, started from the current snapshot if empty (caller holds the lock)."""
+        if self._pending is None:
+            snapshot = self._snapshot
+            self._pending = {"ids": list(snapshot.ids), "documents": list(snapshot.documents),
+                             "metadatas": list(snapshot.metadatas), "row_of": dict(snapshot.row_of),
+                             "base": snapshot.embeddings, "blocks": [], "updates": {}}
+        return self._pending
+
+    def _write(self, ids, documents, metadatas, embeddings, overwrite):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            pending = self._pending_buffer()
+            new_rows = []
+            for i, doc_id in enumerate(ids):
+                row = pending["row_of"].get(doc_id)
+                if row is None:
+                    pending["row_of"][doc_id] = len(pending["ids"])
+                    pending["ids"].append(doc_id)
+                    pending["documents"].append(documents[i])
+                    pending["metadatas"].append(_clean_metadata(metadatas[i]))
+                    new_rows.append(i)
+                elif overwrite:
+                    pending["updates"][row] = embeddings[i]
+                    pending["documents"][row] = documents[i]
+                    pending["metadatas"][row] = _clean_metadata(metadatas[i])
+                # like ChromaDB, add() ignores ids that already exist
+            if new_rows:
+                pending["blocks"].append(embeddings[new_rows])
+
+    def _merge(self):
+        """Folds the write buffer into a new snapshot (caller holds the lock) and returns the snapshot."""
+        pending = self._pending
+        if pending is None:
+            return self._snapshot
+        base = pending["base"]
+        blocks = ([np.asarray(base, dtype=np.float32)] if base is not None and len(base) else []) + pending["blocks"]
+        matrix = np.concatenate(blocks) if blocks else None
+        if pending["updates"]:
+            matrix = np.array(matrix, dtype=np.float32)  # the base may be a read-only memory map
+            for row, embedding in pending["updates"].items():
+                matrix[row] = embedding
+        self._snapshot = _FlatSnapshot(pending["ids"], pending["documents"], pending["metadatas"], matrix,
+                                       pending["row_of"])
+        self._pending = None
+        self._dirty = True
+        return self._snapshot
+
+    def flush(self):
+        with self._lock:
+            snapshot = self._merge()
+            if self._dirty:
+                self._persist(snapshot)
+                self._dirty = False
+
+    def add(self, ids, documents, metadatas, embeddings):
+        self._write(ids, documents, metadatas, embeddings, overwrite=False)
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        self._write(ids, documents, metadatas, embeddings, overwrite=True)
+
+    def update_metadatas(self, ids, metadatas):
+        with self._lock:
+            pending = self._pending_buffer()
+            for doc_id, metadata in zip(ids, metadatas):
+                row = pending["row_of"].get(doc_id)
+                if row is not None:  # like ChromaDB, unknown ids are ignored
+                    pending["metadatas"][row] = {**pending["metadatas"][row], **_clean_metadata(metadata)}
+
+    def delete(self, ids):
+        with self._lock:
+            snapshot = self._merge()
+            drop = {snapshot.row_of[doc_id] for doc_id in ids if doc_id in snapshot.row_of}
+            if not drop:
+                return
+            keep = [row for row in range(len(snapshot.ids)) if row not in drop]
+            kept_ids = [snapshot.ids[r] for r in keep]
+            self._snapshot = _FlatSnapshot(kept_ids,
+                                           [snapshot.documents[r] for r in keep],
+                                           [snapshot.metadatas[r] for r in keep],
+                                           np.asarray(snapshot.embeddings[keep], dtype=np.float32),
+                                           {doc_id: row for row, doc_id in enumerate(kept_ids)})
+            self._dirty = True
+
+    def get(self, ids=None, include=("documents", "metadatas")):
+        with self._lock:
+            ids_, documents, metadatas, embeddings, row_of = self._merge()
+        rows = range(len(ids_)) if ids is None else [row_of[i] for i in ids if i in row_of]
+        return {"ids": [ids_[r] for r in rows],
+                "documents": [documents[r] for r in rows] if "documents" in include else None,
+                "metadatas": [metadatas[r] for r in rows] if "metadatas" in include else None,
+                "embeddings": [embeddings[r].astype(np.float32).tolist() for r in rows]
+                if "embeddings" in include else None}
+
+    def _float32_matrix(self, embeddings):
+        """float32 copy of the matrix for scoring, or None if it is too large to keep in RAM."""
+        cached = self._embeddings32
+        if cached is not None and cached[0] is embeddings:
+            return cached[1]
+        if embeddings.size * 4 > self._MAX_FLOAT32_CACHE_BYTES:
+            return None
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        self._embeddings32 = (embeddings, matrix)
+        return matrix
+
+    def query(self, query_embeddings, n_results, include_embeddings=False):
+        ids, documents, metadatas, embeddings, _ = self._snapshot  # one read: a concurrent merge swaps the tuple
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": [], "similarities": []}
+        if include_embeddings:
+            results["embeddings"] = []
+        if embeddings is None or len(ids) == 0:
+            for key in results:
+                results[key] = [[] for _ in queries]
+            return results
+
+        matrix = self._float32_matrix(embeddings)
+        if matrix is not None:
+            scores = matrix @ queries.T
+        else:
+            scores = np.empty((len(ids), len(queries)), dtype=np.float32)
+            for start in range(0, len(ids), self._QUERY_BLOCK_ROWS):
+                block = np.asarray(embeddings[start:start + self._QUERY_BLOCK_ROWS], dtype=np.float32)
+                scores[start:start + len(block)] = block @ queries.T
+
+        k = min(n_results, len(ids))
+        for q in range(len(queries)):
+            column = scores[:, q]
+            top = np.argpartition(-column, k - 1)[:k]
+            top = top[np.argsort(-column[top])]
+            results["ids"].append([ids[r] for r in top])
+            results["documents"].append([documents[r] for r in top])
+            results["metadatas"].append([metadatas[r] for r in top])
+            results["similarities"].append([float(column[r]) for r in top])
+            results["distances"].append([1.0 - float(column[r]) for r in top])
+            if include_embeddings:
+                results["embeddings"].append([embeddings[r].astype(np.float32).tolist() for r in top])
+        return results
+
+
+class FlatIndexBackend(VectorStoreBackend):
+
+    """Collections stored as directories of memory-mapped .npy files under root."""
+
+    def __init__(self, path):
+        self.root = path
+        os.makedirs(path, exist_ok=True)
+
+    def open(self, name):
+        return FlatIndexVectorStore(os.path.join(self.root, name), name)
+
+    def create(self, name):
+        directory = os.path.join(self.root, name)
+        if os.path.exists(directory):
+            raise ValueError(f"Collection {name} already exists")
+        return FlatIndexVectorStore(directory, name)
+
+    def list_names(self):
+        return [n for n in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, n))]
+
+    def drop(self, name):
+        shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+
+def create_backend(backend, path, hnsw_space="l2", hnsw_construction_ef=100, hnsw_search_ef=100):
+    """Returns the vector store backend by name ("chroma" or "flat").
+
+    The flat index lives in a "flat" subdirectory of path, next to the ChromaDB files.
+    """
+    if backend == "chroma":
+        return ChromaBackend(path, hnsw_space, hnsw_construction_ef, hnsw_search_ef)
+    if backend == "flat":
+        return FlatIndexBackend(os.path.join(path, "flat"))
+    raise ValueError(f"Unknown vector store backend: {backend}")